@@ -0,0 +1,47 @@
+"""Add indexes for hot query paths
+
+Revision ID: 4b7d2e9a61c3
+Revises: 1322db27dc1d
+Create Date: 2026-10-17 10:12:41.318204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4b7d2e9a61c3'
+down_revision = '1322db27dc1d'
+branch_labels = None
+depends_on = None
+
+
+# (table, index name, columns) - keep in sync with the models' __table_args__
+INDEXES = [
+    ('bookings', 'ix_bookings_resource_status_start', ['resource_id', 'status', 'start_date']),
+    ('bookings', 'ix_bookings_user_start', ['user_id', 'start_date']),
+    ('bookings', 'ix_bookings_status_start', ['status', 'start_date']),
+    ('bookings', 'ix_bookings_start_date', ['start_date']),
+    ('bookings', 'ix_bookings_parent_booking_id', ['parent_booking_id']),
+    ('reviews', 'ix_reviews_resource_hidden_created', ['resource_id', 'is_hidden', 'created_at']),
+    ('reviews', 'ix_reviews_user_resource', ['user_id', 'resource_id']),
+    ('notifications', 'ix_notifications_user_read_created', ['user_id', 'is_read', 'created_at']),
+    ('notifications', 'ix_notifications_user_created', ['user_id', 'created_at']),
+    ('messages', 'ix_messages_recipient_hidden_created', ['recipient_id', 'is_hidden', 'created_at']),
+    ('messages', 'ix_messages_sender_hidden_created', ['sender_id', 'is_hidden', 'created_at']),
+    ('messages', 'ix_messages_flagged_hidden_created', ['is_flagged', 'is_hidden', 'created_at']),
+    ('waitlist', 'ix_waitlist_resource_status_created', ['resource_id', 'status', 'created_at']),
+    ('waitlist', 'ix_waitlist_user_resource_status', ['user_id', 'resource_id', 'status']),
+    ('waitlist', 'ix_waitlist_status_requested_end', ['status', 'requested_end_date']),
+]
+
+
+def upgrade():
+    # Databases bootstrapped with db.create_all() may already have these
+    for table, name, columns in INDEXES:
+        op.create_index(name, table, columns, unique=False, if_not_exists=True)
+
+
+def downgrade():
+    for table, name, columns in reversed(INDEXES):
+        op.drop_index(name, table_name=table, if_exists=True)
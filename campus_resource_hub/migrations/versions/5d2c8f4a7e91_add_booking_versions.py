@@ -0,0 +1,30 @@
+"""Add per-resource booking version counters
+
+Revision ID: 5d2c8f4a7e91
+Revises: e3b7a0c6d519
+Create Date: 2026-10-18 03:41:27.560381
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5d2c8f4a7e91'
+down_revision = 'e3b7a0c6d519'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('booking_versions',
+    sa.Column('resource_id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('version', sa.Integer(), server_default='0', nullable=False),
+    sa.PrimaryKeyConstraint('resource_id')
+    )
+    # Row 0 is bumped by bulk writes that may touch any resource
+    op.execute("INSERT INTO booking_versions (resource_id, version) VALUES (0, 0)")
+
+
+def downgrade():
+    op.drop_table('booking_versions')
@@ -0,0 +1,43 @@
+"""Add rule-based recurrence and booking exceptions
+
+Revision ID: 7c1f3a8e2d54
+Revises: 4b7d2e9a61c3
+Create Date: 2026-10-17 14:03:27.552918
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7c1f3a8e2d54'
+down_revision = '4b7d2e9a61c3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('bookings', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('recurrence_rule', sa.String(length=255), nullable=True))
+        batch_op.add_column(sa.Column('series_end_date', sa.DateTime(), nullable=True))
+    
+    op.create_table('booking_exceptions',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('booking_id', sa.Integer(), nullable=False),
+    sa.Column('occurrence_start', sa.DateTime(), nullable=False),
+    sa.Column('reason', sa.String(length=20), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['booking_id'], ['bookings.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('booking_id', 'occurrence_start', name='uq_booking_exceptions_occurrence')
+    )
+    
+    # Existing series keep their materialized child rows (recurrence_rule stays NULL)
+
+
+def downgrade():
+    op.drop_table('booking_exceptions')
+    
+    with op.batch_alter_table('bookings', schema=None) as batch_op:
+        batch_op.drop_column('series_end_date')
+        batch_op.drop_column('recurrence_rule')
@@ -0,0 +1,41 @@
+"""Add denormalized rating aggregates to resources
+
+Revision ID: 9a4e6c1b7f20
+Revises: 7c1f3a8e2d54
+Create Date: 2026-10-17 16:21:08.114302
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9a4e6c1b7f20'
+down_revision = '7c1f3a8e2d54'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('resources', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('rating_sum', sa.Integer(), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('rating_count', sa.Integer(), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('avg_rating', sa.Float(), server_default='0', nullable=False))
+    
+    # Backfill from the visible reviews (same as `flask repair-ratings`)
+    op.execute("""
+        UPDATE resources SET
+            rating_sum = COALESCE((SELECT SUM(rating) FROM reviews
+                                   WHERE reviews.resource_id = resources.id AND reviews.is_hidden = 0), 0),
+            rating_count = (SELECT COUNT(*) FROM reviews
+                            WHERE reviews.resource_id = resources.id AND reviews.is_hidden = 0),
+            avg_rating = COALESCE((SELECT AVG(rating) FROM reviews
+                                   WHERE reviews.resource_id = resources.id AND reviews.is_hidden = 0), 0)
+    """)
+
+
+def downgrade():
+    with op.batch_alter_table('resources', schema=None) as batch_op:
+        batch_op.drop_column('avg_rating')
+        batch_op.drop_column('rating_count')
+        batch_op.drop_column('rating_sum')
@@ -0,0 +1,30 @@
+"""Add shared catalog version counter
+
+Revision ID: a4c9e2f71b36
+Revises: f27b5c0d8e13
+Create Date: 2026-10-17 23:05:12.204117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a4c9e2f71b36'
+down_revision = 'f27b5c0d8e13'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('catalog_versions',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('version', sa.Integer(), server_default='0', nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    # Single row bumped by every catalog write
+    op.execute("INSERT INTO catalog_versions (id, version) VALUES (1, 0)")
+
+
+def downgrade():
+    op.drop_table('catalog_versions')
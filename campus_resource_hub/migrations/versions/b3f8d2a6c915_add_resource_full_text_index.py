@@ -0,0 +1,61 @@
+"""Add FTS5 full-text index over resources
+
+Revision ID: b3f8d2a6c915
+Revises: 9a4e6c1b7f20
+Create Date: 2026-10-17 17:42:51.306447
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b3f8d2a6c915'
+down_revision = '9a4e6c1b7f20'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # SQLite only; other databases keep the ILIKE fallback in utils/resource_search.py
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    op.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS resources_fts USING fts5(
+            title, description, category, location, equipment,
+            content='resources', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+        )
+    """)
+    op.execute("""
+        CREATE TRIGGER IF NOT EXISTS resources_fts_ai AFTER INSERT ON resources BEGIN
+            INSERT INTO resources_fts(rowid, title, description, category, location, equipment)
+            VALUES (new.id, new.title, new.description, new.category, new.location, new.equipment);
+        END
+    """)
+    op.execute("""
+        CREATE TRIGGER IF NOT EXISTS resources_fts_ad AFTER DELETE ON resources BEGIN
+            INSERT INTO resources_fts(resources_fts, rowid, title, description, category, location, equipment)
+            VALUES ('delete', old.id, old.title, old.description, old.category, old.location, old.equipment);
+        END
+    """)
+    op.execute("""
+        CREATE TRIGGER IF NOT EXISTS resources_fts_au
+        AFTER UPDATE OF title, description, category, location, equipment ON resources BEGIN
+            INSERT INTO resources_fts(resources_fts, rowid, title, description, category, location, equipment)
+            VALUES ('delete', old.id, old.title, old.description, old.category, old.location, old.equipment);
+            INSERT INTO resources_fts(rowid, title, description, category, location, equipment)
+            VALUES (new.id, new.title, new.description, new.category, new.location, new.equipment);
+        END
+    """)
+    # Index the rows that already exist
+    op.execute("INSERT INTO resources_fts(resources_fts) VALUES ('rebuild')")
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    op.execute("DROP TRIGGER IF EXISTS resources_fts_au")
+    op.execute("DROP TRIGGER IF EXISTS resources_fts_ad")
+    op.execute("DROP TRIGGER IF EXISTS resources_fts_ai")
+    op.execute("DROP TABLE IF EXISTS resources_fts")
@@ -0,0 +1,33 @@
+"""Add bookings_updated_at to users for iCal feed revalidation
+
+Revision ID: c58e1d4a9f02
+Revises: a4c9e2f71b36
+Create Date: 2026-10-18 00:14:37.562081
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c58e1d4a9f02'
+down_revision = 'a4c9e2f71b36'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('bookings_updated_at', sa.DateTime(), nullable=True))
+    
+    # Backfill from the latest write to each user's bookings
+    op.execute("""
+        UPDATE users SET bookings_updated_at = (
+            SELECT MAX(COALESCE(updated_at, created_at)) FROM bookings WHERE bookings.user_id = users.id
+        )
+    """)
+
+
+def downgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_column('bookings_updated_at')
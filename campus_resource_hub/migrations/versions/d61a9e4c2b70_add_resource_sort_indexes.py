@@ -0,0 +1,35 @@
+"""Add indexes for sorted, keyset-paginated resource search
+
+Revision ID: d61a9e4c2b70
+Revises: b3f8d2a6c915
+Create Date: 2026-10-17 19:05:33.871620
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd61a9e4c2b70'
+down_revision = 'b3f8d2a6c915'
+branch_labels = None
+depends_on = None
+
+
+# (table, index name, columns) - keep in sync with Resource.__table_args__
+INDEXES = [
+    ('resources', 'ix_resources_status_title', ['status', 'title']),
+    ('resources', 'ix_resources_status_created', ['status', 'created_at']),
+    ('resources', 'ix_resources_status_avg_rating', ['status', 'avg_rating']),
+]
+
+
+def upgrade():
+    # Databases bootstrapped with db.create_all() may already have these
+    for table, name, columns in INDEXES:
+        op.create_index(name, table, columns, unique=False, if_not_exists=True)
+
+
+def downgrade():
+    for table, name, columns in reversed(INDEXES):
+        op.drop_index(name, table_name=table, if_exists=True)
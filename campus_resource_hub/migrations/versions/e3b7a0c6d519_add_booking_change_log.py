@@ -0,0 +1,39 @@
+"""Add booking change log for calendar delta sync
+
+Revision ID: e3b7a0c6d519
+Revises: c58e1d4a9f02
+Create Date: 2026-10-18 01:02:48.913406
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e3b7a0c6d519'
+down_revision = 'c58e1d4a9f02'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('booking_changes',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('booking_id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('changed_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sqlite_autoincrement=True
+    )
+    with op.batch_alter_table('booking_changes', schema=None) as batch_op:
+        batch_op.create_index('ix_booking_changes_user_id', ['user_id', 'id'], unique=False)
+        batch_op.create_index('ix_booking_changes_changed_at', ['changed_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('booking_changes', schema=None) as batch_op:
+        batch_op.drop_index('ix_booking_changes_changed_at')
+        batch_op.drop_index('ix_booking_changes_user_id')
+    
+    op.drop_table('booking_changes')
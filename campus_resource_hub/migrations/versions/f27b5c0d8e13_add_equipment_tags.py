@@ -0,0 +1,76 @@
+"""Normalize resource equipment into tags
+
+Revision ID: f27b5c0d8e13
+Revises: d61a9e4c2b70
+Create Date: 2026-10-17 21:12:46.530918
+
+"""
+import re
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f27b5c0d8e13'
+down_revision = 'd61a9e4c2b70'
+branch_labels = None
+depends_on = None
+
+
+def _parse_tags(text):
+    """Same splitting and normalization as utils.equipment_tags.parse_tags."""
+    names = []
+    for item in re.split(r'[,;\n]', text or ''):
+        name = re.sub(r'\s+', ' ', item.strip()).lower()
+        if name and name not in names:
+            names.append(name)
+    return names
+
+
+def upgrade():
+    op.create_table('equipment_tags',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=100), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('name')
+    )
+    op.create_table('resource_tags',
+    sa.Column('resource_id', sa.Integer(), nullable=False),
+    sa.Column('tag_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['resource_id'], ['resources.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['tag_id'], ['equipment_tags.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('resource_id', 'tag_id')
+    )
+    # Inverted index: tag -> resources
+    op.create_index('ix_resource_tags_tag_resource', 'resource_tags', ['tag_id', 'resource_id'], unique=False)
+    
+    # Split the existing comma-separated equipment lists
+    connection = op.get_bind()
+    rows = connection.execute(sa.text(
+        "SELECT id, equipment FROM resources WHERE equipment IS NOT NULL AND equipment != ''"
+    )).fetchall()
+    tag_ids = {}
+    links = []
+    now = datetime.utcnow()
+    for resource_id, equipment in rows:
+        for name in _parse_tags(equipment):
+            if name not in tag_ids:
+                tag_ids[name] = connection.execute(
+                    sa.text("INSERT INTO equipment_tags (name, created_at) VALUES (:name, :created_at)"),
+                    {'name': name, 'created_at': now}
+                ).lastrowid
+            links.append({'resource_id': resource_id, 'tag_id': tag_ids[name]})
+    if links:
+        connection.execute(
+            sa.text("INSERT INTO resource_tags (resource_id, tag_id) VALUES (:resource_id, :tag_id)"),
+            links
+        )
+
+
+def downgrade():
+    op.drop_index('ix_resource_tags_tag_resource', table_name='resource_tags')
+    op.drop_table('resource_tags')
+    op.drop_table('equipment_tags')
@@ -13,6 +13,7 @@ sys.path.insert(0, str(root_path))
 from src.app import create_app
 from src.extensions import db, bcrypt
 from src.models import User, Resource, Booking, ResourceImage
+from src.utils.equipment_tags import sync_resource_tags
 
 def create_users():
     """Create test users with different roles."""
@@ -287,6 +288,8 @@ def create_resources():
         
         # Get the created resource
         resource = Resource.query.filter_by(title=resource_data['title']).first()
+        # Raw SQL bypasses the ORM hook that links equipment tags
+        sync_resource_tags(db.session, [resource])
         
         # Create ResourceImage records for this resource
         images = resource_data.get('images', [])
@@ -3,9 +3,21 @@ Booking Proposer - Handles booking suggestion and proposal flow.
 """
 import re
 from typing import Dict, Optional, Tuple, List
-from datetime import datetime, timedelta
+from datetime import datetime, time, timedelta
 from .database_retriever import DatabaseRetriever
 from .role_filter import RoleFilter
+from ...utils.fuzzy_match import TrigramIndex
+
+# Proposals are searched within these daily hours, up to a week ahead
+PROPOSAL_OPEN_TIME = time(8, 0)
+PROPOSAL_CLOSE_TIME = time(22, 0)
+PROPOSAL_SEARCH_DAYS = 7
+
+DEFAULT_PROPOSAL_TIME = time(10, 0)
+DEFAULT_DURATION_HOURS = 2
+
+WEEKDAYS = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
+TIME_OF_DAY = {'morning': time(9, 0), 'afternoon': time(13, 0), 'evening': time(18, 0)}
 
 
 class BookingProposer:
@@ -48,6 +60,11 @@ class BookingProposer:
         # Extract resource name (look for quoted text or common patterns)
         # Pattern: "book [resource name]" or "reserve [resource name]"
         resource_match = re.search(r'(?:book|reserve|schedule)\s+(?:the\s+)?([A-Z][a-z]+(?:\s+[A-Z][a-z]+)*)', query)
+        if not resource_match:
+            # Lower-case names: everything up to the date/time/duration part
+            resource_match = re.search(
+                r'(?:book|reserve|schedule)\s+(?:the\s+|a\s+|an\s+)?([a-z][\w ]*?)'
+                r'(?=\s+(?:on|at|for|from|this|next|tomorrow|today|in)\b|[?.!,]|$)', query_lower)
         if resource_match:
             intent['resource_name'] = resource_match.group(1)
         
@@ -102,11 +119,7 @@ class BookingProposer:
         # Find matching resource
         resource = None
         if intent['resource_name']:
-            # Try to match by name
-            for r in retrieved_resources:
-                if intent['resource_name'].lower() in r.get('title', '').lower():
-                    resource = r
-                    break
+            resource = self.match_resource(intent['resource_name'], retrieved_resources)
         
         # If no match by name, use first resource from results
         if not resource and retrieved_resources:
@@ -119,13 +132,25 @@ class BookingProposer:
         if not self.role_filter.can_access_resource(resource, user_role):
             return None
         
-        # Check availability
-        availability = self.db_retriever.query_availability(resource['id'])
+        # Offer the first actually-free slot at or after the requested time
+        requested_start = self.resolve_requested_start(intent)
+        duration_hours = int(intent.get('duration') or DEFAULT_DURATION_HOURS)
+        duration = timedelta(hours=duration_hours)
+        slots = self.db_retriever.query_free_slots(
+            resource['id'],
+            requested_start,
+            requested_start + timedelta(days=PROPOSAL_SEARCH_DAYS),
+            min_duration=duration,
+            open_time=PROPOSAL_OPEN_TIME,
+            close_time=PROPOSAL_CLOSE_TIME
+        )
+        proposed_start = slots[0]['start'] if slots else requested_start
+        proposed_end = proposed_start + duration
+        availability = self.db_retriever.query_availability(resource['id'], proposed_start, proposed_end)
         
-        # Propose default time if not specified
-        proposed_date = intent.get('date') or 'tomorrow'
-        proposed_time = intent.get('time') or '10:00 AM'
-        proposed_duration = intent.get('duration') or '2'  # Default 2 hours
+        proposed_date = proposed_start.strftime('%A, %B %d, %Y')
+        proposed_time = proposed_start.strftime('%I:%M %p')
+        proposed_duration = str(duration_hours)
         
         proposal = {
             'resource_id': resource['id'],
@@ -136,12 +161,88 @@ class BookingProposer:
             'proposed_date': proposed_date,
             'proposed_time': proposed_time,
             'proposed_duration': proposed_duration,
-            'available': availability.get('available', False),
+            'proposed_start': proposed_start.isoformat(),
+            'proposed_end': proposed_end.isoformat(),
+            'available': bool(slots),
             'utilization': availability.get('utilization_percent', 0)
         }
         
         return proposal
     
+    def match_resource(self, name: str, retrieved_resources: List[Dict]) -> Optional[Dict]:
+        """
+        Resolve a resource name, tolerating typos ("colaboration lab").
+        
+        Tries, in order: a substring of a retrieved title, the most similar
+        retrieved title, then the most similar title in the whole published
+        catalog.
+        
+        Args:
+            name: Resource name from the query
+            retrieved_resources: List of resources from database retrieval
+        
+        Returns:
+            Resource dictionary or None
+        """
+        for r in retrieved_resources:
+            if name.lower() in r.get('title', '').lower():
+                return r
+        
+        matches = TrigramIndex(
+            (position, 'title', r.get('title')) for position, r in enumerate(retrieved_resources)
+        ).search(name, limit=1)
+        if matches:
+            return retrieved_resources[matches[0].resource_ids[0]]
+        
+        return self.db_retriever.find_resource_by_name(name)
+    
+    def resolve_requested_start(self, intent: Dict, now: Optional[datetime] = None) -> datetime:
+        """
+        Turn the date/time phrases of a booking intent into a concrete start time.
+        
+        Args:
+            intent: Booking intent from extract_booking_intent
+            now: Reference time (defaults to the current time)
+        
+        Returns:
+            Requested start datetime, never in the past
+        """
+        now = now or datetime.utcnow()
+        today = now.date()
+        
+        day = today + timedelta(days=1)
+        date_text = (intent.get('date') or '').strip()
+        if date_text == 'today':
+            day = today
+        elif date_text == 'next week':
+            day = today + timedelta(days=7)
+        elif date_text in WEEKDAYS:
+            day = today + timedelta(days=(WEEKDAYS.index(date_text) - today.weekday()) % 7 or 7)
+        elif date_text and date_text != 'tomorrow':
+            for fmt in ('%m/%d/%Y', '%m/%d/%y', '%m-%d-%Y', '%m-%d-%y'):
+                try:
+                    day = datetime.strptime(date_text, fmt).date()
+                    break
+                except ValueError:
+                    continue
+        
+        start_time = DEFAULT_PROPOSAL_TIME
+        time_text = (intent.get('time') or '').strip()
+        clock_match = re.search(r'(\d{1,2}):?(\d{2})?\s*(am|pm)', time_text)
+        if clock_match:
+            hour = int(clock_match.group(1)) % 12 + (12 if clock_match.group(3) == 'pm' else 0)
+            minute = int(clock_match.group(2) or 0)
+            if hour < 24 and minute < 60:
+                start_time = time(hour, minute)
+        elif time_text in TIME_OF_DAY:
+            start_time = TIME_OF_DAY[time_text]
+        
+        requested_start = datetime.combine(day, start_time)
+        if requested_start < now:
+            # Next full hour
+            requested_start = now.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
+        return requested_start
+    
     def format_booking_proposal(self, proposal: Dict) -> str:
         """
         Format booking proposal as natural language.
@@ -84,6 +84,8 @@ def query():
                 'proposed_date': proposal['proposed_date'],
                 'proposed_time': proposal['proposed_time'],
                 'proposed_duration': proposal['proposed_duration'],
+                'proposed_start': proposal.get('proposed_start'),
+                'proposed_end': proposal.get('proposed_end'),
                 'available': proposal.get('available', False)
             }
         
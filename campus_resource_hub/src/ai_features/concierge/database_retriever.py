@@ -8,10 +8,13 @@ AI agents to query the database.
 import re
 import os
 from typing import List, Dict, Optional
-from datetime import datetime, timedelta
+from datetime import datetime, time, timedelta
 from ...data_access import ResourceDAO, BookingDAO, ReviewDAO
 from ...models.resource import Resource
 from ...models.booking import Booking
+from ...utils.equipment_tags import normalize_tag
+from ...utils.catalog import get_catalog
+from ...utils.fuzzy_match import get_trigram_index
 
 # Try to import MCP client (optional)
 try:
@@ -90,7 +93,29 @@ class DatabaseRetriever:
         
         return keywords
     
-    def query_resources(self, query: str, user_role: str, limit: int = 10) -> List[Dict]:
+    def extract_equipment_tags(self, query: str) -> List[str]:
+        """
+        Find known equipment tags mentioned in a natural language query.
+        
+        Args:
+            query: User query (e.g. "rooms with a projector and whiteboard")
+        
+        Returns:
+            Tag names mentioned in the query (singular or plural)
+        """
+        def words(text):
+            return ' '.join(re.findall(r'\b\w+\b', normalize_tag(text)))
+        
+        text = f' {words(query)} '
+        tags = []
+        for name, _ in self.resource_dao.get_equipment_tags():
+            phrase = words(name)
+            if phrase and (f' {phrase} ' in text or f' {phrase}s ' in text):
+                tags.append(name)
+        return tags
+    
+    def query_resources(self, query: str, user_role: str, limit: int = 10,
+                        tags: Optional[List[str]] = None) -> List[Dict]:
         """
         Query resources based on user query.
         
@@ -100,6 +125,7 @@ class DatabaseRetriever:
             query: User query
             user_role: User role (student, staff, admin)
             limit: Maximum number of results
+            tags: Equipment tags every result must have (optional)
             
         Returns:
             List of resource information dictionaries
@@ -110,7 +136,8 @@ class DatabaseRetriever:
                 mcp_results = self.mcp_client.query_resources(
                     query=query,
                     user_role=user_role,
-                    limit=limit
+                    limit=limit,
+                    tags=tags
                 )
                 if mcp_results:
                     # Enhance MCP results with additional fields from DAL
@@ -131,45 +158,46 @@ class DatabaseRetriever:
         keywords = self.extract_keywords(query)
         keyword_str = ' '.join(keywords) if keywords else ''
         
-        # Get resources based on role
-        if user_role in ['admin', 'staff']:
-            # Staff/admin can see all resources
-            resources = self.resource_dao.search(
-                query=keyword_str if keyword_str else None,
-                category=None,
-                location=None,
-                min_capacity=None
-            )
+        # Full-text search over published resources (any keyword, best matches first)
+        if keyword_str or tags:
+            resources = self.resource_dao.search(query=keyword_str, any_term=True, limit=limit, tags=tags)
         else:
-            # Students only see published resources
-            resources = self.resource_dao.get_published()
-            # Filter by keywords if provided
-            if keyword_str:
-                resources = [r for r in resources if self._matches_keywords(r, keywords)]
+            resources = get_catalog().entries
         
         # Format results
-        results = []
-        for resource in resources[:limit]:
-            results.append({
-                'id': resource.id,
-                'title': resource.title,
-                'description': resource.description or '',
-                'category': resource.category,
-                'location': resource.location or '',
-                'capacity': resource.capacity,
-                'equipment': resource.equipment or '',
-                'average_rating': resource.average_rating(),
-                'review_count': resource.review_count(),
-                'is_available': resource.is_available,
-                'status': resource.status
-            })
-        
-        return results
+        return [self._format_resource(resource) for resource in resources[:limit]]
     
-    def _matches_keywords(self, resource: Resource, keywords: List[str]) -> bool:
-        """Check if resource matches keywords."""
-        search_text = f"{resource.title} {resource.description or ''} {resource.category} {resource.location or ''}".lower()
-        return any(keyword in search_text for keyword in keywords)
+    @staticmethod
+    def _format_resource(resource) -> Dict:
+        """Resource (model or catalog entry) as a result dictionary."""
+        return {
+            'id': resource.id,
+            'title': resource.title,
+            'description': resource.description or '',
+            'category': resource.category,
+            'location': resource.location or '',
+            'capacity': resource.capacity,
+            'equipment': resource.equipment or '',
+            'average_rating': resource.average_rating(),
+            'review_count': resource.review_count(),
+            'is_available': resource.is_available,
+            'status': resource.status
+        }
+    
+    def find_resource_by_name(self, name: str) -> Optional[Dict]:
+        """
+        Find the published resource whose title is closest to a (possibly misspelled) name.
+        
+        Args:
+            name: Resource name as typed by the user
+        
+        Returns:
+            Resource dictionary, or None if no title is similar enough
+        """
+        matches = get_trigram_index().search(name, limit=1, kinds=['title'])
+        if not matches:
+            return None
+        return self._format_resource(get_catalog().get(matches[0].resource_ids[0]))
     
     def query_availability(self, resource_id: int, start_date: Optional[datetime] = None, 
                           end_date: Optional[datetime] = None) -> Dict:
@@ -190,27 +218,49 @@ class DatabaseRetriever:
         
         # Get bookings for this resource
         if start_date and end_date:
-            bookings = self.booking_dao.get_by_date_range(start_date, end_date)
-            bookings = [b for b in bookings if b.resource_id == resource_id and b.status in ['pending', 'active']]
+            # Peak simultaneous occupancy within the window
+            booked_count = self.booking_dao.max_concurrency(resource_id, start_date, end_date)
         else:
-            bookings = self.booking_dao.get_active_by_resource(resource_id)
+            booked_count = len(self.booking_dao.get_active_by_resource(resource_id))
         
         # Check capacity
         if resource.capacity:
-            available = len(bookings) < resource.capacity
-            utilization = len(bookings) / resource.capacity * 100
+            available = booked_count < resource.capacity
+            utilization = booked_count / resource.capacity * 100
         else:
-            available = len(bookings) == 0
+            available = booked_count == 0
             utilization = 100 if not available else 0
         
         return {
             'available': available,
-            'booked_count': len(bookings),
+            'booked_count': booked_count,
             'capacity': resource.capacity,
             'utilization_percent': round(utilization, 1),
             'resource': resource.title
         }
     
+    def query_free_slots(self, resource_id: int, start_date: datetime, end_date: datetime,
+                         min_duration: timedelta = timedelta(0),
+                         open_time: Optional[time] = None,
+                         close_time: Optional[time] = None) -> List[Dict]:
+        """
+        Query free time slots for a resource.
+        
+        Args:
+            resource_id: Resource ID
+            start_date: Window start
+            end_date: Window end
+            min_duration: Minimum slot length
+            open_time: Optional daily opening time
+            close_time: Optional daily closing time
+        
+        Returns:
+            List of {'start': datetime, 'end': datetime} slots
+        """
+        slots = self.booking_dao.free_slots(resource_id, start_date, end_date, min_duration,
+                                            open_time=open_time, close_time=close_time)
+        return [{'start': start, 'end': end} for start, end in slots]
+    
     def query_popular_resources(self, days: int = 30, limit: int = 5) -> List[Dict]:
         """
         Get most popular resources based on booking count.
@@ -258,21 +308,17 @@ class DatabaseRetriever:
         Returns:
             List of top-rated resources
         """
-        # Get all published resources with reviews
-        resources = self.resource_dao.get_published()
-        resources_with_reviews = [(r, r.average_rating(), r.review_count()) 
-                                 for r in resources if r.review_count() > 0]
-        
-        # Sort by rating
-        resources_with_reviews.sort(key=lambda x: x[1], reverse=True)
+        # Published resources with reviews, already ranked in the catalog snapshot
+        catalog = get_catalog()
         
         results = []
-        for resource, rating, review_count in resources_with_reviews[:limit]:
+        for resource_id in catalog.rating_ranking[:limit]:
+            resource = catalog.get(resource_id)
             results.append({
                 'id': resource.id,
                 'title': resource.title,
-                'average_rating': rating,
-                'review_count': review_count,
+                'average_rating': resource.average_rating(),
+                'review_count': resource.review_count(),
                 'category': resource.category,
                 'location': resource.location or ''
             })
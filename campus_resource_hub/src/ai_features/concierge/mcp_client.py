@@ -38,7 +38,9 @@ class MCPClient:
         query: str,
         user_role: str = 'student',
         limit: int = 10,
-        category: Optional[str] = None
+        category: Optional[str] = None,
+        tags: Optional[List[str]] = None,
+        tag_match: str = 'all'
     ) -> List[Dict[str, Any]]:
         """
         Query resources using MCP.
@@ -48,6 +50,8 @@ class MCPClient:
             user_role: User role for filtering
             limit: Maximum results
             category: Optional category filter
+            tags: Optional equipment tags the resources must have
+            tag_match: 'all' to require every tag, 'any' for at least one
             
         Returns:
             List of resource dictionaries
@@ -61,7 +65,9 @@ class MCPClient:
                 'query': query,
                 'user_role': user_role,
                 'limit': limit,
-                'category': category
+                'category': category,
+                'tags': tags,
+                'tag_match': tag_match
             })
             
             if response.get('success'):
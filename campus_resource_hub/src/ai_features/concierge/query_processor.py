@@ -90,12 +90,16 @@ class QueryProcessor:
         if any(word in query for word in ['weekend', 'weekday', 'monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday', 'morning', 'afternoon', 'evening', 'typically', 'usually']):
             return 'temporal'
         
+        # Equipment queries ("rooms with a projector") are answered from equipment tags
+        if any(word in query for word in ['equipment', 'projector', 'whiteboard']):
+            return 'category'
+        
         # Location queries
         if any(word in query for word in ['location', 'where', 'building', 'room']):
             return 'location'
         
         # Category queries
-        if any(word in query for word in ['category', 'type', 'kind', 'equipment', 'projector', 'whiteboard']):
+        if any(word in query for word in ['category', 'type', 'kind']):
             return 'category'
         
         # Default: general information query
@@ -139,6 +143,14 @@ class QueryProcessor:
             popular = self.db_retriever.query_popular_resources(days=30, limit=5)
             results.extend(popular)
         
+        elif query_type == 'category':
+            # Equipment questions ("rooms with a projector and whiteboard") filter on tags
+            tags = self.db_retriever.extract_equipment_tags(query)
+            if tags:
+                results.extend(self.db_retriever.query_resources('', user_role, limit=10, tags=tags))
+            if not results:
+                results.extend(self.db_retriever.query_resources(query, user_role, limit=10))
+        
         elif query_type == 'booking':
             # Get resources that match booking query
             resource_results = self.db_retriever.query_resources(query, user_role, limit=10)
@@ -25,6 +25,9 @@ from ..data_access import ResourceDAO, BookingDAO, ReviewDAO
 from ..models.resource import Resource
 from ..models.booking import Booking
 from ..models.review import Review
+from ..utils.resource_search import apply_text_search
+from ..utils.equipment_tags import apply_tag_filter
+from ..utils.catalog import get_catalog
 
 logger = logging.getLogger(__name__)
 
@@ -68,7 +71,9 @@ class MCPServer:
         query: str, 
         user_role: str = 'student',
         limit: int = 10,
-        category: Optional[str] = None
+        category: Optional[str] = None,
+        tags: Optional[List[str]] = None,
+        tag_match: str = 'all'
     ) -> List[Dict[str, Any]]:
         """
         Query resources using MCP protocol.
@@ -78,6 +83,8 @@ class MCPServer:
             user_role: User role for filtering (student, staff, admin)
             limit: Maximum number of results
             category: Optional category filter
+            tags: Optional equipment tags the resources must have
+            tag_match: 'all' to require every tag, 'any' for at least one
             
         Returns:
             List of resource dictionaries
@@ -103,19 +110,18 @@ class MCPServer:
                         Resource.category == category
                     )
                 
-                # Keyword search
-                if keywords:
-                    from sqlalchemy import or_
-                    conditions = []
-                    for keyword in keywords:
-                        conditions.append(Resource.title.ilike(f'%{keyword}%'))
-                        conditions.append(Resource.description.ilike(f'%{keyword}%'))
-                        conditions.append(Resource.location.ilike(f'%{keyword}%'))
-                    if conditions:
-                        resources_query = resources_query.filter(or_(*conditions))
+                # Equipment tag filter
+                resources_query = apply_tag_filter(resources_query, tags, match_all=tag_match != 'any')
                 
-                # Execute query
-                resources = resources_query.limit(limit).all()
+                # Keyword search (any keyword, best matches first)
+                resources_query, relevance = apply_text_search(
+                    resources_query, ' '.join(keywords), any_term=True
+                )
+                if relevance is not None:
+                    resources_query = resources_query.order_by(relevance, Resource.id)
+                
+                # Execute query (images for all results in one query)
+                resources = self.resource_dao.attach_images(resources_query.limit(limit).all())
                 
                 # Format results
                 results = []
@@ -164,7 +170,10 @@ class MCPServer:
         """
         with self._get_app_context():
             try:
-                resource = self.resource_dao.get_by_id(resource_id)
+                # Published resources (all a student may see) come from the catalog snapshot
+                resource = get_catalog().get(resource_id)
+                if resource is None and user_role != 'student':
+                    resource = self.resource_dao.get_by_id(resource_id)
                 
                 if not resource:
                     return None
@@ -350,7 +359,9 @@ class MCPServer:
                         query=params.get('query', ''),
                         user_role=params.get('user_role', 'student'),
                         limit=params.get('limit', 10),
-                        category=params.get('category')
+                        category=params.get('category'),
+                        tags=params.get('tags'),
+                        tag_match=params.get('tag_match', 'all')
                     )
                 }
             elif method == 'get_resource':
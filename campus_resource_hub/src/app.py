@@ -81,11 +81,43 @@ def create_app(config_name='default'):
     app.register_blueprint(notification_bp)
     app.register_blueprint(concierge_bp)
     
+    @app.cli.command('repair-ratings')
+    def repair_ratings():
+        """Recompute every resource's stored rating aggregates."""
+        import click
+        from .data_access import ResourceDAO
+        repaired = ResourceDAO().recompute_ratings()
+        click.echo(f'Repaired rating aggregates on {repaired} resource(s).')
+    
+    @app.cli.command('rebuild-tags')
+    def rebuild_tags():
+        """Re-link every resource's equipment tags from its equipment text."""
+        import click
+        from .data_access import ResourceDAO
+        rebuilt = ResourceDAO().rebuild_equipment_tags()
+        click.echo(f'Rebuilt equipment tags on {rebuilt} resource(s).')
+    
+    @app.cli.command('prune-booking-changes')
+    def prune_booking_changes():
+        """Delete calendar sync change log entries older than BOOKING_CHANGES_RETENTION_DAYS."""
+        import click
+        from datetime import datetime, timedelta
+        from .data_access import BookingDAO
+        cutoff = datetime.utcnow() - timedelta(days=app.config.get('BOOKING_CHANGES_RETENTION_DAYS', 30))
+        pruned = BookingDAO().prune_changes(cutoff)
+        click.echo(f'Pruned {pruned} booking change(s).')
+    
     # Import all models to ensure they're registered with SQLAlchemy
-    from .models import User, Resource, Booking, Message, Waitlist, Review, AdminLog, ResourceImage, Notification, CalendarSubscription
+    from .models import User, Resource, Booking, BookingChange, Message, Waitlist, Review, AdminLog, ResourceImage, Notification, CalendarSubscription, EquipmentTag, CatalogVersion
     
     # Create database tables if they don't exist
+    from .utils.resource_search import ensure_search_index
+    from .utils.suggest_index import warm_suggest_indexes
     with app.app_context():
         db.create_all()
+        # Full-text index for resource search (created by triggers-backed FTS5 on SQLite)
+        ensure_search_index(db.engine)
+        # In-memory typeahead indexes (resource names, message recipients)
+        warm_suggest_indexes()
     
     return app
\ No newline at end of file
@@ -22,6 +22,38 @@ class Config:
     UPLOAD_FOLDER = os.path.join(basedir, 'src', 'static', 'uploads')
     ALLOWED_EXTENSIONS = {'jpg', 'jpeg', 'png', 'gif', 'webp'}
     
+    # Seconds before a cached per-resource booking interval index is reloaded
+    BOOKING_INDEX_TTL = int(os.environ.get('BOOKING_INDEX_TTL', 60))
+    
+    # Occupancy heatmap horizon (days before/after today) and reload interval in seconds
+    OCCUPANCY_PAST_DAYS = int(os.environ.get('OCCUPANCY_PAST_DAYS', 35))
+    OCCUPANCY_FUTURE_DAYS = int(os.environ.get('OCCUPANCY_FUTURE_DAYS', 63))
+    OCCUPANCY_TTL = int(os.environ.get('OCCUPANCY_TTL', 300))
+    
+    # Seconds between checks of the shared catalog version for writes by other workers (0 = every read)
+    CATALOG_VERSION_CHECK_SECONDS = int(os.environ.get('CATALOG_VERSION_CHECK_SECONDS', 2))
+    
+    # Seconds before the in-memory recipient typeahead index is reloaded for other workers' user changes
+    # (0 = only on changes in this process; the resource index follows the catalog version)
+    SUGGEST_INDEX_TTL = int(os.environ.get('SUGGEST_INDEX_TTL', 300))
+    
+    # Rendered iCal subscription feeds kept in memory per process (0 disables the cache)
+    ICAL_FEED_CACHE_SIZE = int(os.environ.get('ICAL_FEED_CACHE_SIZE', 256))
+    # Larger feeds are streamed on every full request instead of being cached
+    ICAL_FEED_CACHE_MAX_BYTES = int(os.environ.get('ICAL_FEED_CACHE_MAX_BYTES', 1024 * 1024))
+    
+    # Seconds a calendar window's events are served from memory, and windows kept per process (0 disables)
+    CALENDAR_CACHE_TTL = int(os.environ.get('CALENDAR_CACHE_TTL', 30))
+    CALENDAR_CACHE_SIZE = int(os.environ.get('CALENDAR_CACHE_SIZE', 512))
+    # Days of booking changes kept for calendar delta sync (older sync tokens refetch in full)
+    BOOKING_CHANGES_RETENTION_DAYS = int(os.environ.get('BOOKING_CHANGES_RETENTION_DAYS', 30))
+    
+    # Seconds between batched writes of subscription access counts (0 = write on every access)
+    ACCESS_STATS_FLUSH_SECONDS = int(os.environ.get('ACCESS_STATS_FLUSH_SECONDS', 30))
+    
+    # Number of striped locks serializing booking admission per resource
+    BOOKING_LOCK_STRIPES = int(os.environ.get('BOOKING_LOCK_STRIPES', 64))
+    
     # OpenAI API Configuration
     OPENAI_API_KEY = os.environ.get('OPENAI_API_KEY')
     OPENAI_MODEL = os.environ.get('OPENAI_MODEL', 'gpt-4o-mini')
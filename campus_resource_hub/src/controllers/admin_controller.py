@@ -14,6 +14,11 @@ from ..models.resource_image import ResourceImage
 from ..models.waitlist import Waitlist
 from ..forms import AdminUserForm, AdminResourceForm, AdminBookingForm, AdminWaitlistForm
 from ..extensions import db, bcrypt
+from ..data_access import BookingDAO
+from ..utils.booking_admission import admit_bookings
+from ..utils.booking_index import BLOCKING_STATUSES
+from ..utils.recurrence import expand_rule, series_fields
+from .resource_controller import check_series_availability
 from sqlalchemy import func, and_
 
 admin_bp = Blueprint('admin', __name__, url_prefix='/admin')
@@ -377,6 +382,29 @@ def create_booking():
         return redirect(url_for('admin.bookings'))
     return render_template('admin/booking_form.html', form=form, title='Create Booking')
 
+def reschedule_series(booking, old_starts):
+    """Re-key a rule-based series' exceptions after its timing or resource changed.
+    
+    Cancelled occurrences stay cancelled at their new starts. Every other new
+    occurrence is checked for availability and conflicting ones are skipped,
+    as when the series was booked; a conflict on the first one raises
+    ValueError."""
+    occurrences = expand_rule(booking.recurrence_rule, booking.start_date,
+                              booking.end_date) if booking.recurrence_rule else []
+    cancelled = set(BookingDAO().reschedule_exceptions(booking.id, old_starts,
+                                                       [start for start, _ in occurrences]))
+    occurrences = [occurrence for occurrence in occurrences if occurrence[0] not in cancelled]
+    if not occurrences or booking.status not in BLOCKING_STATUSES:
+        return
+    
+    reasons = check_series_availability(Resource.query.get(booking.resource_id), occurrences,
+                                        exclude_booking_id=booking.id)
+    if reasons[0] and occurrences[0][0] == booking.start_date:
+        raise ValueError('The first occurrence conflicts with another booking.')
+    BookingDAO().add_exceptions(booking.id, [
+        start for (start, _), reason in zip(occurrences, reasons) if reason
+    ], reason='skipped')
+
 @admin_bp.route('/bookings/<int:id>/edit', methods=['GET', 'POST'])
 @login_required
 @staff_or_admin_required
@@ -412,6 +440,10 @@ def edit_booking(id):
         
         # Store old status for comparison
         old_status = booking.status
+        # Timing before the edit; a rule-based series' exceptions are keyed to it
+        old_timing = (booking.resource_id, booking.start_date, booking.end_date, booking.recurrence_rule)
+        old_starts = [start for start, _ in expand_rule(booking.recurrence_rule, booking.start_date,
+                                                        booking.end_date)] if booking.recurrence_rule else []
         
         # Update booking fields
         booking.user_id = form.user_id.data
@@ -432,8 +464,19 @@ def edit_booking(id):
         elif not recurrence_type:
             booking.recurrence_end_date = None
         
+        # Rule-based series are re-derived in place (one row, whatever the length);
+        # legacy series stored as child rows keep their rows
+        if booking.parent_booking_id is None and not booking.child_bookings:
+            for field, value in series_fields(booking.start_date, booking.end_date,
+                                              recurrence_type, booking.recurrence_end_date).items():
+                setattr(booking, field, value)
+        
         try:
-            db.session.commit()
+            with admit_bookings(booking.resource_id):
+                new_timing = (booking.resource_id, booking.start_date, booking.end_date, booking.recurrence_rule)
+                if (booking.recurrence_rule or old_timing[3]) and new_timing != old_timing:
+                    reschedule_series(booking, old_starts)
+                db.session.commit()
             # Refresh the booking object to ensure we have the latest data
             db.session.refresh(booking)
             
@@ -514,6 +557,32 @@ def delete_booking(id):
     flash('Booking deleted successfully.', 'success')
     return redirect(url_for('admin.bookings'))
 
+@admin_bp.route('/bookings/<int:id>/cancel-series', methods=['POST'])
+@login_required
+@staff_or_admin_required
+def cancel_booking_series(id):
+    """Cancel every remaining occurrence of a recurring booking series."""
+    booking = Booking.query.get_or_404(id)
+    # Children point at the parent, which owns the series
+    parent_id = booking.parent_booking_id or booking.id
+    parent = Booking.query.get_or_404(parent_id)
+    
+    try:
+        affected = BookingDAO().cancel_series(parent.id)
+        cancelled_count = sum(row[2] for row in affected)
+        
+        # One summarizing notification per booker/owner; this commits the cancellation
+        from ..utils.notifications import notify_series_cancelled
+        notify_series_cancelled(parent, affected, cancelled_by_user=False)
+    except Exception as e:
+        db.session.rollback()
+        flash(f'Error cancelling booking series: {str(e)}', 'danger')
+        return redirect(url_for('admin.bookings'))
+    
+    log_admin_action('Cancel booking series', 'bookings', f'Cancelled {cancelled_count} booking(s) in series (parent ID: {parent.id})')
+    flash(f'Cancelled {cancelled_count} booking(s) in the recurring series.', 'success')
+    return redirect(url_for('admin.bookings'))
+
 @admin_bp.route('/reports')
 @login_required
 @admin_required
@@ -709,6 +778,25 @@ def reports():
         ]
     }
     
+    # 12-13. Time-based utilization from the occupancy matrices (last 30 days)
+    booking_dao = BookingDAO()
+    utilization_days = min(30, current_app.config.get('OCCUPANCY_PAST_DAYS', 35))
+    utilization_start = (datetime.utcnow() - timedelta(days=utilization_days)).date()
+    published_resources = db.session.query(Resource.id, Resource.title).filter(
+        Resource.status == 'published'
+    ).all()
+    published_ids = [resource_id for resource_id, _ in published_resources]
+    utilization_by_resource = booking_dao.get_utilization(published_ids, utilization_start, utilization_days)
+    top_utilized = sorted(published_resources, key=lambda r: utilization_by_resource[r[0]], reverse=True)[:10]
+    resource_utilization_data = {
+        'resources': [title for _, title in top_utilized],
+        'percents': [utilization_by_resource[resource_id] for resource_id, _ in top_utilized]
+    }
+    time_of_day_utilization_data = {
+        'hours': [f'{hour:02d}:00' for hour in range(24)],
+        'percents': booking_dao.get_hourly_utilization(published_ids, utilization_start, utilization_days)
+    }
+    
     return render_template('admin/reports.html',
                          resources_status_data=resources_status_data,
                          bookings_timeline_data=bookings_timeline_data,
@@ -720,7 +808,9 @@ def reports():
                          bookings_by_department_data=bookings_by_department_data,
                          resource_usage_by_dept_data=resource_usage_by_dept_data,
                          dept_trends_data=dept_trends_data,
-                         dept_role_data=dept_role_data)
+                         dept_role_data=dept_role_data,
+                         resource_utilization_data=resource_utilization_data,
+                         time_of_day_utilization_data=time_of_day_utilization_data)
 
 # ========== MESSAGE MANAGEMENT ==========
 @admin_bp.route('/messages')
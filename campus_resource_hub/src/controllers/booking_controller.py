@@ -1,23 +1,25 @@
 # AI Contribution: Generated initial scaffold, verified by team.
-from flask import Blueprint, render_template, abort, request, redirect, url_for, flash, jsonify, Response
+from flask import Blueprint, render_template, abort, request, redirect, url_for, flash, jsonify, Response, stream_with_context, current_app
 from flask_login import login_required, current_user
 from datetime import datetime, timedelta, timezone
 from ..models.booking import Booking
 from ..models.waitlist import Waitlist
 from ..extensions import db, csrf
 from ..data_access import BookingDAO, WaitlistDAO, CalendarSubscriptionDAO
-try:
-    from icalendar import Calendar, Event
-    ICALENDAR_AVAILABLE = True
-except ImportError as e:
-    Calendar = None
-    Event = None
-    ICALENDAR_AVAILABLE = False
-    import logging
-    logging.warning(f"icalendar package not available: {e}")
+from ..utils.calendar_events import cached_events, compact_json, parse_window, user_events
+from ..utils.catalog import get_catalog
+from ..utils.ical_feed import feed_version, get_feed_cache
+from ..utils.ical_stream import stream_calendar
+from werkzeug.http import is_resource_modified
 
 booking_bp = Blueprint('booking', __name__, url_prefix='/bookings')
 
+# Occurrences of a rule-based series listed on its details page
+UPCOMING_OCCURRENCES = 10
+
+# Changed bookings sent as a calendar delta; more than this and the client refetches in full
+CALENDAR_MAX_CHANGES = 500
+
 # Initialize DAOs
 booking_dao = BookingDAO()
 waitlist_dao = WaitlistDAO()
@@ -57,13 +59,19 @@ def details(id):
     if booking.parent_booking_id:
         return redirect(url_for('booking.details', id=booking.parent_booking_id))
     
-    # Get child bookings count for display
+    # Get child bookings count for display (legacy series stored as rows)
     child_bookings = booking_dao.get_recurring_children(booking.id) if booking.recurrence_type else []
     
+    # Rule-based series: show the next few occurrences, expanded on demand
+    upcoming_occurrences = []
+    if booking.recurrence_rule:
+        upcoming_occurrences = booking.occurrences(window_start=datetime.utcnow())[:UPCOMING_OCCURRENCES]
+    
     # Create form for cancel action
     cancel_form = CancelBookingForm()
     
-    return render_template('bookings/details.html', booking=booking, child_bookings=child_bookings, cancel_form=cancel_form)
+    return render_template('bookings/details.html', booking=booking, child_bookings=child_bookings,
+                           upcoming_occurrences=upcoming_occurrences, cancel_form=cancel_form)
 
 @booking_bp.route('/<int:id>/cancel', methods=['POST'])
 @login_required
@@ -91,28 +99,14 @@ def cancel(id):
             if parent_booking:
                 booking = parent_booking  # Cancel from the parent
         
-        # Cancel the parent booking
-        booking.status = 'cancelled'
-        db.session.flush()
-        
-        # If this is a recurring booking (has recurrence_type), cancel all child bookings
+        # If this is a recurring booking (has recurrence_type), cancel the whole series
         if booking.recurrence_type:
-            child_bookings = booking_dao.get_recurring_children(booking.id)
-            cancelled_count = 1  # Count the parent
-            for child in child_bookings:
-                if child.status not in ['cancelled', 'completed']:
-                    child.status = 'cancelled'
-                    cancelled_count += 1
-                    # Send notification for each cancelled child booking
-                    from ..utils.notifications import notify_booking_cancelled
-                    notify_booking_cancelled(child, cancelled_by_user=True)
+            affected = booking_dao.cancel_series(booking.id)
+            cancelled_count = sum(row[2] for row in affected)
             
-            # Commit all cancellations
-            db.session.commit()
-            
-            # Send notification for parent booking
-            from ..utils.notifications import notify_booking_cancelled
-            notify_booking_cancelled(booking, cancelled_by_user=True)
+            # One summarizing notification per booker/owner; this commits the cancellation
+            from ..utils.notifications import notify_series_cancelled
+            notify_series_cancelled(booking, affected, cancelled_by_user=True)
             
             if cancelled_count > 1:
                 flash(f'Successfully cancelled recurring booking series ({cancelled_count} instances).', 'success')
@@ -120,6 +114,7 @@ def cancel(id):
                 flash('Booking cancelled successfully.', 'success')
         else:
             # Single booking (not recurring)
+            booking.status = 'cancelled'
             db.session.commit()
             from ..utils.notifications import notify_booking_cancelled
             notify_booking_cancelled(booking, cancelled_by_user=True)
@@ -133,6 +128,35 @@ def cancel(id):
         flash(f'An error occurred while cancelling the booking: {str(e)}', 'error')
         return redirect(url_for('booking.details', id=id))
 
+@booking_bp.route('/<int:id>/occurrences/cancel', methods=['POST'])
+@login_required
+def cancel_occurrence(id):
+    """Cancel a single occurrence of a rule-based recurring series."""
+    booking = booking_dao.get_or_404(id)
+    
+    if booking.user_id != current_user.id:
+        abort(403)
+    
+    try:
+        occurrence_start = datetime.fromisoformat(request.form.get('occurrence_start', ''))
+    except ValueError:
+        abort(400)
+    
+    # Only real, still-scheduled occurrences of a live series can be cancelled
+    if (not booking.recurrence_rule or booking.status not in ['pending', 'active']
+            or occurrence_start not in [start for start, _ in booking.occurrences(
+                occurrence_start, occurrence_start + timedelta(seconds=1))]):
+        flash('That occurrence cannot be cancelled.', 'warning')
+        return redirect(url_for('booking.details', id=id))
+    
+    booking_dao.add_exceptions(booking.id, [occurrence_start], reason='cancelled')
+    db.session.commit()
+    
+    from ..utils.notifications import notify_occurrence_cancelled
+    notify_occurrence_cancelled(booking, occurrence_start)
+    flash(f"Cancelled the {occurrence_start.strftime('%Y-%m-%d %I:%M %p')} occurrence.", 'success')
+    return redirect(url_for('booking.details', id=id))
+
 @booking_bp.route('/waitlist/<int:id>')
 @login_required
 def waitlist_details(id):
@@ -173,280 +197,86 @@ def calendar():
 @booking_bp.route('/calendar/json')
 @login_required
 def calendar_json():
-    """Return user's bookings as JSON for FullCalendar."""
-    # Get filter parameters
+    """Return user's bookings in the visible window (start/end, optional status) as JSON for FullCalendar."""
     status_filter = request.args.get('status', '')
-    start_date = request.args.get('start', '')
-    end_date = request.args.get('end', '')
-    
-    # Get bookings using DAL
-    if start_date and end_date:
-        try:
-            start_dt = datetime.fromisoformat(start_date.replace('Z', '+00:00'))
-            end_dt = datetime.fromisoformat(end_date.replace('Z', '+00:00'))
-            bookings = booking_dao.get_by_date_range(start_dt, end_dt, user_id=current_user.id)
-        except ValueError:
-            # Invalid date format, get all user bookings
-            bookings = booking_dao.get_by_user(current_user.id, status=status_filter)
-    else:
-        bookings = booking_dao.get_by_user(current_user.id, status=status_filter)
-    
-    # Format as FullCalendar events
-    events = []
-    for booking in bookings:
-        # Determine color based on status
-        color_map = {
-            'active': '#28a745',
-            'pending': '#ffc107',
-            'completed': '#17a2b8',
-            'cancelled': '#dc3545'
-        }
-        color = color_map.get(booking.status, '#6c757d')
-        
-        events.append({
-            'id': booking.id,
-            'title': f"{booking.resource.title} - {booking.status.title()}",
-            'start': booking.start_date.isoformat() if booking.start_date else None,
-            'end': booking.end_date.isoformat() if booking.end_date else None,
-            'color': color,
-            'textColor': '#ffffff',
-            'extendedProps': {
-                'resource_id': booking.resource_id,
-                'resource_title': booking.resource.title,
-                'resource_category': booking.resource.category,
-                'resource_location': booking.resource.location or '',
-                'status': booking.status,
-                'notes': booking.notes or 'No notes'
-            }
-        })
+    try:
+        start_dt, end_dt = parse_window(request.args.get('start'), request.args.get('end'))
+    except ValueError as exc:
+        return jsonify({'error': f'Invalid start or end parameter: {exc}'}), 400
+    
+    # Rule-based series expand to the window; cached per window until the user's bookings
+    # (or the catalog, for resource titles) change
+    key = (('user', current_user.id), status_filter, start_dt, end_dt,
+           current_user.bookings_updated_at, get_catalog().version)
+    body = cached_events(key, lambda: user_events(booking_dao.get_calendar_window(
+        start_dt, end_dt, user_id=current_user.id, statuses=[status_filter] if status_filter else None)))
+    return current_app.response_class(body, mimetype='application/json')
+
+@booking_bp.route('/calendar/changes')
+@login_required
+def calendar_changes():
+    """Return the user's bookings changed since a sync token (since), for the visible window (start/end).
     
-    return jsonify(events)
+    Each changed booking comes with its events in the window, none if it left
+    it; ``reset`` tells the client to refetch in full (first sync, or a token
+    older than the change log)."""
+    since = request.args.get('since', type=int)
+    try:
+        start_dt, end_dt = parse_window(request.args.get('start'), request.args.get('end'))
+    except ValueError as exc:
+        return jsonify({'error': f'Invalid start or end parameter: {exc}'}), 400
+    
+    token, booking_ids = booking_dao.get_changes_since(current_user.id, since)
+    if booking_ids is None or len(booking_ids) > CALENDAR_MAX_CHANGES:
+        return jsonify({'token': token, 'reset': True})
+    
+    events = {booking_id: [] for booking_id in booking_ids}
+    if booking_ids:
+        for calendar_event in user_events(booking_dao.get_calendar_window(
+                start_dt, end_dt, user_id=current_user.id, booking_ids=booking_ids)):
+            events[calendar_event['id']].append(calendar_event)
+    body = compact_json({'token': token, 'changes': [{'id': booking_id, 'events': booking_events}
+                                                     for booking_id, booking_events in events.items()]})
+    return current_app.response_class(body, mimetype='application/json')
 
 @booking_bp.route('/export/ical')
 @login_required
 def export_ical():
-    """Export user's bookings as iCal file."""
-    if not ICALENDAR_AVAILABLE:
-        flash('iCal export is not available. Please install icalendar package and restart the application.', 'error')
-        return redirect(url_for('booking.calendar'))
-    
+    """Export user's bookings as iCal file (streamed, so any history size fits in memory)."""
     # Get filter parameters
     status_filter = request.args.get('status', '')
     start_date_str = request.args.get('start_date', '')
     end_date_str = request.args.get('end_date', '')
     
-    # Get bookings using DAL
-    if start_date_str and end_date_str:
-        try:
-            start_dt = datetime.strptime(start_date_str, '%Y-%m-%d')
-            end_dt = datetime.strptime(end_date_str, '%Y-%m-%d')
-            end_dt = end_dt.replace(hour=23, minute=59, second=59)
-            bookings = booking_dao.get_by_date_range(start_dt, end_dt, user_id=current_user.id)
-        except ValueError:
-            bookings = booking_dao.get_by_user(current_user.id, status=status_filter)
-    elif start_date_str:
+    # Date range filter (the status filter applies when there is none)
+    window = {}
+    if start_date_str:
         try:
             start_dt = datetime.strptime(start_date_str, '%Y-%m-%d')
-            end_dt = datetime.utcnow() + timedelta(days=365)  # Default to 1 year ahead
-            bookings = booking_dao.get_by_date_range(start_dt, end_dt, user_id=current_user.id)
+            if end_date_str:
+                end_dt = datetime.strptime(end_date_str, '%Y-%m-%d').replace(hour=23, minute=59, second=59)
+            else:
+                end_dt = datetime.utcnow() + timedelta(days=365)  # Default to 1 year ahead
+            window = {'start_date': start_dt, 'end_date': end_dt}
         except ValueError:
-            bookings = booking_dao.get_by_user(current_user.id, status=status_filter)
-    else:
-        bookings = booking_dao.get_by_user(current_user.id, status=status_filter)
-    
-    # Create iCal calendar
-    cal = Calendar()
-    cal.add('prodid', '-//Campus Resource Hub//Booking Calendar//EN')
-    cal.add('version', '2.0')
-    cal.add('calscale', 'GREGORIAN')
-    cal.add('method', 'PUBLISH')
-    cal.add('X-WR-CALNAME', f'{current_user.username}\'s Bookings')
-    cal.add('X-WR-CALDESC', 'Bookings from Campus Resource Hub')
-    cal.add('X-WR-TIMEZONE', 'UTC')
-    
-    # Add each booking as an event
-    for booking in bookings:
-        event = Event()
-        event.add('uid', f'booking-{booking.id}@campus-resource-hub')
-        event.add('summary', f'{booking.resource.title} - {booking.status.title()}')
-        
-        # Description with booking details
-        description = f"Resource: {booking.resource.title}\n"
-        description += f"Category: {booking.resource.category}\n"
-        if booking.resource.location:
-            description += f"Location: {booking.resource.location}\n"
-        description += f"Status: {booking.status.title()}\n"
-        if booking.notes:
-            description += f"Notes: {booking.notes}\n"
-        description += f"Booking ID: {booking.id}"
-        
-        event.add('description', description)
-        
-        # Start and end times (convert to UTC if needed)
-        if booking.start_date:
-            start_utc = booking.start_date
-            if start_utc.tzinfo is None:
-                start_utc = start_utc.replace(tzinfo=timezone.utc)
-            event.add('dtstart', start_utc)
-        
-        if booking.end_date:
-            end_utc = booking.end_date
-            if end_utc.tzinfo is None:
-                end_utc = end_utc.replace(tzinfo=timezone.utc)
-            event.add('dtend', end_utc)
-        
-        # Location
-        if booking.resource.location:
-            event.add('location', booking.resource.location)
-        
-        # Status
-        status_map = {
-            'active': 'CONFIRMED',
-            'pending': 'TENTATIVE',
-            'completed': 'CONFIRMED',
-            'cancelled': 'CANCELLED'
-        }
-        event.add('status', status_map.get(booking.status, 'CONFIRMED'))
-        
-        # Recurrence rule if applicable
-        if booking.recurrence_type and booking.recurrence_end_date:
-            freq_map = {
-                'daily': 'DAILY',
-                'weekly': 'WEEKLY',
-                'monthly': 'MONTHLY'
-            }
-            freq = freq_map.get(booking.recurrence_type, 'WEEKLY')
-            until = booking.recurrence_end_date
-            if until.tzinfo is None:
-                until = until.replace(tzinfo=timezone.utc)
-            event.add('rrule', {
-                'FREQ': freq,
-                'UNTIL': until
-            })
-        
-        # Last modified
-        if booking.updated_at:
-            last_modified = booking.updated_at
-            if last_modified.tzinfo is None:
-                last_modified = last_modified.replace(tzinfo=timezone.utc)
-            event.add('last-modified', last_modified)
-        elif booking.created_at:
-            created = booking.created_at
-            if created.tzinfo is None:
-                created = created.replace(tzinfo=timezone.utc)
-            event.add('last-modified', created)
-        
-        # Organizer (user)
-        event.add('organizer', f'MAILTO:{current_user.email}')
-        
-        cal.add_component(event)
+            pass
     
-    # Generate iCal file
-    ical_content = cal.to_ical()
+    chunks = booking_dao.iter_ical_chunks(current_user.id, status=None if window else status_filter, **window)
+    ical_content = stream_calendar(current_user.username, current_user.email, chunks)
     
     # Create response
-    response = Response(ical_content, mimetype='text/calendar')
+    response = Response(stream_with_context(ical_content), mimetype='text/calendar')
     response.headers['Content-Disposition'] = f'attachment; filename="bookings_{current_user.username}_{datetime.now().strftime("%Y%m%d")}.ics"'
     response.headers['Content-Type'] = 'text/calendar; charset=utf-8'
     
     return response
 
-def generate_ical_calendar(user, bookings):
-    """Helper function to generate iCal calendar from bookings."""
-    if Calendar is None or Event is None:
-        return None
-    
-    cal = Calendar()
-    cal.add('prodid', '-//Campus Resource Hub//Booking Calendar//EN')
-    cal.add('version', '2.0')
-    cal.add('calscale', 'GREGORIAN')
-    cal.add('method', 'PUBLISH')
-    cal.add('X-WR-CALNAME', f'{user.username}\'s Bookings')
-    cal.add('X-WR-CALDESC', 'Bookings from Campus Resource Hub')
-    cal.add('X-WR-TIMEZONE', 'UTC')
-    cal.add('REFRESH-INTERVAL;VALUE=DURATION', 'PT12H')  # Refresh every 12 hours
-    cal.add('X-PUBLISHED-TTL', 'PT12H')  # Publish TTL of 12 hours
-    
-    for booking in bookings:
-        event = Event()
-        event.add('uid', f'booking-{booking.id}@campus-resource-hub')
-        event.add('summary', f'{booking.resource.title} - {booking.status.title()}')
-        
-        description = f"Resource: {booking.resource.title}\n"
-        description += f"Category: {booking.resource.category}\n"
-        if booking.resource.location:
-            description += f"Location: {booking.resource.location}\n"
-        description += f"Status: {booking.status.title()}\n"
-        if booking.notes:
-            description += f"Notes: {booking.notes}\n"
-        description += f"Booking ID: {booking.id}"
-        
-        event.add('description', description)
-        
-        if booking.start_date:
-            start_utc = booking.start_date
-            if start_utc.tzinfo is None:
-                start_utc = start_utc.replace(tzinfo=timezone.utc)
-            event.add('dtstart', start_utc)
-        
-        if booking.end_date:
-            end_utc = booking.end_date
-            if end_utc.tzinfo is None:
-                end_utc = end_utc.replace(tzinfo=timezone.utc)
-            event.add('dtend', end_utc)
-        
-        if booking.resource.location:
-            event.add('location', booking.resource.location)
-        
-        status_map = {
-            'active': 'CONFIRMED',
-            'pending': 'TENTATIVE',
-            'completed': 'CONFIRMED',
-            'cancelled': 'CANCELLED'
-        }
-        event.add('status', status_map.get(booking.status, 'CONFIRMED'))
-        
-        if booking.recurrence_type and booking.recurrence_end_date:
-            freq_map = {
-                'daily': 'DAILY',
-                'weekly': 'WEEKLY',
-                'monthly': 'MONTHLY'
-            }
-            freq = freq_map.get(booking.recurrence_type, 'WEEKLY')
-            until = booking.recurrence_end_date
-            if until.tzinfo is None:
-                until = until.replace(tzinfo=timezone.utc)
-            event.add('rrule', {
-                'FREQ': freq,
-                'UNTIL': until
-            })
-        
-        if booking.updated_at:
-            last_modified = booking.updated_at
-            if last_modified.tzinfo is None:
-                last_modified = last_modified.replace(tzinfo=timezone.utc)
-            event.add('last-modified', last_modified)
-        elif booking.created_at:
-            created = booking.created_at
-            if created.tzinfo is None:
-                created = created.replace(tzinfo=timezone.utc)
-            event.add('last-modified', created)
-        
-        event.add('organizer', f'MAILTO:{user.email}')
-        
-        cal.add_component(event)
-    
-    return cal
-
 @booking_bp.route('/subscription/generate', methods=['POST'])
 @csrf.exempt
 @login_required
 def generate_subscription():
     """Generate a new subscription token for the current user."""
     try:
-        if not ICALENDAR_AVAILABLE:
-            return jsonify({'success': False, 'error': 'iCal export is not available'}), 400
-        
         from ..models.calendar_subscription import CalendarSubscription
         
         # Get filter parameters from request
@@ -513,12 +343,13 @@ def subscription_status():
     
     if subscription and subscription.is_valid():
         subscription_url = url_for('booking.subscription_ical', token=subscription.token, _external=True)
+        access_count, last_accessed_at = subscription_dao.get_access_stats(subscription)
         return jsonify({
             'has_subscription': True,
             'subscription_url': subscription_url,
             'created_at': subscription.created_at.isoformat(),
-            'last_accessed_at': subscription.last_accessed_at.isoformat() if subscription.last_accessed_at else None,
-            'access_count': subscription.access_count,
+            'last_accessed_at': last_accessed_at.isoformat() if last_accessed_at else None,
+            'access_count': access_count,
             'status_filter': subscription.status_filter,
             'start_date': subscription.start_date.isoformat() if subscription.start_date else None,
             'end_date': subscription.end_date.isoformat() if subscription.end_date else None
@@ -529,9 +360,6 @@ def subscription_status():
 @booking_bp.route('/subscription/<token>.ics')
 def subscription_ical(token):
     """Return iCal data for a subscription token (public endpoint)."""
-    if not ICALENDAR_AVAILABLE:
-        return Response('iCal export is not available', status=503, mimetype='text/plain')
-    
     from ..models.user import User
     
     # Find subscription by token using DAL
@@ -540,46 +368,49 @@ def subscription_ical(token):
     if not subscription or not subscription.is_valid():
         return Response('Invalid or expired subscription', status=404, mimetype='text/plain')
     
-    # Record access using DAL
-    subscription_dao.record_access(subscription.id)
+    # Count the access in memory (written in batches), keeping polls read-only
+    subscription_dao.buffer_access(subscription.id)
     
     # Get user
     user = subscription.user
     
-    # Get bookings using DAL with subscription filters
-    if subscription.start_date and subscription.end_date:
-        bookings = booking_dao.get_by_date_range(
-            subscription.start_date,
-            subscription.end_date,
-            user_id=user.id
-        )
-    elif subscription.start_date:
-        from datetime import datetime, timedelta
-        end_date = datetime.utcnow() + timedelta(days=365)
-        bookings = booking_dao.get_by_date_range(
-            subscription.start_date,
-            end_date,
-            user_id=user.id
-        )
-    else:
-        bookings = booking_dao.get_by_user(user.id, status=subscription.status_filter)
-    
-    # Apply status filter if needed (for cases without date range)
-    if subscription.status_filter and not (subscription.start_date or subscription.end_date):
-        bookings = [b for b in bookings if b.status == subscription.status_filter]
-    
-    # Generate iCal calendar
-    cal = generate_ical_calendar(user, bookings)
-    
-    if not cal:
-        return Response('Error generating calendar', status=500, mimetype='text/plain')
-    
-    ical_content = cal.to_ical()
+    # Revalidate against the feed version without reading any booking
+    etag, last_modified = feed_version(subscription, user)
+    last_modified = last_modified.replace(tzinfo=timezone.utc)
+    if not is_resource_modified(request.environ, etag=etag, last_modified=last_modified):
+        response = Response(status=304)
+        set_feed_headers(response, etag, last_modified)
+        return response
+    
+    feed_cache = get_feed_cache()
+    ical_content = feed_cache.get(subscription.id, etag)
+    if ical_content is None:
+        # Streamed; kept in the cache on the way out unless it is too large
+        ical_content = stream_with_context(
+            feed_cache.tee(subscription.id, etag, render_subscription_feed(subscription, user)))
     
     # Create response with appropriate headers for subscription
     response = Response(ical_content, mimetype='text/calendar')
     response.headers['Content-Type'] = 'text/calendar; charset=utf-8'
+    set_feed_headers(response, etag, last_modified)
+    
+    return response
+
+def set_feed_headers(response, etag, last_modified):
+    """Caching headers shared by full and 304 subscription feed responses."""
+    response.set_etag(etag)
+    response.last_modified = last_modified
     response.headers['Cache-Control'] = 'public, max-age=43200'  # Cache for 12 hours
     response.headers['X-Content-Type-Options'] = 'nosniff'
-    
-    return response
\ No newline at end of file
+
+def render_subscription_feed(subscription, user):
+    """Stream a subscription's bookings as iCal chunks."""
+    # Date range filter (the status filter applies when there is none)
+    window = {}
+    if subscription.start_date:
+        window = {
+            'start_date': subscription.start_date,
+            'end_date': subscription.end_date or datetime.utcnow() + timedelta(days=365)
+        }
+    chunks = booking_dao.iter_ical_chunks(user.id, status=None if window else subscription.status_filter, **window)
+    return stream_calendar(user.username, user.email, chunks, refresh_interval='PT12H')  # Refresh every 12 hours
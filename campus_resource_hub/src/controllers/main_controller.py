@@ -2,20 +2,17 @@
 from flask import Blueprint, render_template, current_app, redirect, url_for
 from flask_login import current_user, login_required
 from datetime import datetime
-from ..models.resource import Resource
 from ..models.booking import Booking
+from ..utils.catalog import get_catalog
 
 main_bp = Blueprint('main', __name__)
 
 @main_bp.route('/')
 def index():
-    from ..models.resource_image import ResourceImage
-    # Get featured resources for the homepage (only published) with images eager loaded
-    featured_resources = Resource.query.filter_by(is_featured=True, status='published').limit(6).all()
-    # Eager load images for each resource
-    for resource in featured_resources:
-        resource.images = ResourceImage.query.filter_by(resource_id=resource.id).order_by(ResourceImage.display_order).all()
-    categories = Resource.query.filter_by(status='published').with_entities(Resource.category).distinct().all()
+    # Featured resources (with images) and categories come from the published catalog snapshot
+    catalog = get_catalog()
+    featured_resources = catalog.featured(limit=6)
+    categories = catalog.categories
     return render_template('index.html', featured_resources=featured_resources, categories=categories)
 
 @main_bp.route('/dashboard')
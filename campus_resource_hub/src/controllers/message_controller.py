@@ -4,9 +4,14 @@ from ..models.message import Message
 from ..models.user import User
 from ..extensions import db, csrf
 from ..forms import MessageForm
+from ..utils import suggest_index
 
 message_bp = Blueprint('message', __name__, url_prefix='/messages')
 
+# Recipient typeahead: characters typed before anything is suggested, and most usernames returned
+RECIPIENT_SUGGEST_MIN_CHARS = 3
+RECIPIENT_SUGGEST_LIMIT = 5
+
 @message_bp.route('/')
 @login_required
 def inbox():
@@ -21,6 +26,23 @@ def sent():
     messages = Message.query.filter_by(sender_id=current_user.id, is_hidden=False).order_by(Message.created_at.desc()).all()
     return render_template('messages/sent.html', messages=messages)
 
+@message_bp.route('/recipients/suggest')
+@login_required
+def suggest_recipients():
+    """Typeahead for the recipient field: usernames from the in-memory prefix index.
+    
+    A short prefix returns nothing and matches are capped, so the endpoint
+    cannot be used to list every account."""
+    text = request.args.get('q', '').strip()
+    if len(text) < RECIPIENT_SUGGEST_MIN_CHARS:
+        return jsonify({'suggestions': []})
+    # One extra in case the current user is among the matches
+    suggestions = suggest_index.suggest('users', text, limit=RECIPIENT_SUGGEST_LIMIT + 1)
+    return jsonify({
+        'suggestions': [{'value': s.value, 'label': s.label, 'type': s.kind}
+                        for s in suggestions if s.value != current_user.username][:RECIPIENT_SUGGEST_LIMIT]
+    })
+
 @message_bp.route('/compose', methods=['GET', 'POST'])
 @login_required
 def compose():
@@ -1,8 +1,9 @@
 # AI Contribution: Generated resource controller with search, view, and category features.
 from flask import Blueprint, render_template, request, current_app, abort, flash, redirect, url_for, jsonify
 from flask_login import login_required, current_user
-from datetime import datetime
+from datetime import date, datetime, timedelta
 import os
+import logging
 from werkzeug.utils import secure_filename
 from ..models.resource import Resource
 from ..models.booking import Booking
@@ -10,9 +11,21 @@ from ..models.waitlist import Waitlist
 from ..models.review import Review
 from ..models.resource_image import ResourceImage
 from ..forms import BookingForm, WaitlistForm, ReviewForm
-from sqlalchemy import or_, and_, func
+from sqlalchemy import or_, case, func
 from ..extensions import db
 from ..data_access import ResourceDAO, BookingDAO, WaitlistDAO, ReviewDAO
+from ..utils.recurrence import expand_occurrences, build_rrule, MAX_RECURRING_BOOKINGS
+from ..utils.booking_admission import admit_bookings
+from ..utils.rating_badges import get_rating_badges
+from ..utils.resource_search import apply_text_search, search_terms
+from ..utils.keyset import keyset_page
+from ..utils.search_facets import facet_conditions, search_facets
+from ..utils.equipment_tags import apply_tag_filter, parse_tags
+from ..utils import suggest_index
+from ..utils.catalog import get_catalog
+from ..utils.fuzzy_match import did_you_mean
+from ..utils.booking_index import BLOCKING_STATUSES
+from ..utils.calendar_events import cached_events, parse_window, resource_events
 
 resource_bp = Blueprint('resources', __name__, url_prefix='/resources')
 
@@ -22,26 +35,19 @@ booking_dao = BookingDAO()
 waitlist_dao = WaitlistDAO()
 review_dao = ReviewDAO()
 
-def get_rating_badges():
-    """Calculate top 3 and lowest rated resource IDs for badges.
-    Returns tuple: (top_rated_ids list, lowest_rated_id or None)
-    Only includes resources that have reviews."""
-    # Get all published resources with reviews
-    all_published_resources = Resource.query.filter(Resource.status == 'published').all()
-    resources_with_reviews = [r for r in all_published_resources if r.review_count() > 0]
-    
-    if not resources_with_reviews:
-        return ([], None)
-    
-    # Sort by average rating (highest first)
-    resources_with_reviews_sorted = sorted(resources_with_reviews, key=lambda r: r.average_rating(), reverse=True)
-    
-    # Top 3 rated resources (or all if fewer than 3)
-    # Only show lowest rated badge if there are at least 2 resources (so there's a comparison)
-    top_rated_ids = [r.id for r in resources_with_reviews_sorted[:3]]
-    lowest_rated_id = resources_with_reviews_sorted[-1].id if len(resources_with_reviews_sorted) >= 2 else None
-    
-    return (top_rated_ids, lowest_rated_id)
+# Longest window the free-slot finder will scan in one request
+FREE_SLOTS_MAX_RANGE = timedelta(days=31)
+
+# Resource search page size (default and upper bound for ?per_page=)
+SEARCH_PAGE_SIZE = 24
+SEARCH_MAX_PAGE_SIZE = 100
+
+# Typeahead suggestions per keystroke (default and upper bound for ?limit=)
+SUGGEST_LIMIT = 8
+SUGGEST_MAX_LIMIT = 20
+
+# Longest occupancy heatmap window (six weeks covers a month view)
+OCCUPANCY_MAX_DAYS = 42
 
 def allowed_file(filename):
     """Check if file extension is allowed."""
@@ -92,119 +98,212 @@ def staff_or_admin_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
-@resource_bp.route('/search')
-def search():
-    query = request.args.get('q', '')
-    category = request.args.get('category', '')
-    location = request.args.get('location', '')
-    min_capacity = request.args.get('min_capacity', type=int)
-    availability_start = request.args.get('availability_start', '')
-    availability_end = request.args.get('availability_end', '')
-    sort_by = request.args.get('sort', 'title')  # title, recent, most_booked, top_rated
+def sorted_search_page(resources, relevance, sort_by, cursor, per_page):
+    """
+    Sort a filtered resource search in SQL and fetch one keyset page.
+    
+    Args:
+        resources: Filtered Resource query
+        relevance: BM25 relevance column of a keyword search, or None
+        sort_by: relevance, title, recent, most_booked or top_rated
+        cursor: Cursor of the previous page, or None for the first page
+        per_page: Page size
+    
+    Returns:
+        Tuple of (resources on the page, cursor for the next page or None)
+    """
+    # Sort key and direction; ties are broken by resource ID
+    if sort_by == 'recent':
+        key, descending = func.coalesce(Resource.created_at, datetime(1970, 1, 1)), True
+    elif sort_by == 'most_booked':
+        # Booking count (most booked first)
+        counts = booking_dao.booking_count_subquery(['active', 'completed'])
+        resources = resources.outerjoin(counts, Resource.id == counts.c.resource_id)
+        key, descending = func.coalesce(counts.c.booking_count, 0), True
+    elif sort_by == 'top_rated':
+        # Stored average rating (highest first)
+        key, descending = Resource.avg_rating, True
+    elif sort_by == 'relevance' and relevance is not None:
+        # BM25 score (lower is better)
+        key, descending = relevance, False
+    else:  # default: title
+        key, descending = Resource.title, False
     
-    resources = Resource.query.filter(Resource.status == 'published')
+    return keyset_page(resources, key, Resource.id, descending=descending,
+                       cursor=cursor, page_size=per_page)
+
+def search_resources_page(args, with_facets=False, fetch_page=True):
+    """
+    Run a resource search from request arguments and fetch one page of results.
+    
+    Filtering, sorting and pagination all happen in SQL: each sort order is a
+    key expression (joined to an aggregate subquery where needed) and pages
+    are fetched with keyset pagination on (key, id).
+    
+    Args:
+        args: Request arguments (q, category, location, min_capacity, tags,
+              tag_match, availability_start, availability_end, sort, cursor, per_page)
+        with_facets: Also count resources per category, location and capacity
+        fetch_page: Fetch the page of resources (False when only facets are needed)
+    
+    Returns:
+        Dictionary with the page of resources, next_cursor, the parsed filters
+        and, if requested, the facet counts
+    """
+    query = args.get('q', '')
+    category = args.get('category', '')
+    location = args.get('location', '')
+    min_capacity = args.get('min_capacity', type=int)
+    availability_start = args.get('availability_start', '')
+    availability_end = args.get('availability_end', '')
+    # Equipment tags, comma-separated; tag_match=any returns resources with at least one of them
+    tags = parse_tags(args.get('tags', ''))
+    tag_match = 'any' if args.get('tag_match') == 'any' else 'all'
+    # relevance, title, recent, most_booked, top_rated (keyword searches default to relevance)
+    sort_by = args.get('sort', 'relevance' if query else 'title')
+    per_page = min(max(args.get('per_page', SEARCH_PAGE_SIZE, type=int), 1), SEARCH_MAX_PAGE_SIZE)
     
-    # Keyword search
-    if query:
-        resources = resources.filter(or_(
-            Resource.title.ilike(f'%{query}%'),
-            Resource.description.ilike(f'%{query}%')
-        ))
+    resources = Resource.query.filter(Resource.status == 'published')
     
-    # Category filter
-    if category:
-        resources = resources.filter(Resource.category == category)
+    # Keyword search (full-text, prefix-matched, BM25-ranked)
+    resources, relevance = apply_text_search(resources, query)
     
-    # Location filter
-    if location:
-        resources = resources.filter(Resource.location.ilike(f'%{location}%'))
+    # Equipment filter (tag inverted index)
+    resources = apply_tag_filter(resources, tags, match_all=tag_match == 'all')
     
-    # Capacity filter (minimum capacity)
-    if min_capacity:
-        resources = resources.filter(Resource.capacity >= min_capacity)
+    # Category, location (substring) and minimum capacity filters, shared with the facet counts
+    conditions = facet_conditions(category, location, min_capacity)
     
     # Availability date/time filter
+    availability_filtered = False
     if availability_start and availability_end:
         try:
             start_dt = datetime.strptime(availability_start, '%Y-%m-%dT%H:%M')
             end_dt = datetime.strptime(availability_end, '%Y-%m-%dT%H:%M')
             
-            # Get all resources with bookings during this time period
-            resources_with_bookings = db.session.query(
-                Booking.resource_id,
-                func.count(Booking.id).label('booking_count')
-            ).filter(
-                Booking.status.in_(['pending', 'active']),
-                or_(
-                    and_(Booking.start_date <= start_dt, Booking.end_date > start_dt),
-                    and_(Booking.start_date < end_dt, Booking.end_date >= end_dt),
-                    and_(Booking.start_date >= start_dt, Booking.end_date <= end_dt)
-                )
-            ).group_by(Booking.resource_id).all()
-            
-            # Determine which resources are unavailable
-            unavailable_ids = []
-            for resource_id, booking_count in resources_with_bookings:
-                resource = Resource.query.get(resource_id)
-                if resource and resource.capacity:
-                    # Only filter out if resource has capacity and it's been reached
-                    if booking_count >= resource.capacity:
-                        unavailable_ids.append(resource_id)
-                # Resources without capacity are considered unlimited and remain available
-            
-            # Exclude unavailable resources
-            if unavailable_ids:
-                resources = resources.filter(~Resource.id.in_(unavailable_ids))
+            # Peak concurrent occupancy per booked resource, compared with capacity in SQL.
+            # Resources without capacity are considered unlimited and remain available.
+            peaks = booking_dao.peak_concurrency_subquery(start_dt, end_dt)
+            peak = peaks.c.peak
+            # Resources with rule-based series in the window use peaks computed over expanded occurrences
+            series_peaks = booking_dao.series_peaks(start_dt, end_dt)
+            if series_peaks:
+                peak = case(series_peaks, value=Resource.id, else_=peaks.c.peak)
+            resources = resources.outerjoin(peaks, Resource.id == peaks.c.resource_id).filter(or_(
+                peak.is_(None),
+                Resource.capacity.is_(None),
+                Resource.capacity == 0,
+                peak < Resource.capacity
+            ))
+            availability_filtered = True
         except ValueError:
             # Invalid date format, ignore availability filter
             pass
     
-    # Get all resources before sorting (for calculating stats)
-    all_resources = resources.all()
+    # Facets are counted before the facet filters themselves are applied
+    facets = None
+    if with_facets:
+        facets = search_facets(resources, conditions,
+                               unfiltered=not search_terms(query) and not tags and not availability_filtered)
+    if conditions:
+        resources = resources.filter(*conditions.values())
+    
+    page, next_cursor = [], None
+    if fetch_page:
+        page, next_cursor = sorted_search_page(resources, relevance, sort_by, args.get('cursor'), per_page)
+    
+    return {
+        'resources': page,
+        'next_cursor': next_cursor,
+        'query': query,
+        'category': category,
+        'location': location,
+        'min_capacity': min_capacity,
+        'tags': tags,
+        'tag_match': tag_match,
+        'availability_start': availability_start,
+        'availability_end': availability_end,
+        'sort_by': sort_by,
+        'per_page': per_page,
+        'facets': facets,
+    }
+
+@resource_bp.route('/search')
+def search():
+    results = search_resources_page(request.args, with_facets=True)
+    resources = results['resources']
     
-    # Eager load images for each resource
-    for resource in all_resources:
-        resource.images = ResourceImage.query.filter_by(resource_id=resource.id).order_by(ResourceImage.display_order).all()
+    # Load the images of the whole page in one query
+    resource_dao.attach_images(resources)
     
-    # Apply sorting
-    if sort_by == 'recent':
-        resources = sorted(all_resources, key=lambda r: r.created_at, reverse=True)
-    elif sort_by == 'most_booked':
-        # Sort by booking count (most booked first)
-        resources = sorted(all_resources, key=lambda r: r.bookings.filter(
-            Booking.status.in_(['active', 'completed'])
-        ).count(), reverse=True)
-    elif sort_by == 'top_rated':
-        # Sort by average rating (highest first)
-        resources = sorted(all_resources, key=lambda r: r.average_rating(), reverse=True)
-    else:  # default: title
-        resources = sorted(all_resources, key=lambda r: r.title)
+    # Links to the next page and back to the first one keep every other filter
+    page_args = request.args.to_dict()
+    page_args.pop('cursor', None)
+    next_url = url_for('resources.search', **page_args, cursor=results['next_cursor']) if results['next_cursor'] else None
+    first_url = url_for('resources.search', **page_args) if request.args.get('cursor') else None
     
-    # Get distinct values for filters
-    categories = Resource.query.filter(Resource.status == 'published').with_entities(Resource.category).distinct().all()
-    locations = Resource.query.filter(
-        Resource.status == 'published',
-        Resource.location.isnot(None),
-        Resource.location != ''
-    ).with_entities(Resource.location).distinct().all()
+    # A keyword search that found nothing offers close titles/locations (typos)
+    suggestions = []
+    if results['query'] and not resources and not request.args.get('cursor'):
+        page_args.pop('q', None)
+        suggestions = [(text, url_for('resources.search', **page_args, q=text))
+                       for text in did_you_mean(results['query'])]
     
     # Calculate top-rated and lowest-rated badges
     top_rated_ids, lowest_rated_id = get_rating_badges()
     
     return render_template('resources/search.html', 
                          resources=resources,
-                         query=query,
-                         selected_category=category,
-                         categories=categories,
-                         location=location,
-                         locations=locations,
-                         min_capacity=min_capacity,
-                         availability_start=availability_start,
-                         availability_end=availability_end,
-                         sort_by=sort_by,
+                         query=results['query'],
+                         selected_category=results['category'],
+                         location=results['location'],
+                         facets=results['facets'],
+                         min_capacity=results['min_capacity'],
+                         tags=', '.join(results['tags']),
+                         tag_match=results['tag_match'],
+                         equipment_tags=resource_dao.get_equipment_tags(),
+                         availability_start=results['availability_start'],
+                         availability_end=results['availability_end'],
+                         sort_by=results['sort_by'],
+                         next_url=next_url,
+                         first_url=first_url,
+                         did_you_mean=suggestions,
                          top_rated_ids=top_rated_ids,
                          lowest_rated_id=lowest_rated_id)
 
+@resource_bp.route('/search/json')
+def search_json():
+    """JSON variant of the resource search, one keyset page at a time."""
+    results = search_resources_page(request.args)
+    items = []
+    for resource in results['resources']:
+        item = resource.to_dict()
+        item['average_rating'] = resource.average_rating()
+        item['review_count'] = resource.review_count()
+        item['url'] = url_for('resources.view', id=resource.id)
+        items.append(item)
+    return jsonify({
+        'resources': items,
+        'sort': results['sort_by'],
+        'per_page': results['per_page'],
+        'next_cursor': results['next_cursor']
+    })
+
+@resource_bp.route('/suggest')
+def suggest():
+    """Typeahead suggestions (titles, locations, categories) from the in-memory prefix index."""
+    limit = min(max(request.args.get('limit', SUGGEST_LIMIT, type=int), 1), SUGGEST_MAX_LIMIT)
+    suggestions = suggest_index.suggest('resources', request.args.get('q', ''), limit=limit)
+    return jsonify({
+        'suggestions': [{'value': s.value, 'label': s.label, 'type': s.kind} for s in suggestions]
+    })
+
+@resource_bp.route('/search/facets')
+def search_facets_json():
+    """Facet counts (category, location, capacity) for a resource search."""
+    results = search_resources_page(request.args, with_facets=True, fetch_page=False)
+    return jsonify(results['facets'])
+
 @resource_bp.route('/<int:id>')
 def view(id):
     resource = Resource.query.get_or_404(id)
@@ -280,7 +379,7 @@ def view(id):
 
 @resource_bp.route('/category/<category>')
 def by_category(category):
-    resources = resource_dao.get_by_category(category)
+    resources = get_catalog().in_category(category)
     if not resources:
         abort(404)
     
@@ -297,20 +396,38 @@ def check_time_conflict(resource_id, start_date, end_date, exclude_booking_id=No
     """Check if there are any conflicting bookings for the given time period using DAL."""
     return booking_dao.check_conflict(resource_id, start_date, end_date, exclude_id=exclude_booking_id)
 
-def check_capacity(resource_id, start_date, end_date):
+def check_series_availability(resource, occurrences, exclude_booking_id=None):
+    """Return a conflict reason ('time', 'capacity' or None) for each occurrence.
+    
+    Single bookings are answered by the interval index (confirmed in SQL); a
+    recurring series is checked with one set-based query for all of its
+    occurrences. exclude_booking_id leaves out a booking being rescheduled."""
+    if len(occurrences) == 1:
+        start_date, end_date = occurrences[0]
+        if check_time_conflict(resource.id, start_date, end_date, exclude_booking_id):
+            return ['time']
+        return ['capacity' if check_capacity(resource.id, start_date, end_date, exclude_booking_id) else None]
+    
+    overlap_counts = booking_dao.count_series_overlaps(resource.id, occurrences, exclude_id=exclude_booking_id)
+    reasons = []
+    for count in overlap_counts:
+        if count and resource.capacity and count >= resource.capacity:
+            reasons.append('capacity')
+        elif count:
+            reasons.append('time')
+        else:
+            reasons.append(None)
+    return reasons
+
+def check_capacity(resource_id, start_date, end_date, exclude_booking_id=None):
     """Check if resource capacity is reached during the time period using DAL."""
     resource = resource_dao.get_by_id(resource_id)
     if not resource or not resource.capacity:
         return False
     
-    # Get bookings in the time range using DAL
-    bookings_in_range = booking_dao.get_by_date_range(start_date, end_date)
-    # Filter for this resource and active/pending status
-    active_bookings = [b for b in bookings_in_range 
-                      if b.resource_id == resource_id 
-                      and b.status in ['pending', 'active']]
-    
-    return len(active_bookings) >= resource.capacity
+    # Peak simultaneous occupancy, not the number of bookings touching the window
+    return booking_dao.max_concurrency(resource_id, start_date, end_date,
+                                       exclude_id=exclude_booking_id) >= resource.capacity
 
 @resource_bp.route('/<int:id>/book', methods=['GET', 'POST'])
 @login_required
@@ -344,198 +461,222 @@ def book(id):
             flash('This resource is currently unavailable.', 'danger')
             return render_template('resources/book.html', resource=resource, form=form)
         
-        # Check for time conflicts using DAL
-        has_conflict = booking_dao.check_conflict(resource.id, start_date, end_date)
-        capacity_reached = check_capacity(resource.id, start_date, end_date)
-        
-        if has_conflict or capacity_reached:
-            # Offer waitlist option
-            flash('This resource is not available during the requested time. You can join the waitlist.', 'warning')
-            return render_template('resources/book.html', 
-                                 resource=resource, 
-                                 form=form, 
-                                 show_waitlist=True,
-                                 conflict_reason='time' if has_conflict else 'capacity')
-        
-        # Determine booking status based on resource approval requirement
-        booking_status = 'pending' if resource.requires_approval else 'active'
-        
         # Handle recurrence
         recurrence_type = form.recurrence_type.data if form.recurrence_type.data else None
         recurrence_end_date = None
         if recurrence_type and form.parsed_recurrence_end_date:
             recurrence_end_date = form.parsed_recurrence_end_date
         
-        # Calculate booking duration
-        booking_duration = end_date - start_date
-        
-        # Create bookings (single or recurring)
-        bookings_created = []
-        current_start = start_date
-        parent_booking_id = None
+        # Expand the whole series up front, then check every occurrence at once
+        occurrences = expand_occurrences(start_date, end_date, recurrence_type,
+                                         recurrence_end_date, limit=MAX_RECURRING_BOOKINGS)
+        if not occurrences:
+            flash('No bookings were created. Please check your booking details and try again.', 'warning')
+            return render_template('resources/book.html', resource=resource, form=form)
+        hit_limit = recurrence_type is not None and len(occurrences) >= MAX_RECURRING_BOOKINGS
+        if hit_limit:
+            logging.warning(f"Recurring booking creation hit safety limit of {MAX_RECURRING_BOOKINGS} occurrences")
         
-        from datetime import timedelta
-        import logging
+        # Determine booking status based on resource approval requirement
+        booking_status = 'pending' if resource.requires_approval else 'active'
+        notes = form.notes.data if form.notes.data else None
         
-        # Safety limit: prevent creating more than 365 bookings (1 year of daily bookings)
-        MAX_RECURRING_BOOKINGS = 365
-        iteration_count = 0
+        def booking_row(occurrence_start, occurrence_end):
+            return {
+                'user_id': current_user.id,
+                'resource_id': resource.id,
+                'start_date': occurrence_start,
+                'end_date': occurrence_end,
+                # Also set old columns for backward compatibility
+                'start_time': occurrence_start,
+                'end_time': occurrence_end,
+                'status': booking_status,
+                'notes': notes,
+                'recurrence_type': recurrence_type,
+                'recurrence_end_date': recurrence_end_date
+            }
         
-        # Use no_autoflush to prevent premature database locks during conflict checks
-        while iteration_count < MAX_RECURRING_BOOKINGS:
-            iteration_count += 1
-            
-            # Calculate current end date based on duration
-            current_end = current_start + booking_duration
-            
-            # Stop if we've passed the recurrence end date (if set)
-            if recurrence_end_date and current_start > recurrence_end_date:
-                break
-            
-            # Check for conflicts for this occurrence (outside no_autoflush to allow queries)
-            has_conflict = check_time_conflict(resource.id, current_start, current_end)
-            capacity_reached = check_capacity(resource.id, current_start, current_end)
-            
-            # Only create booking if no conflict and capacity available
-            if not has_conflict and not capacity_reached:
-                # Use no_autoflush when adding to session to prevent premature locks
-                with db.session.no_autoflush:
-                    booking = Booking(
-                        user_id=current_user.id,
-                        resource_id=resource.id,
-                        start_date=current_start,
-                        end_date=current_end,
-                        status=booking_status,
-                        notes=form.notes.data if form.notes.data else None,
-                        recurrence_type=recurrence_type,
-                        recurrence_end_date=recurrence_end_date,
-                        parent_booking_id=parent_booking_id
-                    )
-                    # Also set old columns for backward compatibility
-                    booking.start_time = current_start
-                    booking.end_time = current_end
-                    db.session.add(booking)
-                    bookings_created.append(booking)
+        parent_booking_id = None
+        created_count = 0
+        try:
+            # Check and insert under the resource's admission lock so concurrent
+            # requests for the same resource cannot both pass the check
+            with admit_bookings(resource.id):
+                conflict_reasons = check_series_availability(resource, occurrences)
+                if not conflict_reasons[0]:
+                    # Accept free occurrences, skipping any that collide with an earlier one in the series
+                    accepted = []
+                    for (occurrence_start, occurrence_end), reason in zip(occurrences, conflict_reasons):
+                        if reason or (accepted and accepted[-1][1] > occurrence_start):
+                            continue
+                        accepted.append((occurrence_start, occurrence_end))
                     
-                    # Set first booking as parent for recurring series
-                    if not parent_booking_id and recurrence_type:
-                        # Flush to get the ID, but don't commit yet
-                        db.session.flush()
-                        parent_booking_id = booking.id
-                        # Update all previously created bookings with parent ID
-                        for prev_booking in bookings_created[:-1]:
-                            prev_booking.parent_booking_id = parent_booking_id
-            else:
-                # If there's a conflict, stop creating more occurrences
-                if bookings_created:
-                    # Commit what we have so far
-                    try:
+                    # A recurring series is a single row carrying its RRULE; occurrences
+                    # are expanded on read. admit_bookings holds the resource's write
+                    # lock, so no other worker books between the checks and this insert.
+                    row = booking_row(*accepted[0])
+                    if recurrence_type:
+                        row['recurrence_rule'] = build_rrule(recurrence_type, occurrences[-1][0])
+                        row['series_end_date'] = accepted[-1][1]
+                    parent_booking_id = booking_dao.insert_if_free(row)
+                    if parent_booking_id:
+                        accepted_starts = {occurrence_start for occurrence_start, _ in accepted}
+                        booking_dao.add_exceptions(parent_booking_id, [
+                            occurrence_start for occurrence_start, _ in occurrences
+                            if occurrence_start not in accepted_starts
+                        ], reason='skipped')
+                        created_count = len(accepted)
                         db.session.commit()
-                        flash(f'Created {len(bookings_created)} booking(s). Some occurrences were skipped due to conflicts or capacity.', 'warning')
-                    except Exception as e:
-                        logging.error(f"Error committing bookings: {str(e)}")
-                        db.session.rollback()
-                        flash('An error occurred while creating the bookings. Please try again.', 'danger')
-                        return render_template('resources/book.html', resource=resource, form=form)
-                else:
-                    db.session.rollback()
-                    flash('This resource is not available during the requested time. You can join the waitlist.', 'warning')
-                    return render_template('resources/book.html', 
-                                         resource=resource, 
-                                         form=form, 
-                                         show_waitlist=True,
-                                         conflict_reason='time' if has_conflict else 'capacity')
-                break
-            
-            # If no recurrence, create only one booking
-            if not recurrence_type:
-                break
-            
-            # Calculate next occurrence
-            if recurrence_type == 'daily':
-                current_start = current_start + timedelta(days=1)
-            elif recurrence_type == 'weekly':
-                current_start = current_start + timedelta(weeks=1)
-            elif recurrence_type == 'monthly':
-                # Add approximately one month (30 days)
-                current_start = current_start + timedelta(days=30)
-            else:
-                break
+        except Exception as e:
+            logging.error(f"Error committing bookings: {str(e)}")
+            db.session.rollback()
+            flash('An error occurred while creating the bookings. Please try again.', 'danger')
+            return render_template('resources/book.html', resource=resource, form=form)
         
-        # Safety check: if we hit the limit, warn the user
-        if iteration_count >= MAX_RECURRING_BOOKINGS:
-            logging.warning(f"Recurring booking creation hit safety limit of {MAX_RECURRING_BOOKINGS} iterations")
-            if bookings_created:
-                try:
-                    db.session.commit()
-                    flash(f'Created {len(bookings_created)} booking(s). Recurrence was limited to prevent excessive bookings.', 'warning')
-                except Exception as e:
-                    logging.error(f"Error committing bookings after limit: {str(e)}")
-                    db.session.rollback()
-                    flash('An error occurred while creating the bookings. Please try again.', 'danger')
-                    return render_template('resources/book.html', resource=resource, form=form)
-            else:
-                db.session.rollback()
-                flash('Unable to create recurring bookings. Please try a shorter recurrence period.', 'danger')
-                return render_template('resources/book.html', resource=resource, form=form)
+        if not parent_booking_id:
+            db.session.rollback()
+            # Offer waitlist option
+            flash('This resource is not available during the requested time. You can join the waitlist.', 'warning')
+            return render_template('resources/book.html', 
+                                 resource=resource, 
+                                 form=form, 
+                                 show_waitlist=True,
+                                 conflict_reason=conflict_reasons[0] or 'time')
         
-        # Commit all bookings at once (only if we have bookings and haven't already committed)
-        if bookings_created:
-            try:
-                db.session.commit()
-            except Exception as e:
-                logging.error(f"Error committing bookings: {str(e)}")
-                db.session.rollback()
-                flash('An error occurred while creating the bookings. Please try again.', 'danger')
-                return render_template('resources/book.html', resource=resource, form=form)
-            
-            # Create notifications
-            from ..utils.notifications import notify_booking_created, notify_recurring_series_created
-            
-            if len(bookings_created) > 1:
-                # Count skipped bookings (if any were skipped)
-                skipped_count = 0  # This would need to be tracked during creation
-                notify_recurring_series_created(bookings_created, skipped_count)
-                flash(f'Successfully created {len(bookings_created)} recurring bookings!', 'success')
+        parent_booking = booking_dao.get_by_id(parent_booking_id)
+        skipped_count = len(occurrences) - created_count
+        
+        # Create notifications
+        from ..utils.notifications import notify_booking_created, notify_recurring_series_created
+        
+        if created_count > 1:
+            notify_recurring_series_created(parent_booking, created_count, skipped_count)
+            if skipped_count:
+                flash(f'Created {created_count} booking(s). {skipped_count} occurrence(s) were skipped due to conflicts or capacity.', 'warning')
+            elif hit_limit:
+                flash(f'Created {created_count} booking(s). Recurrence was limited to prevent excessive bookings.', 'warning')
             else:
-                notify_booking_created(bookings_created[0])
-                flash('Booking request submitted successfully!', 'success')
-            return redirect(url_for('resources.view', id=id))
+                flash(f'Successfully created {created_count} recurring bookings!', 'success')
         else:
-            # This shouldn't happen, but handle it gracefully
-            db.session.rollback()
-            flash('No bookings were created. Please check your booking details and try again.', 'warning')
-            return render_template('resources/book.html', resource=resource, form=form)
+            notify_booking_created(parent_booking)
+            flash('Booking request submitted successfully!', 'success')
+        return redirect(url_for('resources.view', id=id))
     
     return render_template('resources/book.html', resource=resource, form=form)
 
 @resource_bp.route('/<int:id>/bookings/json')
 def bookings_json(id):
-    """Return bookings for a resource as JSON for FullCalendar."""
+    """Return a resource's pending/active bookings in the visible window (start/end) as JSON for FullCalendar."""
     resource = resource_dao.get_or_404(id)
     
-    # Get all bookings for this resource using DAL
-    bookings = booking_dao.get_by_resource(resource.id)
-    # Filter to only pending/active
-    bookings = [b for b in bookings if b.status in ['pending', 'active']]
-    
-    # Format as FullCalendar events
-    events = []
-    for booking in bookings:
-        events.append({
-            'id': booking.id,
-            'title': f"{booking.user.username} - {booking.status.title()}",
-            'start': booking.start_date.isoformat() if booking.start_date else None,
-            'end': booking.end_date.isoformat() if booking.end_date else None,
-            'color': '#28a745' if booking.status == 'active' else '#ffc107',
-            'extendedProps': {
-                'user': booking.user.username,
-                'status': booking.status,
-                'notes': booking.notes
-            }
-        })
+    try:
+        start_dt, end_dt = parse_window(request.args.get('start'), request.args.get('end'))
+    except ValueError as exc:
+        return jsonify({'error': f'Invalid start or end parameter: {exc}'}), 400
     
-    return jsonify(events)
+    # One event per occurrence of a rule-based series; cached per window
+    body = cached_events(
+        (('resource', resource.id), start_dt, end_dt),
+        lambda: resource_events(booking_dao.get_calendar_window(
+            start_dt, end_dt, resource_id=resource.id, statuses=BLOCKING_STATUSES))
+    )
+    return current_app.response_class(body, mimetype='application/json')
+
+@resource_bp.route('/<int:id>/free-slots')
+def free_slots(id):
+    """Return free time slots for a resource as JSON.
+    
+    Query parameters: from / to (ISO datetimes, default now and one week later),
+    min_duration (minutes, default 30) and optional open / close (HH:MM)."""
+    resource = resource_dao.get_or_404(id)
+    
+    try:
+        start_date = datetime.fromisoformat(request.args['from']) if request.args.get('from') else datetime.utcnow().replace(second=0, microsecond=0)
+        end_date = datetime.fromisoformat(request.args['to']) if request.args.get('to') else start_date + timedelta(days=7)
+        min_duration = timedelta(minutes=int(request.args.get('min_duration', 30)))
+        open_time = datetime.strptime(request.args['open'], '%H:%M').time() if request.args.get('open') else None
+        close_time = datetime.strptime(request.args['close'], '%H:%M').time() if request.args.get('close') else None
+    except ValueError:
+        return jsonify({'error': 'Invalid from, to, min_duration, open or close parameter.'}), 400
+    
+    if end_date <= start_date:
+        return jsonify({'error': 'The "to" time must be after the "from" time.'}), 400
+    if end_date - start_date > FREE_SLOTS_MAX_RANGE:
+        return jsonify({'error': f'The search window cannot exceed {FREE_SLOTS_MAX_RANGE.days} days.'}), 400
+    if min_duration < timedelta(0):
+        return jsonify({'error': 'min_duration cannot be negative.'}), 400
+    if open_time and close_time and close_time <= open_time:
+        return jsonify({'error': 'The closing time must be after the opening time.'}), 400
+    
+    slots = booking_dao.free_slots(resource.id, start_date, end_date, min_duration,
+                                   open_time=open_time, close_time=close_time)
+    return jsonify({
+        'resource_id': resource.id,
+        'from': start_date.isoformat(),
+        'to': end_date.isoformat(),
+        'slots': [{'start': start.isoformat(), 'end': end.isoformat()} for start, end in slots]
+    })
+
+def parse_occupancy_window():
+    """Read start (YYYY-MM-DD, default today) and days (default 7) from the query string."""
+    start_day = date.fromisoformat(request.args['start']) if request.args.get('start') else datetime.utcnow().date()
+    days = int(request.args.get('days', 7))
+    if not 1 <= days <= OCCUPANCY_MAX_DAYS:
+        raise ValueError(f'days must be between 1 and {OCCUPANCY_MAX_DAYS}.')
+    return start_day, days
+
+@resource_bp.route('/<int:id>/occupancy')
+def occupancy(id):
+    """Return 15-minute occupancy counts for a resource as JSON for week/month heatmaps."""
+    resource = resource_dao.get_or_404(id)
+    try:
+        start_day, days = parse_occupancy_window()
+        counts = booking_dao.get_occupancy([resource.id], start_day, days)[0]
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    return jsonify({
+        'resource_id': resource.id,
+        'start': start_day.isoformat(),
+        'days': days,
+        'slot_minutes': 15,
+        'slots': counts.tolist(),
+        'utilization_percent': round(float((counts > 0).mean()) * 100, 1)
+    })
+
+@resource_bp.route('/occupancy')
+def occupancy_grid():
+    """Return occupancy for several resources (ids=1,2,3; default all published) as JSON."""
+    try:
+        start_day, days = parse_occupancy_window()
+        ids = [int(value) for value in request.args.get('ids', '').split(',') if value.strip()]
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    query = db.session.query(Resource.id, Resource.title).filter(Resource.status == 'published')
+    if ids:
+        query = query.filter(Resource.id.in_(ids))
+    resources = query.order_by(Resource.title.asc()).all()
+    
+    try:
+        counts = booking_dao.get_occupancy([resource_id for resource_id, _ in resources], start_day, days)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    return jsonify({
+        'start': start_day.isoformat(),
+        'days': days,
+        'slot_minutes': 15,
+        'resources': [
+            {
+                'id': resource_id,
+                'title': title,
+                'slots': resource_counts.tolist(),
+                'utilization_percent': round(float((resource_counts > 0).mean()) * 100, 1)
+            }
+            for (resource_id, title), resource_counts in zip(resources, counts)
+        ]
+    })
 
 @resource_bp.route('/new', methods=['GET', 'POST'])
 @login_required
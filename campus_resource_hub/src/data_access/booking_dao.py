@@ -1,12 +1,24 @@
 """
 Data Access Object for Booking model.
 """
-from typing import Optional, List
-from datetime import datetime
-from sqlalchemy import and_, or_
+from bisect import bisect_left
+from typing import Iterable, Iterator, Optional, List, Tuple, Dict
+from datetime import date, datetime, time, timedelta
+from sqlalchemy import text, bindparam, literal, select, Integer, String, DateTime, and_, or_, case, func
+from sqlalchemy.engine import Row
+from sqlalchemy.orm import aliased
 from .base_dao import BaseDAO
 from ..models.booking import Booking
+from ..models.booking_change import BookingChange
+from ..models.booking_exception import BookingException
 from ..extensions import db
+from ..utils.booking_changes import log_booking_changes
+from ..utils.booking_index import BLOCKING_STATUSES, get_booking_index, invalidate_resources
+from ..utils.capacity import peak_concurrency
+from ..utils.free_slots import find_free_slots
+from ..utils.ical_feed import touch_booking_feeds
+from ..utils.occupancy import get_occupancy_service, invalidate_occupancy
+from ..utils.recurrence import expand_rule, limit_rule, load_series_intervals
 
 
 class BookingDAO(BaseDAO):
@@ -41,6 +53,11 @@ class BookingDAO(BaseDAO):
         """
         Check if there's a booking conflict for a resource.
         
+        Answered from the per-resource interval index (see
+        utils/booking_index.py), which reloads the resource whenever its
+        shared booking version moved, so the only query on a warm index is
+        a primary-key read of that version.
+        
         Args:
             resource_id: Resource ID
             start_date: Booking start date
@@ -50,39 +67,666 @@ class BookingDAO(BaseDAO):
         Returns:
             True if conflict exists
         """
-        query = self.model_class.query.filter_by(resource_id=resource_id).filter(
-            Booking.status.in_(['pending', 'active']),
-            or_(
-                and_(Booking.start_date <= start_date, Booking.end_date > start_date),
-                and_(Booking.start_date < end_date, Booking.end_date >= end_date),
-                and_(Booking.start_date >= start_date, Booking.end_date <= end_date)
-            )
-        )
+        return get_booking_index().overlaps(resource_id, start_date, end_date, exclude_id=exclude_id)
+    
+    def count_series_overlaps(self, resource_id: int,
+                              occurrences: List[Tuple[datetime, datetime]],
+                              exclude_id: Optional[int] = None) -> List[int]:
+        """
+        Count overlapping pending/active bookings for every occurrence of a series.
+        
+        All occurrences are joined against the bookings table in a single
+        statement (a VALUES CTE), instead of one conflict query per occurrence;
+        rule-based series overlapping the span are expanded and counted in memory.
+        
+        Args:
+            resource_id: Resource ID
+            occurrences: (start, end) tuples to check
+            exclude_id: Booking ID to leave out (a series being rescheduled)
+        
+        Returns:
+            Overlapping booking count for each occurrence, in input order
+        """
+        if not occurrences:
+            return []
+        
+        params = [bindparam('resource_id', resource_id, type_=Integer)]
+        rows = []
+        for idx, (start, end) in enumerate(occurrences):
+            rows.append(f'(:i{idx}, :s{idx}, :e{idx})')
+            params.extend([
+                bindparam(f'i{idx}', idx, type_=Integer),
+                bindparam(f's{idx}', start, type_=DateTime),
+                bindparam(f'e{idx}', end, type_=DateTime),
+            ])
+        statuses = []
+        for idx, status in enumerate(BLOCKING_STATUSES):
+            statuses.append(f':st{idx}')
+            params.append(bindparam(f'st{idx}', status, type_=String))
+        excluded = ''
+        if exclude_id is not None:
+            excluded = 'AND bookings.id != :exclude_id '
+            params.append(bindparam('exclude_id', exclude_id, type_=Integer))
+        
+        statement = text(
+            f"WITH occurrences (idx, start_date, end_date) AS (VALUES {', '.join(rows)}) "
+            "SELECT occurrences.idx, COUNT(bookings.id) "
+            "FROM occurrences LEFT OUTER JOIN bookings "
+            "ON bookings.resource_id = :resource_id "
+            f"AND bookings.status IN ({', '.join(statuses)}) "
+            "AND bookings.recurrence_rule IS NULL "
+            "AND bookings.start_date < occurrences.end_date "
+            "AND bookings.end_date > occurrences.start_date "
+            f"{excluded}"
+            "GROUP BY occurrences.idx"
+        ).bindparams(*params).columns(idx=Integer, overlaps=Integer)
         
-        if exclude_id:
+        counts = [0] * len(occurrences)
+        for idx, overlaps in db.session.execute(statement):
+            counts[idx] = overlaps
+        
+        # Occurrences of rule-based series are not rows; expand them for the series' span
+        series = sorted(
+            (start, end) for _, booking_id, start, end in load_series_intervals(
+                [resource_id], min(start for start, _ in occurrences), max(end for _, end in occurrences))
+            if booking_id != exclude_id
+        )
+        if series:
+            series_starts = [start for start, _ in series]
+            for idx, (start, end) in enumerate(occurrences):
+                candidates = series[:bisect_left(series_starts, end)]
+                counts[idx] += sum(1 for _, series_end in candidates if series_end > start)
+        return counts
+    
+    def _blocking_intervals(self, resource_id: int, start_date: datetime, end_date: datetime,
+                            exclude_id: Optional[int] = None) -> List[Tuple[datetime, datetime]]:
+        """Pending/active (start, end) intervals on a resource overlapping a window, in start order."""
+        query = db.session.query(Booking.start_date, Booking.end_date).filter(
+            Booking.resource_id == resource_id,
+            Booking.status.in_(BLOCKING_STATUSES),
+            Booking.recurrence_rule.is_(None),
+            Booking.start_date < end_date,
+            Booking.end_date > start_date
+        )
+        if exclude_id is not None:
             query = query.filter(Booking.id != exclude_id)
+        intervals = query.all()
+        intervals.extend((start, end) for _, booking_id, start, end
+                         in load_series_intervals([resource_id], start_date, end_date)
+                         if booking_id != exclude_id)
+        return sorted(intervals)
+    
+    def max_concurrency(self, resource_id: int, start_date: datetime, end_date: datetime,
+                        exclude_id: Optional[int] = None) -> int:
+        """
+        Get the peak number of simultaneous pending/active bookings on a resource.
+        
+        Only the start/end columns of bookings overlapping the window are
+        fetched (plus rule-series occurrences in it); the peak is then found
+        with a sweep line over those intervals.
+        
+        Args:
+            resource_id: Resource ID
+            start_date: Window start
+            end_date: Window end
+            exclude_id: Booking ID to leave out (a booking being rescheduled)
+        
+        Returns:
+            Maximum concurrent occupancy within [start_date, end_date)
+        """
+        return peak_concurrency(self._blocking_intervals(resource_id, start_date, end_date, exclude_id),
+                                start_date, end_date)
+    
+    def booking_count_subquery(self, statuses: Iterable[str] = ('active', 'completed')):
+        """
+        Build a subquery counting bookings per resource.
+        
+        Args:
+            statuses: Booking statuses to count
+        
+        Returns:
+            Subquery with columns resource_id and booking_count (booked resources only)
+        """
+        return db.session.query(
+            Booking.resource_id.label('resource_id'),
+            func.count(Booking.id).label('booking_count')
+        ).filter(
+            Booking.status.in_(list(statuses))
+        ).group_by(Booking.resource_id).subquery()
+    
+    def peak_concurrency_subquery(self, start_date: datetime, end_date: datetime):
+        """
+        Build a subquery of peak concurrent occupancy per resource within a window.
+        
+        Peak occupancy is always reached at the (window-clipped) start of some
+        booking, so for every pending/active booking overlapping the window the
+        bookings covering that instant are counted and the maximum is kept per
+        resource. Joining this to resources lets capacity be compared in SQL.
+        Rule-based series are not rows to join against; see series_peaks().
+        
+        Args:
+            start_date: Window start
+            end_date: Window end
+        
+        Returns:
+            Subquery with columns resource_id and peak (booked resources only)
+        """
+        booking = aliased(Booking)
+        covering = aliased(Booking)
+        instant = case((booking.start_date > start_date, booking.start_date), else_=start_date)
+        
+        concurrent = db.session.query(
+            booking.resource_id.label('resource_id'),
+            func.count(covering.id).label('concurrent')
+        ).join(covering, and_(
+            covering.resource_id == booking.resource_id,
+            covering.status.in_(BLOCKING_STATUSES),
+            covering.recurrence_rule.is_(None),
+            covering.start_date <= instant,
+            covering.end_date > instant
+        )).filter(
+            booking.status.in_(BLOCKING_STATUSES),
+            booking.recurrence_rule.is_(None),
+            booking.start_date < end_date,
+            booking.end_date > start_date
+        ).group_by(booking.id, booking.resource_id).subquery()
+        
+        return db.session.query(
+            concurrent.c.resource_id,
+            func.max(concurrent.c.concurrent).label('peak')
+        ).group_by(concurrent.c.resource_id).subquery()
+    
+    def series_peaks(self, start_date: datetime, end_date: datetime) -> Dict[int, int]:
+        """
+        Get peak concurrent occupancy for resources with rule-based series in a window.
+        
+        Covers stored bookings and expanded series occurrences together, so for
+        these resources it replaces peak_concurrency_subquery().
+        
+        Args:
+            start_date: Window start
+            end_date: Window end
+        
+        Returns:
+            Dictionary of resource ID to peak (only resources with series occurrences)
+        """
+        by_resource: Dict[int, List[Tuple[datetime, datetime]]] = {}
+        for resource_id, _, start, end in load_series_intervals(None, start_date, end_date):
+            by_resource.setdefault(resource_id, []).append((start, end))
+        if not by_resource:
+            return {}
+        
+        for resource_id, start, end in db.session.query(
+            Booking.resource_id, Booking.start_date, Booking.end_date
+        ).filter(
+            Booking.resource_id.in_(list(by_resource)),
+            Booking.status.in_(BLOCKING_STATUSES),
+            Booking.recurrence_rule.is_(None),
+            Booking.start_date < end_date,
+            Booking.end_date > start_date
+        ):
+            by_resource[resource_id].append((start, end))
+        return {
+            resource_id: peak_concurrency(intervals, start_date, end_date)
+            for resource_id, intervals in by_resource.items()
+        }
+    
+    def free_slots(self, resource_id: int, start_date: datetime, end_date: datetime,
+                   min_duration: timedelta = timedelta(0),
+                   open_time: Optional[time] = None,
+                   close_time: Optional[time] = None) -> List[Tuple[datetime, datetime]]:
+        """
+        Find the free time slots on a resource within a window.
+        
+        Fetches the resource's pending/active intervals overlapping the window
+        in start order and merges them in a single pass.
+        
+        Args:
+            resource_id: Resource ID
+            start_date: Window start
+            end_date: Window end
+            min_duration: Minimum slot length to return
+            open_time: Optional daily opening time
+            close_time: Optional daily closing time
+        
+        Returns:
+            Free (start, end) slots in chronological order
+        """
+        intervals = self._blocking_intervals(resource_id, start_date, end_date)
+        return find_free_slots(intervals, start_date, end_date, min_duration,
+                               open_time=open_time, close_time=close_time)
+    
+    def get_occupancy(self, resource_ids: List[int], start_day: date, days: int):
+        """
+        Get 15-minute occupancy counts from the cached occupancy matrices.
+        
+        Args:
+            resource_ids: Resource IDs, in output row order
+            start_day: First day
+            days: Number of days
+        
+        Returns:
+            NumPy array of shape (len(resource_ids), days, 96)
+        
+        Raises:
+            ValueError: If the days fall outside the occupancy horizon
+        """
+        return get_occupancy_service().window(resource_ids, start_day, days)
+    
+    def get_utilization(self, resource_ids: List[int], start_day: date, days: int) -> Dict[int, float]:
+        """Get the percentage of time each resource is booked over a range of days."""
+        return get_occupancy_service().utilization(resource_ids, start_day, days)
+    
+    def get_hourly_utilization(self, resource_ids: List[int], start_day: date, days: int) -> List[float]:
+        """Get utilization percentages by hour of day (24 values) across resources."""
+        return get_occupancy_service().hourly_profile(resource_ids, start_day, days)
+    
+    def _conditional_insert(self, columns: List[str]):
+        """Build INSERT ... SELECT ... WHERE NOT EXISTS (overlapping pending/active booking)."""
+        table = Booking.__table__
+        existing = table.alias('existing')
+        params = {column: bindparam(column, type_=table.c[column].type) for column in columns}
+        overlap = select(existing.c.id).where(
+            existing.c.resource_id == params['resource_id'],
+            # Individual literals rather than an expanding IN, so executemany works
+            existing.c.status.in_([literal(status) for status in BLOCKING_STATUSES]),
+            existing.c.start_date < params['end_date'],
+            existing.c.end_date > params['start_date']
+        ).exists()
+        return table.insert().from_select(
+            columns, select(*[params[column] for column in columns]).where(~overlap)
+        )
+    
+    def lock_for_admission(self, resource_id: int):
+        """
+        Take the database write lock for booking a resource (until commit or rollback).
         
-        return query.first() is not None
+        A no-op UPDATE of the resource row, issued first in the transaction:
+        SQLite then holds its database write lock (as with BEGIN IMMEDIATE),
+        other databases lock the row. Either way a concurrent admission for
+        the resource in another process waits, and conflict checks made after
+        this see every booking committed before it.
+        
+        Args:
+            resource_id: Resource being booked
+        """
+        # Plain SQL: no onupdate timestamp and no catalog change for a lock
+        db.session.execute(text('UPDATE resources SET id = id WHERE id = :resource_id'),
+                           {'resource_id': resource_id})
+    
+    def insert_if_free(self, values: dict) -> Optional[int]:
+        """
+        Insert a booking only if nothing pending/active overlaps it on its resource.
+        
+        The statement only sees plain rows and the first occurrence of a
+        rule-based series; run it under ``admit_bookings`` (see
+        utils/booking_admission.py), which holds the resource's write lock
+        while every occurrence is checked, to be safe across processes.
+        
+        Args:
+            values: Column dictionary for the booking
+        
+        Returns:
+            New booking ID, or None if the slot was taken (not committed)
+        """
+        result = db.session.execute(self._conditional_insert(list(values)), values)
+        if not result.rowcount:
+            return None
+        # Core statement: the flush hooks do not see it
+        touch_booking_feeds(db.session, [values['user_id']])
+        log_booking_changes(db.session, [(result.lastrowid, values['user_id'])])
+        invalidate_resources([values['resource_id']])
+        invalidate_occupancy([values['resource_id']])
+        return result.lastrowid
     
     def get_by_date_range(self, start_date: datetime, end_date: datetime,
                          user_id: Optional[int] = None) -> List[Booking]:
-        """Get bookings within a date range."""
-        query = self.model_class.query.filter(
-            Booking.start_date >= start_date,
-            Booking.start_date <= end_date
-        )
+        """Get bookings within a date range (rule-based series with an occurrence start in it included)."""
+        query = self.model_class.query.filter(or_(
+            and_(Booking.start_date >= start_date, Booking.start_date <= end_date),
+            and_(Booking.recurrence_rule.isnot(None),
+                 Booking.start_date < start_date,
+                 Booking.series_end_date > start_date)
+        ))
         
         if user_id:
             query = query.filter_by(user_id=user_id)
         
         return query.all()
     
+    def get_calendar_window(self, start_date: datetime, end_date: datetime,
+                            user_id: Optional[int] = None, resource_id: Optional[int] = None,
+                            statuses: Optional[Iterable[str]] = None,
+                            booking_ids: Optional[Iterable[int]] = None) -> List[Tuple[Row, datetime, datetime]]:
+        """
+        Occurrences overlapping a calendar window, as lightweight rows.
+        
+        Only the columns an event needs are selected, with a single join:
+        the booker's username for a resource calendar, or the resource's
+        title, category and location for a user calendar. Rule-based series
+        are expanded to the window, leaving out their exceptions (loaded
+        with one query).
+        
+        Args:
+            start_date: Window start
+            end_date: Window end
+            user_id: Bookings of this user (a user calendar)
+            resource_id: Bookings of this resource (a resource calendar)
+            statuses: Only bookings with these statuses (optional)
+            booking_ids: Only these bookings (optional, e.g. changed ones)
+        
+        Returns:
+            (row, occurrence_start, occurrence_end) tuples in start order
+        """
+        from ..models.resource import Resource
+        from ..models.user import User
+        columns = [Booking.id, Booking.status, Booking.notes, Booking.start_date, Booking.end_date,
+                   Booking.recurrence_rule]
+        if resource_id is not None:
+            statement = select(*columns, User.username).join(User, User.id == Booking.user_id) \
+                .where(Booking.resource_id == resource_id)
+        else:
+            statement = select(*columns, Resource.title, Resource.category, Resource.location) \
+                .join(Resource, Resource.id == Booking.resource_id)
+        if user_id is not None:
+            statement = statement.where(Booking.user_id == user_id)
+        if statuses:
+            statement = statement.where(Booking.status.in_(list(statuses)))
+        if booking_ids is not None:
+            statement = statement.where(Booking.id.in_(list(booking_ids)))
+        statement = statement.where(
+            Booking.start_date < end_date,
+            or_(and_(Booking.recurrence_rule.is_(None), Booking.end_date > start_date),
+                and_(Booking.recurrence_rule.isnot(None), Booking.series_end_date > start_date))
+        )
+        rows = db.session.execute(statement).all()
+        
+        series_ids = [row.id for row in rows if row.recurrence_rule]
+        exdates = {}
+        if series_ids:
+            for booking_id, occurrence_start in db.session.execute(
+                select(BookingException.booking_id, BookingException.occurrence_start)
+                .where(BookingException.booking_id.in_(series_ids))
+            ):
+                exdates.setdefault(booking_id, set()).add(occurrence_start)
+        
+        occurrences = []
+        for row in rows:
+            if row.recurrence_rule:
+                occurrences.extend((row, start, end) for start, end in expand_rule(
+                    row.recurrence_rule, row.start_date, row.end_date, start_date, end_date,
+                    exdates.get(row.id, ())))
+            else:
+                occurrences.append((row, row.start_date, row.end_date))
+        occurrences.sort(key=lambda occurrence: occurrence[1])
+        return occurrences
+    
+    def get_changes_since(self, user_id: int, since: Optional[int]) -> Tuple[int, Optional[List[int]]]:
+        """
+        Bookings of a user changed after a calendar sync token.
+        
+        Tokens are IDs in the booking change log (utils/booking_changes.py).
+        
+        Args:
+            user_id: Owner of the calendar
+            since: Token from the previous sync, or None for a first sync
+        
+        Returns:
+            Tuple of (token for the next sync, changed booking IDs); the IDs are
+            None if the token is missing, unknown or older than the pruned log,
+            and the calendar has to be fetched in full
+        """
+        first, latest = db.session.query(func.min(BookingChange.id), func.max(BookingChange.id)).one()
+        latest = latest or 0
+        if since is None or since > latest or (first is not None and since < first - 1):
+            return latest, None
+        booking_ids = [row[0] for row in db.session.query(BookingChange.booking_id).filter(
+            BookingChange.user_id == user_id,
+            BookingChange.id > since,
+            BookingChange.id <= latest
+        ).distinct()]
+        return latest, booking_ids
+    
+    def prune_changes(self, before: datetime) -> int:
+        """
+        Delete change log entries older than a cutoff.
+        
+        The newest entry is always kept, so current sync tokens stay valid.
+        
+        Returns:
+            Number of entries deleted
+        """
+        latest = db.session.query(func.max(BookingChange.id)).scalar()
+        if latest is None:
+            return 0
+        log = BookingChange.__table__
+        pruned = db.session.execute(
+            log.delete().where(log.c.changed_at < before, log.c.id < latest)
+        ).rowcount
+        db.session.commit()
+        return pruned
+    
+    def iter_ical_chunks(self, user_id: int, status: Optional[str] = None,
+                         start_date: Optional[datetime] = None, end_date: Optional[datetime] = None,
+                         chunk_size: int = 500) -> Iterator[List[Tuple[Row, List[datetime]]]]:
+        """
+        Stream a user's bookings for iCal export, a chunk at a time.
+        
+        Rows (booking and resource columns only, no ORM objects) are read
+        from a server-side cursor with ``yield_per``; the exceptions of the
+        rule-based series in each chunk are loaded with one query.
+        
+        Args:
+            user_id: Owner of the bookings
+            status: Only bookings with this status (optional)
+            start_date: With end_date, same window as get_by_date_range (optional)
+            end_date: Window end (optional)
+            chunk_size: Rows per chunk
+        
+        Yields:
+            Lists of (row, exception occurrence starts) pairs
+        """
+        from ..models.resource import Resource
+        statement = select(
+            Booking.id, Booking.status, Booking.notes, Booking.start_date, Booking.end_date,
+            Booking.recurrence_rule, Booking.updated_at, Booking.created_at,
+            Resource.title, Resource.category, Resource.location
+        ).join(Resource, Resource.id == Booking.resource_id).where(Booking.user_id == user_id)
+        if start_date and end_date:
+            statement = statement.where(or_(
+                and_(Booking.start_date >= start_date, Booking.start_date <= end_date),
+                and_(Booking.recurrence_rule.isnot(None),
+                     Booking.start_date < start_date,
+                     Booking.series_end_date > start_date)
+            ))
+        if status:
+            statement = statement.where(Booking.status == status)
+        statement = statement.order_by(Booking.start_date).execution_options(yield_per=chunk_size)
+        
+        for rows in db.session.execute(statement).partitions():
+            series_ids = [row.id for row in rows if row.recurrence_rule]
+            exdates = {}
+            if series_ids:
+                for booking_id, occurrence_start in db.session.execute(
+                    select(BookingException.booking_id, BookingException.occurrence_start)
+                    .where(BookingException.booking_id.in_(series_ids))
+                    .order_by(BookingException.occurrence_start)
+                ):
+                    exdates.setdefault(booking_id, []).append(occurrence_start)
+            yield [(row, exdates.get(row.id, [])) for row in rows]
+    
+    def get_occurrences(self, bookings: List[Booking], start_date: Optional[datetime] = None,
+                        end_date: Optional[datetime] = None) -> List[Tuple[Booking, datetime, datetime]]:
+        """
+        Expand bookings into their occurrences, windowed if bounds are given.
+        
+        Plain bookings yield themselves; rule-based series yield every
+        occurrence in the window except skipped/cancelled ones.
+        
+        Args:
+            bookings: Bookings to expand
+            start_date: Window start (optional)
+            end_date: Window end (optional)
+        
+        Returns:
+            (booking, occurrence_start, occurrence_end) tuples in start order
+        """
+        occurrences = []
+        for booking in bookings:
+            if booking.recurrence_rule:
+                occurrences.extend((booking, start, end)
+                                   for start, end in booking.occurrences(start_date, end_date))
+            else:
+                occurrences.append((booking, booking.start_date, booking.end_date))
+        occurrences.sort(key=lambda occurrence: occurrence[1])
+        return occurrences
+    
+    def add_exceptions(self, booking_id: int, occurrence_starts: List[datetime],
+                       reason: str = 'cancelled') -> int:
+        """
+        Remove occurrences from a rule-based series with a single bulk INSERT.
+        
+        Args:
+            booking_id: Series parent booking ID
+            occurrence_starts: Start of each occurrence to remove
+            reason: 'skipped' (conflict at creation) or 'cancelled'
+        
+        Returns:
+            Number of exceptions inserted (not committed)
+        """
+        if not occurrence_starts:
+            return 0
+        now = datetime.utcnow()
+        db.session.execute(BookingException.__table__.insert(), [
+            {'booking_id': booking_id, 'occurrence_start': start, 'reason': reason, 'created_at': now}
+            for start in occurrence_starts
+        ])
+        touch_booking_feeds(db.session, booking_ids=[booking_id])
+        log_booking_changes(db.session, where=Booking.__table__.c.id == booking_id)
+        resource_ids = [row[0] for row in db.session.query(Booking.resource_id).filter(Booking.id == booking_id)]
+        invalidate_resources(resource_ids)
+        invalidate_occupancy(resource_ids)
+        return len(occurrence_starts)
+    
+    def reschedule_exceptions(self, booking_id: int, old_starts: List[datetime],
+                              new_starts: List[datetime]) -> List[datetime]:
+        """
+        Re-key a rescheduled series' exceptions to its new occurrences.
+        
+        Exceptions are keyed by occurrence start, which moves with the series.
+        A cancelled occurrence keeps its position in the series (the third
+        occurrence stays cancelled); skipped ones are dropped so the caller
+        checks them again, as are positions past the series' new end.
+        
+        Args:
+            booking_id: Series parent booking ID
+            old_starts: Occurrence starts before the change, in order
+            new_starts: Occurrence starts after the change, in order
+        
+        Returns:
+            Starts of the occurrences still cancelled (not committed)
+        """
+        positions = {start: idx for idx, start in enumerate(old_starts)}
+        cancelled = db.session.query(BookingException.occurrence_start).filter(
+            BookingException.booking_id == booking_id,
+            BookingException.reason == 'cancelled'
+        ).all()
+        kept = [new_starts[positions[start]] for start, in cancelled
+                if positions.get(start, len(new_starts)) < len(new_starts)]
+        db.session.query(BookingException).filter(
+            BookingException.booking_id == booking_id
+        ).delete(synchronize_session=False)
+        if kept:
+            now = datetime.utcnow()
+            db.session.execute(BookingException.__table__.insert(), [
+                {'booking_id': booking_id, 'occurrence_start': start, 'reason': 'cancelled', 'created_at': now}
+                for start in kept
+            ])
+        touch_booking_feeds(db.session, booking_ids=[booking_id])
+        log_booking_changes(db.session, where=Booking.__table__.c.id == booking_id)
+        resource_ids = [row[0] for row in db.session.query(Booking.resource_id).filter(Booking.id == booking_id)]
+        invalidate_resources(resource_ids)
+        invalidate_occupancy(resource_ids)
+        return kept
+    
     def get_recurring_children(self, parent_booking_id: int) -> List[Booking]:
         """Get all child bookings for a recurring booking series."""
         return self.model_class.query.filter_by(
             parent_booking_id=parent_booking_id
         ).all()
     
+    def cancel_series(self, parent_booking_id: int) -> List[Tuple[int, int, int, datetime, datetime]]:
+        """
+        Cancel a booking and all of its recurring children with one UPDATE.
+        
+        Completed and already-cancelled occurrences are left untouched. A
+        rule-based series (one row) is ended instead: occurrences that have
+        already started are kept by moving the rule's UNTIL back to the last
+        of them, and only if none has does the whole row become cancelled.
+        
+        Args:
+            parent_booking_id: ID of the series' parent booking
+        
+        Returns:
+            One (user_id, resource_id, cancelled_count, first_start, last_end)
+            row per booker/resource affected (not committed)
+        """
+        table = Booking.__table__
+        series = db.session.execute(
+            select(table.c.user_id, table.c.resource_id, table.c.start_date, table.c.end_date,
+                   table.c.recurrence_rule)
+            .where(table.c.id == parent_booking_id,
+                   table.c.recurrence_rule.isnot(None),
+                   table.c.status.notin_(['cancelled', 'completed']))
+        ).first()
+        if series is not None:
+            return self._end_rule_series(parent_booking_id, series)
+        
+        in_series = and_(
+            (table.c.id == parent_booking_id) | (table.c.parent_booking_id == parent_booking_id),
+            table.c.status.notin_(['cancelled', 'completed'])
+        )
+        affected = db.session.execute(
+            select(table.c.user_id, table.c.resource_id, func.count(table.c.id),
+                   func.min(table.c.start_date), func.max(table.c.end_date))
+            .where(in_series)
+            .group_by(table.c.user_id, table.c.resource_id)
+        ).all()
+        if not affected:
+            return []
+        
+        log_booking_changes(db.session, where=in_series)
+        db.session.execute(table.update().where(in_series).values(status='cancelled'))
+        touch_booking_feeds(db.session, {row[0] for row in affected})
+        resource_ids = {row[1] for row in affected}
+        invalidate_resources(resource_ids)
+        invalidate_occupancy(resource_ids)
+        return [tuple(row) for row in affected]
+    
+    def _end_rule_series(self, booking_id: int, series: Row) -> List[Tuple[int, int, int, datetime, datetime]]:
+        """Cancel the occurrences of a rule-based series that have not started yet (see ``cancel_series``)."""
+        exdates = [start for start, in db.session.query(BookingException.occurrence_start).filter(
+            BookingException.booking_id == booking_id)]
+        occurrences = expand_rule(series.recurrence_rule, series.start_date, series.end_date, exdates=exdates)
+        now = datetime.utcnow()
+        upcoming = [occurrence for occurrence in occurrences if occurrence[0] >= now]
+        if not upcoming:
+            return []
+        held = occurrences[:len(occurrences) - len(upcoming)]
+        if held:
+            values = {'recurrence_rule': limit_rule(series.recurrence_rule, held[-1][0]),
+                      'series_end_date': held[-1][1]}
+        else:
+            values = {'status': 'cancelled'}
+        
+        table = Booking.__table__
+        log_booking_changes(db.session, where=table.c.id == booking_id)
+        db.session.execute(table.update().where(table.c.id == booking_id).values(**values))
+        touch_booking_feeds(db.session, [series.user_id])
+        invalidate_resources([series.resource_id])
+        invalidate_occupancy([series.resource_id])
+        return [(series.user_id, series.resource_id, len(upcoming), upcoming[0][0], upcoming[-1][1])]
+    
     def update_status(self, booking_id: int, status: str) -> Optional[Booking]:
         """Update booking status."""
         booking = self.get_by_id(booking_id)
@@ -1,11 +1,12 @@
 """
 Data Access Object for CalendarSubscription model.
 """
-from typing import Optional
+from typing import Optional, Tuple
 from datetime import datetime
 from .base_dao import BaseDAO
 from ..models.calendar_subscription import CalendarSubscription
 from ..extensions import db
+from ..utils.access_stats import get_access_stats
 
 
 class CalendarSubscriptionDAO(BaseDAO):
@@ -42,4 +43,22 @@ class CalendarSubscriptionDAO(BaseDAO):
             subscription.access_count += 1
             db.session.commit()
         return subscription
+    
+    def buffer_access(self, subscription_id: int):
+        """Record an access in memory; it is written with others in a later batched UPDATE."""
+        get_access_stats().record(subscription_id)
+    
+    def get_access_stats(self, subscription: CalendarSubscription) -> Tuple[int, Optional[datetime]]:
+        """
+        Get the access count and last access time, including accesses not yet written.
+        
+        Args:
+            subscription: Subscription as loaded from the database
+        
+        Returns:
+            Tuple of (access count, last access time or None)
+        """
+        pending_count, pending_at = get_access_stats().pending(subscription.id)
+        accessed_at = max(filter(None, (subscription.last_accessed_at, pending_at)), default=None)
+        return (subscription.access_count or 0) + pending_count, accessed_at
 
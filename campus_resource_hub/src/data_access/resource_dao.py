@@ -1,12 +1,18 @@
 """
 Data Access Object for Resource model.
 """
-from typing import Optional, List
-from sqlalchemy import or_, func
+from typing import Dict, Iterable, Optional, List, Tuple
+from sqlalchemy import or_, func, select, update
+from sqlalchemy.orm.attributes import set_committed_value
 from .base_dao import BaseDAO
 from ..models.resource import Resource
 from ..models.resource_image import ResourceImage
+from ..models.review import Review
+from ..models.equipment_tag import EquipmentTag, resource_tags
 from ..extensions import db
+from ..utils.resource_search import apply_text_search
+from ..utils.equipment_tags import apply_tag_filter, sync_resource_tags
+from ..utils.catalog import get_catalog
 
 
 class ResourceDAO(BaseDAO):
@@ -16,7 +22,7 @@ class ResourceDAO(BaseDAO):
         super().__init__(Resource)
     
     def get_published(self) -> List[Resource]:
-        """Get all published resources."""
+        """Get all published resources (``get_catalog().entries`` has read-only snapshot copies)."""
         return self.model_class.query.filter_by(status='published').all()
     
     def get_by_category(self, category: str) -> List[Resource]:
@@ -27,26 +33,27 @@ class ResourceDAO(BaseDAO):
         ).all()
     
     def search(self, query: str = None, category: str = None, location: str = None,
-               min_capacity: Optional[int] = None) -> List[Resource]:
+               min_capacity: Optional[int] = None, any_term: bool = False,
+               limit: Optional[int] = None, tags: Optional[Iterable[str]] = None,
+               match_all_tags: bool = True) -> List[Resource]:
         """
         Search resources with filters.
         
         Args:
-            query: Keyword search in title/description
+            query: Full-text keyword search (title, description, category, location, equipment)
             category: Filter by category
             location: Filter by location
             min_capacity: Minimum capacity filter
+            any_term: Match resources containing any keyword instead of all of them
+            limit: Maximum number of results (optional)
+            tags: Equipment tags the resources must have
+            match_all_tags: Require every tag (True) or any of them (False)
             
         Returns:
-            List of matching resources
+            List of matching resources, best matches first when searching by keyword
         """
         resources = self.model_class.query.filter(Resource.status == 'published')
-        
-        if query:
-            resources = resources.filter(or_(
-                Resource.title.ilike(f'%{query}%'),
-                Resource.description.ilike(f'%{query}%')
-            ))
+        resources, relevance = apply_text_search(resources, query, any_term=any_term)
         
         if category:
             resources = resources.filter(Resource.category == category)
@@ -57,6 +64,12 @@ class ResourceDAO(BaseDAO):
         if min_capacity:
             resources = resources.filter(Resource.capacity >= min_capacity)
         
+        resources = apply_tag_filter(resources, tags, match_all=match_all_tags)
+        
+        if relevance is not None:
+            resources = resources.order_by(relevance, Resource.id)
+        if limit:
+            resources = resources.limit(limit)
         return resources.all()
     
     def get_by_owner(self, owner_id: int) -> List[Resource]:
@@ -71,24 +84,118 @@ class ResourceDAO(BaseDAO):
         ).all()
     
     def get_categories(self) -> List[str]:
-        """Get all distinct categories."""
-        results = self.model_class.query.filter_by(
-            status='published'
-        ).with_entities(Resource.category).distinct().all()
-        return [cat[0] for cat in results]
+        """Get all distinct categories of published resources (from the catalog snapshot)."""
+        return list(get_catalog().categories)
     
     def get_locations(self) -> List[str]:
-        """Get all distinct locations."""
-        results = self.model_class.query.filter(
-            Resource.status == 'published',
-            Resource.location.isnot(None),
-            Resource.location != ''
-        ).with_entities(Resource.location).distinct().all()
-        return [loc[0] for loc in results]
+        """Get all distinct locations of published resources (from the catalog snapshot)."""
+        return list(get_catalog().locations)
+    
+    def get_equipment_tags(self) -> List[Tuple[str, int]]:
+        """Get equipment tags used by published resources, with resource counts."""
+        return db.session.query(EquipmentTag.name, func.count(resource_tags.c.resource_id)).join(
+            resource_tags, resource_tags.c.tag_id == EquipmentTag.id
+        ).join(
+            Resource, Resource.id == resource_tags.c.resource_id
+        ).filter(
+            Resource.status == 'published'
+        ).group_by(EquipmentTag.name).order_by(EquipmentTag.name).all()
+    
+    def rebuild_equipment_tags(self) -> int:
+        """
+        Re-link every resource's tags from its equipment text.
+        
+        Used after resources were written with raw SQL. Tags no longer
+        used by any resource are removed.
+        
+        Returns:
+            Number of resources processed
+        """
+        resources = self.model_class.query.all()
+        sync_resource_tags(db.session, resources)
+        db.session.flush()
+        EquipmentTag.query.filter(
+            ~EquipmentTag.id.in_(select(resource_tags.c.tag_id))
+        ).delete(synchronize_session=False)
+        db.session.commit()
+        return len(resources)
     
     def get_images(self, resource_id: int) -> List[ResourceImage]:
         """Get all images for a resource."""
         return ResourceImage.query.filter_by(
             resource_id=resource_id
         ).order_by(ResourceImage.display_order).all()
-
+    
+    def get_images_for(self, resource_ids: Iterable[int]) -> Dict[int, List[ResourceImage]]:
+        """
+        Get the images of many resources with a single IN query.
+        
+        Args:
+            resource_ids: Resource IDs (e.g. one page of a listing)
+        
+        Returns:
+            Dictionary of resource ID to its images in display order (every ID present)
+        """
+        resource_ids = list(resource_ids)
+        images = {resource_id: [] for resource_id in resource_ids}
+        if not resource_ids:
+            return images
+        for image in ResourceImage.query.filter(
+            ResourceImage.resource_id.in_(resource_ids)
+        ).order_by(ResourceImage.resource_id, ResourceImage.display_order, ResourceImage.id):
+            images[image.resource_id].append(image)
+        return images
+    
+    def attach_images(self, resources: List[Resource]) -> List[Resource]:
+        """
+        Populate ``resource.images`` for a list of resources in one query.
+        
+        The collections are set as loaded state, so nothing is marked as
+        modified and templates read them without further queries.
+        
+        Args:
+            resources: Resources about to be rendered
+        
+        Returns:
+            The same list, for chaining
+        """
+        images = self.get_images_for(resource.id for resource in resources)
+        for resource in resources:
+            set_committed_value(resource, 'images', images[resource.id])
+        return resources
+    
+    def recompute_ratings(self, resource_ids: Optional[Iterable[int]] = None) -> int:
+        """
+        Recompute the stored rating aggregates from the reviews table.
+        
+        Used to backfill the columns and to repair drift from rows written
+        outside the ORM. Only rows whose stored values differ are updated.
+        
+        Args:
+            resource_ids: Limit the repair to these resources (None for all)
+        
+        Returns:
+            Number of resources whose aggregates were corrected
+        """
+        visible = (Review.resource_id == Resource.id) & (Review.is_hidden == False)  # noqa: E712
+        actual_sum = func.coalesce(
+            select(func.sum(Review.rating)).where(visible).scalar_subquery(), 0)
+        actual_count = select(func.count(Review.id)).where(visible).scalar_subquery()
+        actual_avg = func.coalesce(
+            select(func.avg(Review.rating)).where(visible).scalar_subquery(), 0.0)
+        
+        stmt = update(Resource).where(or_(
+            Resource.rating_sum != actual_sum,
+            Resource.rating_count != actual_count,
+            func.abs(Resource.avg_rating - actual_avg) > 1e-9
+        )).values(
+            rating_sum=actual_sum,
+            rating_count=actual_count,
+            avg_rating=actual_avg
+        ).execution_options(synchronize_session=False)
+        if resource_ids is not None:
+            stmt = stmt.where(Resource.id.in_(list(resource_ids)))
+        
+        repaired = db.session.execute(stmt).rowcount
+        db.session.commit()
+        return repaired
@@ -5,6 +5,9 @@ from ..extensions import db
 from .user import User
 from .resource import Resource
 from .booking import Booking
+from .booking_exception import BookingException
+from .booking_change import BookingChange
+from .booking_version import BookingVersion
 from .message import Message
 from .waitlist import Waitlist
 from .review import Review
@@ -12,5 +15,7 @@ from .admin_log import AdminLog
 from .resource_image import ResourceImage
 from .notification import Notification
 from .calendar_subscription import CalendarSubscription
+from .equipment_tag import EquipmentTag
+from .catalog_version import CatalogVersion
 
-__all__ = ['db', 'User', 'Resource', 'Booking', 'Message', 'Waitlist', 'Review', 'AdminLog', 'ResourceImage', 'Notification', 'CalendarSubscription']
\ No newline at end of file
+__all__ = ['db', 'User', 'Resource', 'Booking', 'BookingException', 'BookingChange', 'BookingVersion', 'Message', 'Waitlist', 'Review', 'AdminLog', 'ResourceImage', 'Notification', 'CalendarSubscription', 'EquipmentTag', 'CatalogVersion']
\ No newline at end of file
@@ -1,8 +1,21 @@
 from datetime import datetime
 from ..extensions import db
+from ..utils.recurrence import expand_rule
+from ..utils import ical_feed  # noqa: F401 - keeps User.bookings_updated_at in step
+from ..utils import booking_changes  # noqa: F401 - logs booking writes for calendar delta sync
 
 class Booking(db.Model):
     __tablename__ = 'bookings'
+    __table_args__ = (
+        # Conflict/capacity checks and per-resource listings
+        db.Index('ix_bookings_resource_status_start', 'resource_id', 'status', 'start_date'),
+        # "My bookings" and per-user date range queries
+        db.Index('ix_bookings_user_start', 'user_id', 'start_date'),
+        # Cross-resource window queries (search availability, reports)
+        db.Index('ix_bookings_status_start', 'status', 'start_date'),
+        db.Index('ix_bookings_start_date', 'start_date'),
+        db.Index('ix_bookings_parent_booking_id', 'parent_booking_id'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -17,7 +30,10 @@ class Booking(db.Model):
     # Recurrence fields
     recurrence_type = db.Column(db.String(20), nullable=True)  # 'daily', 'weekly', 'monthly', or None
     recurrence_end_date = db.Column(db.DateTime, nullable=True)  # End date for recurrence series
-    parent_booking_id = db.Column(db.Integer, db.ForeignKey('bookings.id'), nullable=True)  # Link to parent booking in series
+    parent_booking_id = db.Column(db.Integer, db.ForeignKey('bookings.id'), nullable=True)  # Link to parent booking in series (legacy materialized series)
+    # Rule-based series: one row whose occurrences are expanded on demand
+    recurrence_rule = db.Column(db.String(255), nullable=True)  # RFC 5545 RRULE, e.g. 'FREQ=WEEKLY;UNTIL=20260601T090000'
+    series_end_date = db.Column(db.DateTime, nullable=True)  # End of the last occurrence, bounds window queries
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
@@ -25,10 +41,46 @@ class Booking(db.Model):
     user = db.relationship('User', foreign_keys=[user_id], lazy='joined')
     # resource relationship is provided by backref from Resource.bookings
     parent_booking = db.relationship('Booking', remote_side=[id], backref='child_bookings')
+    exceptions = db.relationship('BookingException', backref='booking', lazy=True,
+                                 cascade='all, delete-orphan')
 
     def __repr__(self):
         return f'<Booking {self.id}>'
     
+    @property
+    def is_rule_series(self):
+        """True if occurrences are expanded from recurrence_rule rather than stored."""
+        return bool(self.recurrence_rule)
+    
+    @property
+    def occurrence_count(self):
+        """Number of instances in the series (1 for a single booking)."""
+        if self.recurrence_rule:
+            return len(self.occurrences())
+        return 1 + len(self.child_bookings)
+    
+    def occurrences(self, window_start=None, window_end=None, include_exceptions=False):
+        """
+        Expand the booking into (start, end) occurrences.
+        
+        Args:
+            window_start: Only occurrences ending after this (optional)
+            window_end: Only occurrences starting before this (optional)
+            include_exceptions: Keep skipped/cancelled occurrences
+        
+        Returns:
+            List of (start, end) tuples in chronological order
+        """
+        if not self.recurrence_rule:
+            if window_start and self.end_date <= window_start:
+                return []
+            if window_end and self.start_date >= window_end:
+                return []
+            return [(self.start_date, self.end_date)]
+        exdates = () if include_exceptions else {e.occurrence_start for e in self.exceptions}
+        return expand_rule(self.recurrence_rule, self.start_date, self.end_date,
+                           window_start, window_end, exdates)
+    
     @property
     def start_time_display(self):
         """Formatted start time for display (uses start_date)."""
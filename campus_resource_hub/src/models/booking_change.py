@@ -0,0 +1,25 @@
+from datetime import datetime
+from ..extensions import db
+
+class BookingChange(db.Model):
+    """One entry of the booking change log read by calendar delta sync.
+    
+    Written in the same transaction as any write to a booking (or its series
+    exceptions); the autoincrement ID is the change sequence that sync
+    tokens refer to. Old entries are removed by ``flask prune-booking-changes``."""
+    __tablename__ = 'booking_changes'
+    __table_args__ = (
+        # Delta reads: one user's changes after a token
+        db.Index('ix_booking_changes_user_id', 'user_id', 'id'),
+        db.Index('ix_booking_changes_changed_at', 'changed_at'),
+        # IDs are never reused, even after the newest rows are pruned
+        {'sqlite_autoincrement': True},
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    booking_id = db.Column(db.Integer, nullable=False)  # No foreign key: deletions are logged too
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    changed_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    
+    def __repr__(self):
+        return f'<BookingChange {self.id} booking={self.booking_id}>'
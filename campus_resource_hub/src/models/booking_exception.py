@@ -0,0 +1,18 @@
+from datetime import datetime
+from ..extensions import db
+
+class BookingException(db.Model):
+    """An occurrence removed from a rule-based recurring booking series."""
+    __tablename__ = 'booking_exceptions'
+    __table_args__ = (
+        db.UniqueConstraint('booking_id', 'occurrence_start', name='uq_booking_exceptions_occurrence'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    booking_id = db.Column(db.Integer, db.ForeignKey('bookings.id', ondelete='CASCADE'), nullable=False)
+    occurrence_start = db.Column(db.DateTime, nullable=False)  # Start of the removed occurrence
+    reason = db.Column(db.String(20), nullable=False, default='cancelled')  # skipped (conflict at creation), cancelled
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    
+    def __repr__(self):
+        return f'<BookingException {self.booking_id} @ {self.occurrence_start}>'
@@ -0,0 +1,23 @@
+from sqlalchemy import DDL, event
+from ..extensions import db
+
+class BookingVersion(db.Model):
+    """Per-resource counter bumped by every write to its bookings.
+    
+    Each worker compares it with the version its in-memory interval index
+    (utils/booking_index.py) was loaded at, to notice bookings written by
+    other workers. Row 0 is bumped by bulk writes that may touch any resource."""
+    __tablename__ = 'booking_versions'
+    
+    resource_id = db.Column(db.Integer, primary_key=True, autoincrement=False)  # No foreign key: 0 means every resource
+    version = db.Column(db.Integer, default=0, server_default='0', nullable=False)
+    
+    def __repr__(self):
+        return f'<BookingVersion resource={self.resource_id} {self.version}>'
+
+
+# The "every resource" row exists as soon as the table does (db.create_all(), tests)
+event.listen(
+    BookingVersion.__table__, 'after_create',
+    DDL("INSERT INTO booking_versions (resource_id, version) VALUES (0, 0)")
+)
@@ -0,0 +1,22 @@
+from sqlalchemy import DDL, event
+from ..extensions import db
+
+class CatalogVersion(db.Model):
+    """Single-row counter bumped by every write to the published catalog.
+    
+    Each worker compares it with the version of its in-memory catalog
+    snapshot (utils/catalog.py) to notice writes made by other workers."""
+    __tablename__ = 'catalog_versions'
+    
+    id = db.Column(db.Integer, primary_key=True)  # Always 1
+    version = db.Column(db.Integer, default=0, server_default='0', nullable=False)
+    
+    def __repr__(self):
+        return f'<CatalogVersion {self.version}>'
+
+
+# The counter row exists as soon as the table does (db.create_all(), tests)
+event.listen(
+    CatalogVersion.__table__, 'after_create',
+    DDL("INSERT INTO catalog_versions (id, version) VALUES (1, 0)")
+)
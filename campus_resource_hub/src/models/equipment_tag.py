@@ -0,0 +1,23 @@
+from datetime import datetime
+from ..extensions import db
+from ..utils import equipment_tags  # noqa: F401 - keeps Resource.tags in step with Resource.equipment
+
+# Resource <-> tag join table. The (tag_id, resource_id) index is the inverted
+# index used by tag filters: one index range per tag lists its resources.
+resource_tags = db.Table(
+    'resource_tags',
+    db.Column('resource_id', db.Integer, db.ForeignKey('resources.id', ondelete='CASCADE'), primary_key=True),
+    db.Column('tag_id', db.Integer, db.ForeignKey('equipment_tags.id', ondelete='CASCADE'), primary_key=True),
+    db.Index('ix_resource_tags_tag_resource', 'tag_id', 'resource_id'),
+)
+
+class EquipmentTag(db.Model):
+    """A normalized equipment item (e.g. "projector") shared by resources."""
+    __tablename__ = 'equipment_tags'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), unique=True, nullable=False)  # Lower-case, single-spaced
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    
+    def __repr__(self):
+        return f'<EquipmentTag {self.name}>'
@@ -3,6 +3,11 @@ from ..extensions import db
 
 class Message(db.Model):
     __tablename__ = 'messages'
+    __table_args__ = (
+        db.Index('ix_messages_recipient_hidden_created', 'recipient_id', 'is_hidden', 'created_at'),
+        db.Index('ix_messages_sender_hidden_created', 'sender_id', 'is_hidden', 'created_at'),
+        db.Index('ix_messages_flagged_hidden_created', 'is_flagged', 'is_hidden', 'created_at'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     sender_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
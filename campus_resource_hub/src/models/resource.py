@@ -3,6 +3,12 @@ from ..extensions import db
 
 class Resource(db.Model):
     __tablename__ = 'resources'
+    __table_args__ = (
+        # Keyset pagination of search results per sort order (id is the implicit tiebreaker)
+        db.Index('ix_resources_status_title', 'status', 'title'),
+        db.Index('ix_resources_status_created', 'status', 'created_at'),
+        db.Index('ix_resources_status_avg_rating', 'status', 'avg_rating'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(100), nullable=False)
@@ -19,6 +25,10 @@ class Resource(db.Model):
     requires_approval = db.Column(db.Boolean, default=False, nullable=False)
     status = db.Column(db.String(20), default='draft', nullable=False)  # draft, published, archived
     equipment = db.Column(db.Text, nullable=True)  # Comma-separated list of equipment
+    # Visible-review aggregates, kept in step with reviews by utils/rating_aggregates.py
+    rating_sum = db.Column(db.Integer, default=0, server_default='0', nullable=False)
+    rating_count = db.Column(db.Integer, default=0, server_default='0', nullable=False)
+    avg_rating = db.Column(db.Float, default=0.0, server_default='0', nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
@@ -26,14 +36,13 @@ class Resource(db.Model):
     owner = db.relationship('User', foreign_keys=[owner_id], lazy='joined')
     bookings = db.relationship('Booking', backref='resource', lazy='dynamic')
     reviews = db.relationship('Review', backref='resource_review', lazy='dynamic', cascade='all, delete-orphan')
+    # Normalized equipment, kept in step with the equipment column by utils/equipment_tags.py
+    tags = db.relationship('EquipmentTag', secondary='resource_tags', order_by='EquipmentTag.name',
+                           backref=db.backref('resources', lazy='dynamic'))
     
     def average_rating(self):
-        """Calculate average rating for this resource (only visible reviews)."""
-        from sqlalchemy import func
-        # Import Review here to avoid circular imports
-        from .review import Review as ReviewModel
-        result = db.session.query(func.avg(ReviewModel.rating)).filter_by(resource_id=self.id, is_hidden=False).scalar()
-        return round(result, 1) if result else 0.0
+        """Average rating for this resource (only visible reviews)."""
+        return round(self.avg_rating, 1) if self.rating_count else 0.0
     
     def rating_percentage(self):
         """Get rating as percentage (out of 100)."""
@@ -42,9 +51,7 @@ class Resource(db.Model):
     
     def review_count(self):
         """Get total number of visible reviews."""
-        # Import Review here to avoid circular imports
-        from .review import Review as ReviewModel
-        return ReviewModel.query.filter_by(resource_id=self.id, is_hidden=False).count()
+        return self.rating_count or 0
 
     def __repr__(self):
         return f'<Resource {self.title}>'
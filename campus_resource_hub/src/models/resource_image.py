@@ -11,8 +11,10 @@ class ResourceImage(db.Model):
     display_order = db.Column(db.Integer, default=0, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
     
-    # Relationship
-    resource = db.relationship('Resource', backref='images', lazy='joined')
+    # Relationship (images are loaded through their resource, so the resource is
+    # not joined back in; listing pages batch-load with ResourceDAO.attach_images)
+    resource = db.relationship('Resource',
+                               backref=db.backref('images', order_by='ResourceImage.display_order'))
     
     def __repr__(self):
         return f'<ResourceImage {self.id} for Resource {self.resource_id}>'
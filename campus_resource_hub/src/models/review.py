@@ -1,8 +1,13 @@
 from datetime import datetime
 from ..extensions import db
+from ..utils import rating_aggregates  # noqa: F401 - keeps Resource rating columns in step
 
 class Review(db.Model):
     __tablename__ = 'reviews'
+    __table_args__ = (
+        db.Index('ix_reviews_resource_hidden_created', 'resource_id', 'is_hidden', 'created_at'),
+        db.Index('ix_reviews_user_resource', 'user_id', 'resource_id'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -18,6 +18,8 @@ class User(db.Model, UserMixin):
     is_suspended = db.Column(db.Boolean, default=False, nullable=False)
     suspension_reason = db.Column(db.Text, nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Last write to this user's bookings, versions their iCal feed (utils/ical_feed.py)
+    bookings_updated_at = db.Column(db.DateTime, nullable=True)
     
     def __repr__(self):
         return f'<User {self.username}>'
\ No newline at end of file
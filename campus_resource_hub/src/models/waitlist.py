@@ -3,6 +3,12 @@ from ..extensions import db
 
 class Waitlist(db.Model):
     __tablename__ = 'waitlist'
+    __table_args__ = (
+        db.Index('ix_waitlist_resource_status_created', 'resource_id', 'status', 'created_at'),
+        db.Index('ix_waitlist_user_resource_status', 'user_id', 'resource_id', 'status'),
+        # Expired-entry sweep
+        db.Index('ix_waitlist_status_requested_end', 'status', 'requested_end_date'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
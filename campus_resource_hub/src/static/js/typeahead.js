@@ -0,0 +1,41 @@
+// Typeahead for inputs with a data-suggest-url attribute.
+// Suggestions are fetched as the user types and shown through the input's datalist.
+document.addEventListener('DOMContentLoaded', function() {
+    document.querySelectorAll('input[data-suggest-url]').forEach(function(input) {
+        const list = document.getElementById(input.getAttribute('list'));
+        if (!list) {
+            return;
+        }
+        let timer = null;
+        let latest = '';
+
+        input.addEventListener('input', function() {
+            clearTimeout(timer);
+            const text = input.value.trim();
+            if (!text) {
+                list.innerHTML = '';
+                return;
+            }
+            timer = setTimeout(function() {
+                latest = text;
+                const url = input.dataset.suggestUrl + '?q=' + encodeURIComponent(text);
+                fetch(url, {credentials: 'same-origin'})
+                    .then(function(response) { return response.ok ? response.json() : {suggestions: []}; })
+                    .then(function(data) {
+                        // Ignore answers to keystrokes that have been typed over
+                        if (text !== latest) {
+                            return;
+                        }
+                        list.innerHTML = '';
+                        data.suggestions.forEach(function(suggestion) {
+                            const option = document.createElement('option');
+                            option.value = suggestion.value;
+                            option.label = suggestion.type === 'user' ? suggestion.label : suggestion.label + ' (' + suggestion.type + ')';
+                            list.appendChild(option);
+                        });
+                    })
+                    .catch(function() {});
+            }, 120);
+        });
+    });
+});
@@ -0,0 +1,143 @@
+"""
+Write-behind buffer for calendar subscription access statistics.
+
+Every poll of an iCal subscription feed used to read the subscription again
+and commit ``access_count + 1`` and ``last_accessed_at``, turning a read-only
+endpoint into a write that contends for the SQLite write lock. Polls are now
+counted in process memory and written in one batched UPDATE (one statement,
+one transaction) when ``ACCESS_STATS_FLUSH_SECONDS`` have passed since the
+last write, and when the process exits. ``pending()`` exposes the unwritten
+part, so status pages can add it to the stored values.
+
+Up to ``ACCESS_STATS_FLUSH_SECONDS`` of counts can be lost if a worker is
+killed without a normal shutdown, or if the database is already gone when
+the exit flush runs (it is skipped for testing apps); these are statistics,
+not billing data.
+"""
+import atexit
+import logging
+import threading
+import time
+import weakref
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from flask import current_app
+from sqlalchemy import bindparam, case, or_, update
+from sqlalchemy.exc import OperationalError, SQLAlchemyError
+
+logger = logging.getLogger(__name__)
+
+_EXTENSION_KEY = 'access_stats'
+
+
+class AccessStatsBuffer:
+    """Access counts of one application not yet written to the database."""
+    
+    def __init__(self, engine, flush_seconds: float = 30.0):
+        self.engine = engine
+        self.flush_seconds = flush_seconds
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        # subscription_id -> [access count, last access time]
+        self._pending: Dict[int, List] = {}
+        self._flushed_at = time.monotonic()
+    
+    def record(self, subscription_id: int, accessed_at: Optional[datetime] = None):
+        """
+        Count one access, writing the buffer out if it is due.
+        
+        Args:
+            subscription_id: Accessed subscription
+            accessed_at: Time of the access (defaults to now)
+        """
+        accessed_at = accessed_at or datetime.utcnow()
+        with self._lock:
+            stats = self._pending.setdefault(subscription_id, [0, accessed_at])
+            stats[0] += 1
+            stats[1] = max(stats[1], accessed_at)
+            due = time.monotonic() - self._flushed_at >= self.flush_seconds
+        if due:
+            self.flush()
+    
+    def pending(self, subscription_id: int) -> Tuple[int, Optional[datetime]]:
+        """
+        Unwritten accesses of one subscription.
+        
+        Returns:
+            Tuple of (access count, last access time or None)
+        """
+        with self._lock:
+            count, accessed_at = self._pending.get(subscription_id, (0, None))
+        return count, accessed_at
+    
+    def flush(self, requeue: bool = True) -> int:
+        """
+        Write every buffered count in one batched UPDATE.
+        
+        Args:
+            requeue: Put the counts back into the buffer if the write fails;
+                False drops them and raises (nothing will retry, e.g. at exit)
+        
+        Returns:
+            Number of subscriptions updated
+        """
+        from ..models.calendar_subscription import CalendarSubscription
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, {}
+                self._flushed_at = time.monotonic()
+            if not batch:
+                return 0
+            
+            table = CalendarSubscription.__table__
+            statement = update(table).where(table.c.id == bindparam('subscription_id')).values(
+                access_count=table.c.access_count + bindparam('increment'),
+                last_accessed_at=case(
+                    (or_(table.c.last_accessed_at.is_(None), table.c.last_accessed_at < bindparam('accessed_at')),
+                     bindparam('accessed_at')),
+                    else_=table.c.last_accessed_at))
+            rows = [{'subscription_id': subscription_id, 'increment': count, 'accessed_at': accessed_at}
+                    for subscription_id, (count, accessed_at) in batch.items()]
+            try:
+                with self.engine.begin() as connection:
+                    connection.execute(statement, rows)
+            except SQLAlchemyError as exc:
+                if not requeue:
+                    raise
+                logger.warning("Subscription access stats not written, retrying later: %s", exc)
+                with self._lock:
+                    for subscription_id, (count, accessed_at) in batch.items():
+                        stats = self._pending.setdefault(subscription_id, [0, accessed_at])
+                        stats[0] += count
+                        stats[1] = max(stats[1], accessed_at)
+                return 0
+            return len(rows)
+
+
+def _flush_at_exit(app_ref: 'weakref.ref'):
+    """Write an application's remaining counts when the process exits."""
+    app = app_ref()
+    # Test apps drop their database before the interpreter exits
+    if app is None or app.config.get('TESTING') or _EXTENSION_KEY not in app.extensions:
+        return
+    try:
+        with app.app_context():
+            app.extensions[_EXTENSION_KEY].flush(requeue=False)
+    except OperationalError:
+        # Database already gone or unreachable: the counts are dropped
+        pass
+    except Exception as exc:  # Never fail interpreter shutdown
+        logger.warning("Subscription access stats lost at shutdown: %s", exc)
+
+
+def get_access_stats() -> AccessStatsBuffer:
+    """Get the access stats buffer for the current Flask application."""
+    buffer = current_app.extensions.get(_EXTENSION_KEY)
+    if buffer is None:
+        from ..extensions import db
+        buffer = AccessStatsBuffer(db.engine, flush_seconds=current_app.config.get('ACCESS_STATS_FLUSH_SECONDS', 30))
+        current_app.extensions[_EXTENSION_KEY] = buffer
+        # Once per application; a weak reference so the hook does not keep the app alive
+        atexit.register(_flush_at_exit, weakref.ref(current_app._get_current_object()))
+    return buffer
@@ -0,0 +1,81 @@
+"""
+Per-resource booking admission.
+
+A booking's conflict check and insert must not interleave with another
+booking for the same resource, but bookings for different resources have
+nothing to wait for. Admission is therefore serialized with a fixed pool of
+striped locks keyed by resource ID (two resources share a lock only if they
+hash to the same stripe) rather than one global lock.
+
+The stripes only cover threads of one worker process. Across processes the
+admission transaction starts by taking the database write lock for the
+resource (``BookingDAO.lock_for_admission``), so the checks of every
+occurrence of a series, the insert and the commit run while other workers
+wait; the conditional insert (``BookingDAO.insert_if_free``) alone would only
+guard a series' first occurrence.
+"""
+import threading
+from contextlib import contextmanager
+from typing import List
+
+from flask import current_app
+
+from ..extensions import db
+
+_EXTENSION_KEY = 'booking_lock_stripes'
+
+
+class LockStripes:
+    """Fixed pool of locks shared out by key."""
+    
+    def __init__(self, stripes: int = 64):
+        """
+        Initialize the pool.
+        
+        Args:
+            stripes: Number of locks; more stripes means fewer unrelated keys share one
+        """
+        self._locks: List[threading.Lock] = [threading.Lock() for _ in range(max(1, stripes))]
+    
+    def __len__(self):
+        return len(self._locks)
+    
+    def lock_for(self, key: int) -> threading.Lock:
+        """Return the lock guarding a key."""
+        return self._locks[hash(key) % len(self._locks)]
+
+
+def get_lock_stripes() -> LockStripes:
+    """Get the booking lock stripes for the current Flask application."""
+    stripes = current_app.extensions.get(_EXTENSION_KEY)
+    if stripes is None:
+        # setdefault is atomic, so racing first requests still share one pool
+        stripes = current_app.extensions.setdefault(
+            _EXTENSION_KEY, LockStripes(current_app.config.get('BOOKING_LOCK_STRIPES', 64))
+        )
+    return stripes
+
+
+@contextmanager
+def admit_bookings(resource_id: int):
+    """
+    Serialize booking admission (check + insert + commit) for one resource.
+    
+    The database write lock taken on entry is released by the block's commit,
+    or by a rollback on exit if the block did not commit.
+    
+    Usage:
+        with admit_bookings(resource.id):
+            ...check conflicts, insert, commit...
+    
+    Args:
+        resource_id: Resource being booked
+    """
+    from ..data_access.booking_dao import BookingDAO
+    with get_lock_stripes().lock_for(resource_id):
+        BookingDAO().lock_for_admission(resource_id)
+        try:
+            yield
+        finally:
+            if db.session().in_transaction():
+                db.session.rollback()
@@ -0,0 +1,68 @@
+"""
+Booking change log for incremental calendar sync.
+
+Every write to a booking, or to the exceptions of a rule-based series, adds
+a (booking_id, user_id) row to ``booking_changes`` in the same transaction.
+The log's autoincrement ID is a monotonically increasing change sequence:
+the personal calendar keeps the last sequence it has seen as a sync token
+and asks ``/bookings/calendar/changes?since=<token>`` for the bookings that
+changed after it, instead of refetching the whole window.
+
+ORM flushes are logged by the hook below; Core statements that write
+bookings (conditional inserts, exception inserts, series cancellation) call
+``log_booking_changes`` themselves, like ``touch_booking_feeds``. Entries
+older than ``BOOKING_CHANGES_RETENTION_DAYS`` are pruned; a token older
+than the log answers with a reset, and the client refetches in full.
+"""
+from datetime import datetime
+from typing import Iterable, Tuple
+
+from sqlalchemy import event, inspect, literal, select
+from sqlalchemy.orm import Session
+
+
+def log_booking_changes(session, changes: Iterable[Tuple[int, int]] = (), where=None):
+    """
+    Append changed bookings to the change log.
+    
+    Args:
+        session: Session whose transaction the entries join
+        changes: (booking_id, user_id) pairs
+        where: Condition on the bookings table selecting further changed bookings
+    """
+    from ..models.booking import Booking
+    from ..models.booking_change import BookingChange
+    log = BookingChange.__table__
+    now = datetime.utcnow()
+    rows = [{'booking_id': booking_id, 'user_id': user_id, 'changed_at': now}
+            for booking_id, user_id in dict.fromkeys(changes)]
+    if rows:
+        session.connection().execute(log.insert(), rows)
+    if where is not None:
+        bookings = Booking.__table__
+        session.connection().execute(log.insert().from_select(
+            ['booking_id', 'user_id', 'changed_at'],
+            select(bookings.c.id, bookings.c.user_id, literal(now, log.c.changed_at.type)).where(where)
+        ))
+
+
+@event.listens_for(Session, 'after_flush')
+def _after_flush(session, flush_context):
+    from ..models.booking import Booking
+    from ..models.booking_exception import BookingException
+    changes, series_ids = [], set()
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, Booking):
+            if obj in session.dirty and not session.is_modified(obj):
+                continue
+            changes.append((obj.id, obj.user_id))
+            # A booking moved to another user leaves the old user's calendar
+            changes.extend((obj.id, user_id) for user_id in inspect(obj).attrs.user_id.history.deleted)
+        elif isinstance(obj, BookingException):
+            series_ids.add(obj.booking_id)
+    changes = [(booking_id, user_id) for booking_id, user_id in changes
+               if booking_id is not None and user_id is not None]
+    series_ids.discard(None)
+    if changes or series_ids:
+        log_booking_changes(session, changes,
+                            where=Booking.__table__.c.id.in_(series_ids) if series_ids else None)
@@ -0,0 +1,265 @@
+"""
+In-memory interval index for booking conflict detection.
+
+Each resource gets a sorted array of its pending/active booking intervals
+plus a running "two largest end dates" prefix, so the question "does
+[start, end) overlap any booking on resource R" is answered with a single
+bisect instead of a range scan over the bookings table.
+
+Entries are loaded lazily from the database and dropped whenever a booking
+for that resource is flushed, committed or rolled back in this process.
+Every booking write also bumps the resource's row in the shared
+``booking_versions`` table in the same transaction (row 0 for bulk writes
+that may touch any resource). Each lookup reads those two counters with one
+primary-key query and reloads the entry only when they moved, so bookings
+committed by other workers are seen at once and the index answers
+"conflict" and "free" alike. ``BOOKING_INDEX_TTL`` only bounds how long
+writes made outside the application (e.g. manual SQL) can go unnoticed.
+"""
+import threading
+import time
+from bisect import bisect_left
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from flask import current_app, has_app_context
+from sqlalchemy import event, inspect, update
+from sqlalchemy.orm import Session
+
+from ..extensions import db
+from .session_tracking import drop_on_transaction_end, is_bulk_write, track
+
+BLOCKING_STATUSES = ('pending', 'active')
+
+_EXTENSION_KEY = 'booking_interval_index'
+
+# booking_versions row bumped by writes that may touch any resource
+ALL_RESOURCES = 0
+
+# (end_date, booking_id) pair used in the prefix maxima; None means "no booking"
+_EndMark = Optional[Tuple[datetime, int]]
+
+
+class ResourceIntervals:
+    """Immutable, start-sorted booking intervals for a single resource."""
+
+    __slots__ = ('starts', 'ends', 'ids', 'top_ends', 'loaded_at', 'version')
+
+    def __init__(self, rows: List[Tuple[int, datetime, datetime]], loaded_at: float = 0.0,
+                 version: Optional[Tuple[int, int]] = None):
+        """
+        Build the index from (booking_id, start_date, end_date) rows.
+
+        Args:
+            rows: Booking intervals in any order
+            loaded_at: Monotonic timestamp of the load, used for TTL expiry
+            version: Shared (all resources, this resource) booking versions read before loading
+        """
+        rows = sorted(rows, key=lambda row: row[1])
+        self.ids = [row[0] for row in rows]
+        self.starts = [row[1] for row in rows]
+        self.ends = [row[2] for row in rows]
+        self.loaded_at = loaded_at
+        self.version = version
+
+        # top_ends[i] holds the two largest end dates of *different* bookings
+        # among rows[0..i], which lets a single excluded booking be skipped
+        # without a linear scan. A rule-based series contributes one row per
+        # occurrence, all with the same booking ID.
+        self.top_ends: List[Tuple[_EndMark, _EndMark]] = []
+        first: _EndMark = None
+        second: _EndMark = None
+        for booking_id, end in zip(self.ids, self.ends):
+            if first is None or end > first[0]:
+                if first is not None and first[1] != booking_id:
+                    second = first
+                first = (end, booking_id)
+            elif first[1] != booking_id and (second is None or end > second[0]):
+                second = (end, booking_id)
+            self.top_ends.append((first, second))
+
+    def __len__(self):
+        return len(self.ids)
+
+    def overlaps(self, start: datetime, end: datetime, exclude_id: Optional[int] = None) -> bool:
+        """
+        Check whether [start, end) overlaps any indexed booking.
+
+        Args:
+            start: Interval start
+            end: Interval end
+            exclude_id: Booking ID to ignore (e.g. the booking being edited)
+
+        Returns:
+            True if at least one other booking overlaps the interval
+        """
+        # Only bookings starting before `end` can overlap; of those, one does
+        # if its end date is after `start`.
+        candidates = bisect_left(self.starts, end)
+        if candidates == 0:
+            return False
+        first, second = self.top_ends[candidates - 1]
+        best = second if exclude_id is not None and first[1] == exclude_id else first
+        return best is not None and best[0] > start
+
+
+class BookingIntervalIndex:
+    """Per-application cache of ResourceIntervals keyed by resource ID."""
+
+    def __init__(self, ttl: float = 60.0):
+        """
+        Initialize an empty index.
+
+        Args:
+            ttl: Seconds before a loaded resource entry is reloaded from the database
+        """
+        self.ttl = ttl
+        self._entries: Dict[int, ResourceIntervals] = {}
+        self._lock = threading.Lock()
+        # Bumped on every invalidation so a load that raced with a write is not cached
+        self._generation = 0
+
+    def get(self, resource_id: int) -> ResourceIntervals:
+        """Return the interval set for a resource, loading it if missing, outdated or expired."""
+        # Read before loading: a write committed while loading leaves the
+        # entry newer than its version, which only causes one extra reload.
+        version = self._read_version(resource_id)
+        entry = self._entries.get(resource_id)
+        now = time.monotonic()
+        if entry is None or entry.version != version or now - entry.loaded_at > self.ttl:
+            generation = self._generation
+            entry = ResourceIntervals(self._load(resource_id), loaded_at=now, version=version)
+            with self._lock:
+                if generation == self._generation:
+                    self._entries[resource_id] = entry
+        return entry
+
+    def overlaps(self, resource_id: int, start: datetime, end: datetime,
+                 exclude_id: Optional[int] = None) -> bool:
+        """Check whether [start, end) overlaps a pending/active booking on the resource."""
+        return self.get(resource_id).overlaps(start, end, exclude_id=exclude_id)
+
+    def invalidate(self, resource_ids=None):
+        """
+        Drop cached entries so they are rebuilt on next access.
+
+        Args:
+            resource_ids: Iterable of resource IDs, or None to drop everything
+        """
+        with self._lock:
+            self._generation += 1
+            if resource_ids is None:
+                self._entries.clear()
+            else:
+                for resource_id in resource_ids:
+                    self._entries.pop(resource_id, None)
+
+    def _read_version(self, resource_id: int) -> Tuple[int, int]:
+        """Read the shared (all resources, this resource) booking versions."""
+        from ..models.booking_version import BookingVersion
+        versions = dict(db.session.query(
+            BookingVersion.resource_id, BookingVersion.version
+        ).filter(
+            BookingVersion.resource_id.in_((ALL_RESOURCES, resource_id))
+        ).all())
+        return versions.get(ALL_RESOURCES, 0), versions.get(resource_id, 0)
+    
+    def _load(self, resource_id: int) -> List[Tuple[int, datetime, datetime]]:
+        """Fetch the blocking intervals for one resource as plain tuples."""
+        from ..models.booking import Booking
+        from .recurrence import load_series_intervals
+        rows = db.session.query(
+            Booking.id, Booking.start_date, Booking.end_date
+        ).filter(
+            Booking.resource_id == resource_id,
+            Booking.status.in_(BLOCKING_STATUSES),
+            Booking.recurrence_rule.is_(None)
+        ).all()
+        # Rule-based series are bounded by their UNTIL, so they expand in full
+        rows.extend((booking_id, start, end) for _, booking_id, start, end
+                    in load_series_intervals([resource_id]))
+        return rows
+
+
+def get_booking_index() -> BookingIntervalIndex:
+    """Get the interval index for the current Flask application."""
+    index = current_app.extensions.get(_EXTENSION_KEY)
+    if index is None:
+        index = BookingIntervalIndex(ttl=current_app.config.get('BOOKING_INDEX_TTL', 60))
+        current_app.extensions[_EXTENSION_KEY] = index
+    return index
+
+
+def _invalidate_current(resource_ids):
+    if has_app_context() and _EXTENSION_KEY in current_app.extensions:
+        current_app.extensions[_EXTENSION_KEY].invalidate(resource_ids)
+
+
+def invalidate_resources(resource_ids=None):
+    """
+    Invalidate index entries after a bulk (non-unit-of-work) booking write.
+    
+    The shared versions are bumped in the current transaction, and entries
+    are dropped now and again when it ends, so rows that are later rolled
+    back never linger in the index.
+    
+    Args:
+        resource_ids: Iterable of resource IDs, or None for every resource
+    """
+    _record_write(db.session(), None if resource_ids is None else set(resource_ids))
+
+
+# ---------------------------------------------------------------------------
+# Session hooks: keep the index in step with booking writes in this process,
+# and bump the shared versions so other workers notice them too.
+# ---------------------------------------------------------------------------
+
+_INFO_KEY = 'booking_index_dirty'
+
+
+def _bump_versions(session, resource_ids):
+    """Increment the shared booking version of each resource."""
+    from ..models.booking_version import BookingVersion
+    table = BookingVersion.__table__
+    connection = session.connection()
+    for resource_id in resource_ids:
+        bumped = connection.execute(
+            update(table).where(table.c.resource_id == resource_id).values(version=table.c.version + 1))
+        # On SQLite the UPDATE already took the write lock, so no other
+        # worker can insert the same row in between
+        if bumped.rowcount == 0:
+            connection.execute(table.insert().values(resource_id=resource_id, version=1))
+
+
+def _record_write(session, resource_ids: Optional[set]):
+    """Track a booking write, bumping each resource's version once per transaction."""
+    tracked = session.info.get(_INFO_KEY, set())
+    if tracked is not None:
+        _bump_versions(session, [ALL_RESOURCES] if resource_ids is None else resource_ids - tracked)
+    track(session, _INFO_KEY, resource_ids)
+    # Later checks in this transaction must see the written rows
+    _invalidate_current(resource_ids)
+
+
+@event.listens_for(Session, 'after_flush')
+def _after_flush(session, flush_context):
+    from ..models.booking import Booking
+    touched = set()
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, Booking) and obj.resource_id is not None:
+            touched.add(obj.resource_id)
+            # A booking moved between resources must refresh the old one too
+            history = inspect(obj).attrs.resource_id.history
+            touched.update(rid for rid in history.deleted if rid is not None)
+    if touched:
+        _record_write(session, touched)
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _on_orm_execute(orm_execute_state):
+    from ..models.booking import Booking
+    if is_bulk_write(orm_execute_state, (Booking,)):
+        _record_write(orm_execute_state.session, None)
+
+
+drop_on_transaction_end(_INFO_KEY, _invalidate_current)
@@ -0,0 +1,273 @@
+"""
+FullCalendar event feeds for resource and user calendars.
+
+FullCalendar asks for the visible window (``start``/``end``) every time the
+user navigates. Events are built from the column-projected rows of
+``BookingDAO.get_calendar_window`` for that window only, and serialized once
+into compact JSON (empty fields left out, separators without spaces).
+
+The encoded body is kept in a per-application LRU cache keyed by calendar
+and window for ``CALENDAR_CACHE_TTL`` seconds, so moving back and forth
+between months does not query again. Committed booking writes in this
+process drop the affected calendars at once; a user calendar is also keyed
+by the user's ``bookings_updated_at`` and the catalog version, so writes made
+by other worker processes are seen on the next request (resource calendars
+pick them up when the TTL runs out).
+"""
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Hashable, Iterable, List, Optional, Tuple
+
+from flask import current_app, has_app_context
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from .session_tracking import drop_on_transaction_end, is_bulk_write, track
+
+_EXTENSION_KEY = 'calendar_events'
+
+# Window used when the client sends none (a month grid), and the longest one served
+DEFAULT_WINDOW = timedelta(days=42)
+MAX_WINDOW = timedelta(days=366)
+
+STATUS_COLORS = {
+    'active': '#28a745',
+    'pending': '#ffc107',
+    'completed': '#17a2b8',
+    'cancelled': '#dc3545'
+}
+
+
+def to_naive_utc(value: datetime) -> datetime:
+    """Convert an aware datetime to naive UTC (the database convention); naive values pass through."""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def parse_window(start: Optional[str], end: Optional[str]) -> Tuple[datetime, datetime]:
+    """
+    Parse the window FullCalendar requests.
+    
+    Args:
+        start: ISO 8601 window start (offsets and a trailing 'Z' allowed)
+        end: ISO 8601 window end
+    
+    Returns:
+        Tuple of (start, end) as naive UTC; without both bounds, the
+        ``DEFAULT_WINDOW`` from the start of the current month
+    
+    Raises:
+        ValueError: If a bound is malformed, or the window is empty or longer than ``MAX_WINDOW``
+    """
+    if not (start and end):
+        first = datetime.utcnow().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        return first, first + DEFAULT_WINDOW
+    start_dt = to_naive_utc(datetime.fromisoformat(start.replace('Z', '+00:00')))
+    end_dt = to_naive_utc(datetime.fromisoformat(end.replace('Z', '+00:00')))
+    if end_dt <= start_dt:
+        raise ValueError('The window end must be after its start.')
+    if end_dt - start_dt > MAX_WINDOW:
+        raise ValueError(f'The window cannot exceed {MAX_WINDOW.days} days.')
+    return start_dt, end_dt
+
+
+def resource_events(occurrences: Iterable[Tuple[object, datetime, datetime]]) -> List[dict]:
+    """
+    Events of a resource calendar.
+    
+    Args:
+        occurrences: (row, start, end) tuples from ``get_calendar_window`` with ``resource_id``
+    """
+    events = []
+    for row, start, end in occurrences:
+        props = {'user': row.username, 'status': row.status}
+        if row.notes:
+            props['notes'] = row.notes
+        events.append({
+            'id': row.id,
+            'title': f"{row.username} - {row.status.title()}",
+            'start': start.isoformat(),
+            'end': end.isoformat(),
+            'color': '#28a745' if row.status == 'active' else '#ffc107',
+            'extendedProps': props
+        })
+    return events
+
+
+def user_events(occurrences: Iterable[Tuple[object, datetime, datetime]]) -> List[dict]:
+    """
+    Events of a user's own calendar.
+    
+    Args:
+        occurrences: (row, start, end) tuples from ``get_calendar_window`` with ``user_id``
+    """
+    events = []
+    for row, start, end in occurrences:
+        props = {'resource_title': row.title, 'resource_category': row.category, 'status': row.status}
+        if row.location:
+            props['resource_location'] = row.location
+        if row.notes:
+            props['notes'] = row.notes
+        events.append({
+            'id': row.id,
+            'title': f"{row.title} - {row.status.title()}",
+            'start': start.isoformat(),
+            'end': end.isoformat(),
+            'color': STATUS_COLORS.get(row.status, '#6c757d'),
+            'extendedProps': props
+        })
+    return events
+
+
+def compact_json(value) -> bytes:
+    """Serialize events (or a sync response) as compact JSON."""
+    return json.dumps(value, separators=(',', ':')).encode('utf-8')
+
+
+class CalendarCache:
+    """
+    Least recently used encoded event windows of one application.
+    
+    Keys are tuples whose first item is the calendar's scope, e.g.
+    ``('resource', 3)`` or ``('user', 7)``; invalidation is by scope.
+    """
+    
+    def __init__(self, ttl: float = 30.0, max_entries: int = 512):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: 'OrderedDict[tuple, Tuple[float, bytes]]' = OrderedDict()
+        self._version = 0
+    
+    @property
+    def version(self) -> int:
+        """Invalidation counter; pass the value read before querying to ``put``."""
+        return self._version
+    
+    def get(self, key: tuple) -> Optional[bytes]:
+        """Get a cached body that has not expired, or None."""
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is None:
+                return None
+            if time.monotonic() - cached[0] >= self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return cached[1]
+    
+    def put(self, key: tuple, body: bytes, version: int):
+        """
+        Store a body, evicting the least recently used ones.
+        
+        Args:
+            key: Cache key (scope first)
+            body: Encoded events
+            version: ``version`` read before the events were queried; the
+                body is dropped if bookings were committed since
+        """
+        if not self.ttl or not self.max_entries:
+            return
+        with self._lock:
+            if version != self._version:
+                return
+            self._entries[key] = (time.monotonic(), body)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def invalidate(self, scopes: Optional[Iterable[Hashable]] = None):
+        """
+        Drop cached windows.
+        
+        Args:
+            scopes: Calendar scopes to drop (None drops everything)
+        """
+        with self._lock:
+            self._version += 1
+            if scopes is None:
+                self._entries.clear()
+                return
+            scopes = set(scopes)
+            for key in [key for key in self._entries if key[0] in scopes]:
+                del self._entries[key]
+
+
+def get_calendar_cache() -> CalendarCache:
+    """Get the calendar window cache for the current Flask application."""
+    cache = current_app.extensions.get(_EXTENSION_KEY)
+    if cache is None:
+        cache = CalendarCache(ttl=current_app.config.get('CALENDAR_CACHE_TTL', 30),
+                              max_entries=current_app.config.get('CALENDAR_CACHE_SIZE', 512))
+        current_app.extensions[_EXTENSION_KEY] = cache
+    return cache
+
+
+def cached_events(key: tuple, load) -> bytes:
+    """
+    Get the encoded events of a calendar window, loading them on a miss.
+    
+    Args:
+        key: Cache key, scope first
+        load: Callable returning the window's event list
+    
+    Returns:
+        Compact JSON body
+    """
+    cache = get_calendar_cache()
+    body = cache.get(key)
+    if body is None:
+        version = cache.version
+        body = compact_json(load())
+        cache.put(key, body, version)
+    return body
+
+
+# ---------------------------------------------------------------------------
+# Session hooks: drop the calendars of committed booking writes.
+# ---------------------------------------------------------------------------
+
+_INFO_KEY = 'calendar_scopes'
+
+
+@event.listens_for(Session, 'after_flush')
+def _after_flush(session, flush_context):
+    from ..models.booking import Booking
+    from ..models.booking_exception import BookingException
+    scopes = set()
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, Booking):
+            if obj in session.dirty and not session.is_modified(obj):
+                continue
+            state = inspect(obj)
+            # Old owner and resource too, when a booking is moved
+            for user_id in [obj.user_id] + list(state.attrs.user_id.history.deleted):
+                scopes.add(('user', user_id))
+            for resource_id in [obj.resource_id] + list(state.attrs.resource_id.history.deleted):
+                scopes.add(('resource', resource_id))
+        elif isinstance(obj, BookingException):
+            track(session, _INFO_KEY, None)
+            return
+    if scopes:
+        track(session, _INFO_KEY, scopes)
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _on_orm_execute(orm_execute_state):
+    from ..models.booking import Booking
+    from ..models.booking_exception import BookingException
+    # Bulk statements, ORM-enabled or on the tables themselves
+    if is_bulk_write(orm_execute_state, (Booking, BookingException), inserts=True):
+        track(orm_execute_state.session, _INFO_KEY, None)
+
+
+def _invalidate(scopes):
+    if has_app_context() and _EXTENSION_KEY in current_app.extensions:
+        current_app.extensions[_EXTENSION_KEY].invalidate(scopes)
+
+
+drop_on_transaction_end(_INFO_KEY, _invalidate)
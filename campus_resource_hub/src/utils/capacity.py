@@ -0,0 +1,40 @@
+"""
+Sweep-line capacity engine.
+
+Computes the peak number of simultaneous bookings inside a time window,
+which is what a resource's capacity actually limits (three back-to-back
+bookings never occupy a room at the same time).
+"""
+from datetime import datetime
+from typing import Iterable, Tuple
+
+
+def peak_concurrency(intervals: Iterable[Tuple[datetime, datetime]],
+                    window_start: datetime, window_end: datetime) -> int:
+    """
+    Peak concurrent occupancy of half-open intervals within [window_start, window_end).
+    
+    Args:
+        intervals: (start, end) booking intervals
+        window_start: Window start
+        window_end: Window end
+    
+    Returns:
+        Maximum number of intervals overlapping at any instant in the window
+    """
+    events = []
+    for start, end in intervals:
+        start = max(start, window_start)
+        end = min(end, window_end)
+        if start < end:
+            events.append((start, 1))
+            events.append((end, -1))
+    
+    # At equal timestamps, ends (-1) sort before starts (+1), so a booking that
+    # ends exactly when another begins is not counted as overlapping.
+    events.sort()
+    current = peak = 0
+    for _, delta in events:
+        current += delta
+        peak = max(peak, current)
+    return peak
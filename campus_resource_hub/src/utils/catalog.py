@@ -0,0 +1,291 @@
+"""
+In-memory snapshot of the published resource catalog.
+
+The home page, category pages, rating badges, the concierge and the MCP
+server all read the same small set of published resources. Instead of
+querying it on every request, each worker process keeps an immutable
+``CatalogSnapshot``: compact read-only ``CatalogEntry`` records (with
+rating, image paths and equipment tags) plus precomputed categories,
+locations and the rating ranking.
+
+Readers take ``get_catalog()`` without locking; a rebuild swaps in a whole
+new snapshot, so a reader never sees a half-built one. Writes to resources,
+reviews, images or tags mark the snapshot stale once they commit in this
+process, and bump the single-row ``catalog_versions`` counter in the same
+transaction. Other workers compare that counter with their snapshot's
+version at most every ``CATALOG_VERSION_CHECK_SECONDS`` seconds (0 checks
+on every read) and rebuild when it moved.
+"""
+import threading
+import time
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from flask import current_app, has_app_context
+from sqlalchemy import event, select, update
+from sqlalchemy.orm import Session
+
+from .session_tracking import is_bulk_write
+
+TOP_RATED_COUNT = 3
+
+_EXTENSION_KEY = 'catalog'
+
+
+class CatalogImage(NamedTuple):
+    """Image of a catalog entry (same attribute names as ResourceImage)."""
+    image_path: str
+    display_order: int
+
+
+class CatalogEntry:
+    """
+    Read-only record of a published resource.
+    
+    Offers the attributes and helpers templates use on ``Resource``
+    (``average_rating()``, ``images``...), so the two are interchangeable
+    for display.
+    """
+    __slots__ = ('id', 'title', 'description', 'category', 'location', 'capacity', 'status',
+                 'equipment', 'image_url', 'is_available', 'is_featured', 'requires_approval',
+                 'owner_id', 'created_at', 'avg_rating', 'rating_count', 'images', 'tags')
+    
+    def __init__(self, **fields):
+        for name in self.__slots__:
+            object.__setattr__(self, name, fields[name])
+    
+    def __setattr__(self, name, value):
+        raise AttributeError('catalog entries are read-only')
+    
+    def __repr__(self):
+        return f'<CatalogEntry {self.title}>'
+    
+    def average_rating(self):
+        """Average rating (only visible reviews)."""
+        return round(self.avg_rating, 1) if self.rating_count else 0.0
+    
+    def rating_percentage(self):
+        """Rating as percentage (out of 100)."""
+        avg = self.average_rating()
+        return round((avg / 5.0) * 100, 0) if avg else 0
+    
+    def review_count(self):
+        """Number of visible reviews."""
+        return self.rating_count or 0
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'title': self.title,
+            'description': self.description,
+            'category': self.category,
+            'location': self.location,
+            'image_url': self.image_url,
+            'capacity': self.capacity,
+            'is_available': self.is_available,
+            'is_featured': self.is_featured
+        }
+
+
+class CatalogSnapshot:
+    """Immutable view of every published resource at one catalog version."""
+    __slots__ = ('version', 'entries', 'by_id', 'categories', 'locations', 'rating_ranking', 'rating_badges')
+    
+    def __init__(self, version: Optional[int], entries: List[CatalogEntry]):
+        self.version = version
+        self.entries: Tuple[CatalogEntry, ...] = tuple(entries)  # By ID
+        self.by_id: Dict[int, CatalogEntry] = {entry.id: entry for entry in self.entries}
+        self.categories: Tuple[str, ...] = tuple(sorted({e.category for e in self.entries if e.category}))
+        self.locations: Tuple[str, ...] = tuple(sorted({e.location for e in self.entries if e.location}))
+        # Best rated first; ties on the displayed (one decimal) average keep ID order
+        self.rating_ranking: Tuple[int, ...] = tuple(
+            entry.id for entry in sorted(
+                (e for e in self.entries if e.rating_count),
+                key=lambda e: (-round(e.avg_rating, 1), e.id)))
+        # Only show lowest rated badge if there are at least 2 resources (so there's a comparison)
+        lowest_rated_id = self.rating_ranking[-1] if len(self.rating_ranking) >= 2 else None
+        self.rating_badges: Tuple[List[int], Optional[int]] = (
+            list(self.rating_ranking[:TOP_RATED_COUNT]), lowest_rated_id)
+    
+    def get(self, resource_id: int) -> Optional[CatalogEntry]:
+        """Get a published resource by ID, or None."""
+        return self.by_id.get(resource_id)
+    
+    def featured(self, limit: Optional[int] = None) -> List[CatalogEntry]:
+        """Featured resources in ID order."""
+        featured = [entry for entry in self.entries if entry.is_featured]
+        return featured[:limit] if limit else featured
+    
+    def in_category(self, category: str) -> List[CatalogEntry]:
+        """Resources of one category in ID order."""
+        return [entry for entry in self.entries if entry.category == category]
+
+
+def _read_version(connection) -> Optional[int]:
+    from ..models.catalog_version import CatalogVersion
+    return connection.execute(
+        select(CatalogVersion.version).where(CatalogVersion.id == 1)
+    ).scalar()
+
+
+def build_snapshot() -> CatalogSnapshot:
+    """
+    Load the published catalog with three queries on a separate connection.
+    
+    The version is read first: a write committed while loading leaves the
+    snapshot newer than its version, which only causes one extra rebuild.
+    
+    Returns:
+        New snapshot
+    """
+    from ..extensions import db
+    from ..models.resource import Resource
+    from ..models.resource_image import ResourceImage
+    from ..models.equipment_tag import EquipmentTag, resource_tags
+    
+    published = Resource.status == 'published'
+    with db.engine.connect() as connection:
+        version = _read_version(connection)
+        rows = connection.execute(select(
+            Resource.id, Resource.title, Resource.description, Resource.category,
+            Resource.location, Resource.capacity, Resource.status, Resource.equipment, Resource.image_url,
+            Resource.is_available, Resource.is_featured, Resource.requires_approval,
+            Resource.owner_id, Resource.created_at, Resource.avg_rating, Resource.rating_count
+        ).where(published).order_by(Resource.id)).all()
+        images = connection.execute(select(
+            ResourceImage.resource_id, ResourceImage.image_path, ResourceImage.display_order
+        ).join(Resource, Resource.id == ResourceImage.resource_id).where(published).order_by(
+            ResourceImage.resource_id, ResourceImage.display_order, ResourceImage.id)).all()
+        tags = connection.execute(select(
+            resource_tags.c.resource_id, EquipmentTag.name
+        ).join(EquipmentTag, EquipmentTag.id == resource_tags.c.tag_id).join(
+            Resource, Resource.id == resource_tags.c.resource_id
+        ).where(published).order_by(resource_tags.c.resource_id, EquipmentTag.name)).all()
+    
+    images_by_resource: Dict[int, List[CatalogImage]] = {}
+    for resource_id, image_path, display_order in images:
+        images_by_resource.setdefault(resource_id, []).append(CatalogImage(image_path, display_order))
+    tags_by_resource: Dict[int, List[str]] = {}
+    for resource_id, name in tags:
+        tags_by_resource.setdefault(resource_id, []).append(name)
+    
+    entries = []
+    for row in rows:
+        fields = dict(row._mapping)
+        fields['avg_rating'] = fields['avg_rating'] or 0.0
+        fields['rating_count'] = fields['rating_count'] or 0
+        fields['images'] = tuple(images_by_resource.get(row.id, ()))
+        fields['tags'] = tuple(tags_by_resource.get(row.id, ()))
+        entries.append(CatalogEntry(**fields))
+    return CatalogSnapshot(version, entries)
+
+
+class CatalogStore:
+    """Holds the current snapshot of one application and decides when to rebuild it."""
+    
+    def __init__(self, check_seconds: float = 2.0):
+        self.check_seconds = check_seconds
+        self.snapshot: Optional[CatalogSnapshot] = None
+        self._stale = True
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+    
+    def current(self) -> CatalogSnapshot:
+        """
+        Get the current snapshot, rebuilding it if stale.
+        
+        Returns:
+            Snapshot (shared; never mutated)
+        """
+        snapshot = self.snapshot
+        if snapshot is not None and not self._stale:
+            now = time.monotonic()
+            if self.check_seconds and now - self._checked_at < self.check_seconds:
+                return snapshot
+            # Did another worker write since this snapshot was built?
+            from ..extensions import db
+            with db.engine.connect() as connection:
+                version = _read_version(connection)
+            self._checked_at = now
+            if version == snapshot.version:
+                return snapshot
+        
+        with self._lock:
+            if self.snapshot is not snapshot and not self._stale:
+                return self.snapshot  # Rebuilt by another thread meanwhile
+            # Cleared first: a commit during the build marks the new snapshot stale again
+            self._stale = False
+            self.snapshot = build_snapshot()
+            self._checked_at = time.monotonic()
+            return self.snapshot
+    
+    def mark_stale(self):
+        """Rebuild on the next read (a catalog write committed in this process)."""
+        self._stale = True
+
+
+def get_catalog_store() -> CatalogStore:
+    """Get the catalog store for the current Flask application."""
+    store = current_app.extensions.get(_EXTENSION_KEY)
+    if store is None:
+        store = CatalogStore(check_seconds=current_app.config.get('CATALOG_VERSION_CHECK_SECONDS', 2))
+        current_app.extensions[_EXTENSION_KEY] = store
+    return store
+
+
+def get_catalog() -> CatalogSnapshot:
+    """Get the published catalog snapshot for the current application."""
+    return get_catalog_store().current()
+
+
+# ---------------------------------------------------------------------------
+# Session hooks: bump the shared version with each catalog write, and mark
+# this process's snapshot stale once the write commits.
+# ---------------------------------------------------------------------------
+
+_INFO_KEY = 'catalog_dirty'
+
+
+def _catalog_classes():
+    from ..models.resource import Resource
+    from ..models.review import Review
+    from ..models.resource_image import ResourceImage
+    from ..models.equipment_tag import EquipmentTag
+    return (Resource, Review, ResourceImage, EquipmentTag)
+
+
+def _bump_version(session):
+    """Increment the shared counter once per transaction."""
+    if session.info.get(_INFO_KEY):
+        return
+    from ..models.catalog_version import CatalogVersion
+    session.info[_INFO_KEY] = True
+    table = CatalogVersion.__table__
+    session.connection().execute(
+        update(table).where(table.c.id == 1).values(version=table.c.version + 1))
+
+
+@event.listens_for(Session, 'after_flush')
+def _after_flush(session, flush_context):
+    classes = _catalog_classes()
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, classes):
+            _bump_version(session)
+            return
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _on_orm_execute(orm_execute_state):
+    if is_bulk_write(orm_execute_state, _catalog_classes()):
+        _bump_version(orm_execute_state.session)
+
+
+@event.listens_for(Session, 'after_commit')
+def _after_commit(session):
+    if session.info.pop(_INFO_KEY, False) and has_app_context() and _EXTENSION_KEY in current_app.extensions:
+        current_app.extensions[_EXTENSION_KEY].mark_stale()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _after_rollback(session):
+    # The version bump was rolled back with the write
+    session.info.pop(_INFO_KEY, False)
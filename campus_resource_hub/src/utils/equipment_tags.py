@@ -0,0 +1,125 @@
+"""
+Normalized equipment tags.
+
+``Resource.equipment`` stays the comma-separated text staff edit in the
+resource form, but every item is also stored once in ``equipment_tags`` and
+linked through ``resource_tags``. The join table is indexed by
+(tag_id, resource_id), an inverted index from tag to resources, so "rooms
+with a projector and a whiteboard" is an index lookup per tag instead of a
+substring scan over every resource.
+
+Tags follow the text column inside the flush that changes it. Resources
+written with raw SQL (e.g. the seed script) can be re-linked with
+``flask rebuild-tags``.
+"""
+import re
+from typing import Iterable, List, Optional
+
+from sqlalchemy import event, func, inspect, select
+from sqlalchemy.orm import Session
+
+_SEPARATORS = re.compile(r'[,;\n]')
+_SPACES = re.compile(r'\s+')
+
+
+def normalize_tag(name: Optional[str]) -> str:
+    """Lower-case an equipment item and collapse its whitespace."""
+    return _SPACES.sub(' ', (name or '').strip()).lower()
+
+
+def parse_tags(text: Optional[str]) -> List[str]:
+    """
+    Split an equipment list into normalized tag names.
+    
+    Args:
+        text: Items separated by commas, semicolons or new lines
+    
+    Returns:
+        Unique tag names in their original order
+    """
+    names = []
+    for item in _SEPARATORS.split(text or ''):
+        name = normalize_tag(item)
+        if name and name not in names:
+            names.append(name)
+    return names
+
+
+def apply_tag_filter(query, tags: Optional[Iterable[str]], match_all: bool = True):
+    """
+    Restrict a ``Resource`` query to resources with the given equipment.
+    
+    Args:
+        query: ORM query selecting Resource
+        tags: Tag names (normalized here); empty leaves the query unchanged
+        match_all: Require every tag (AND) instead of any of them (OR)
+    
+    Returns:
+        Filtered query
+    """
+    from ..models.resource import Resource
+    from ..models.equipment_tag import EquipmentTag, resource_tags
+    
+    names = []
+    for tag in tags or []:
+        name = normalize_tag(tag)
+        if name and name not in names:
+            names.append(name)
+    if not names:
+        return query
+    
+    tagged = select(resource_tags.c.resource_id).join(
+        EquipmentTag, EquipmentTag.id == resource_tags.c.tag_id
+    ).where(EquipmentTag.name.in_(names))
+    if match_all and len(names) > 1:
+        tagged = tagged.group_by(resource_tags.c.resource_id).having(func.count() == len(names))
+    return query.filter(Resource.id.in_(tagged))
+
+
+def sync_resource_tags(session, resources) -> None:
+    """
+    Point each resource's ``tags`` at the items listed in its ``equipment``.
+    
+    Missing tags are created; tags shared by several resources in the same
+    call are created once.
+    
+    Args:
+        session: Session the resources belong to
+        resources: Resources whose equipment text is authoritative
+    """
+    from ..models.equipment_tag import EquipmentTag
+    
+    wanted = {id(resource): parse_tags(resource.equipment) for resource in resources}
+    all_names = {name for names in wanted.values() for name in names}
+    
+    with session.no_autoflush:
+        existing = {}
+        if all_names:
+            existing = {tag.name: tag for tag in session.query(EquipmentTag).filter(
+                EquipmentTag.name.in_(all_names))}
+        # Tags added earlier in this session but not flushed yet
+        for obj in session.new:
+            if isinstance(obj, EquipmentTag):
+                existing.setdefault(obj.name, obj)
+        
+        for resource in resources:
+            tags = []
+            for name in wanted[id(resource)]:
+                if name not in existing:
+                    existing[name] = EquipmentTag(name=name)
+                    session.add(existing[name])
+                tags.append(existing[name])
+            resource.tags = tags
+
+
+@event.listens_for(Session, 'before_flush')
+def _before_flush(session, flush_context, instances):
+    from ..models.resource import Resource
+    
+    changed = [obj for obj in session.new if isinstance(obj, Resource)]
+    changed.extend(
+        obj for obj in session.dirty
+        if isinstance(obj, Resource) and inspect(obj).attrs.equipment.history.has_changes()
+    )
+    if changed:
+        sync_resource_tags(session, changed)
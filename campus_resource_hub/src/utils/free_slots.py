@@ -0,0 +1,66 @@
+"""
+Free-slot finder.
+
+Merges a resource's booked intervals and returns the gaps between them, so
+callers can offer times that are actually free instead of guessing and
+hitting a conflict on submit.
+"""
+from datetime import datetime, time, timedelta
+from typing import Iterable, List, Optional, Tuple
+
+Slot = Tuple[datetime, datetime]
+
+
+def find_free_slots(intervals: Iterable[Slot], window_start: datetime, window_end: datetime,
+                    min_duration: timedelta = timedelta(0),
+                    open_time: Optional[time] = None,
+                    close_time: Optional[time] = None) -> List[Slot]:
+    """
+    Return the gaps between booked intervals inside a window.
+    
+    Args:
+        intervals: Booked (start, end) intervals, sorted by start
+        window_start: Earliest slot start
+        window_end: Latest slot end
+        min_duration: Drop gaps shorter than this
+        open_time: Optional daily opening time; slots never start before it
+        close_time: Optional daily closing time; slots never end after it
+    
+    Returns:
+        Free (start, end) slots in chronological order
+    """
+    gaps = []
+    cursor = window_start
+    for start, end in intervals:
+        if start > cursor:
+            gaps.append((cursor, min(start, window_end)))
+        cursor = max(cursor, end)
+        if cursor >= window_end:
+            break
+    if cursor < window_end:
+        gaps.append((cursor, window_end))
+    
+    # Opening at midnight with no closing time never closes: gaps run on
+    # across midnight and are not split per day
+    if close_time is not None or open_time not in (None, time.min):
+        gaps = [slot for gap in gaps for slot in _clip_to_hours(gap, open_time, close_time)]
+    
+    # min_duration applies to what is left after clipping
+    return [(start, end) for start, end in gaps if start < end and end - start >= min_duration]
+
+
+def _clip_to_hours(gap: Slot, open_time: Optional[time], close_time: Optional[time]) -> List[Slot]:
+    """Split a gap at day boundaries and keep only the parts inside opening hours."""
+    start, end = gap
+    open_time = open_time or time.min
+    slots = []
+    day = start.date()
+    while datetime.combine(day, open_time) < end:
+        day_open = datetime.combine(day, open_time)
+        day_close = (datetime.combine(day, close_time) if close_time
+                     else datetime.combine(day + timedelta(days=1), time.min))
+        slot_start, slot_end = max(start, day_open), min(end, day_close)
+        if slot_start < slot_end:
+            slots.append((slot_start, slot_end))
+        day += timedelta(days=1)
+    return slots
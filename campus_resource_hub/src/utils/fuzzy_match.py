@@ -0,0 +1,167 @@
+"""
+Trigram similarity index for misspelled resource names.
+
+Full-text search only matches whole words and word prefixes, so a typo such
+as "colaboration lab" finds nothing. This index compares the trigrams
+(three-letter pieces) of the typed text with those of every published
+resource title and location, scoring them like PostgreSQL's ``pg_trgm``:
+shared trigrams divided by all distinct trigrams of both strings.
+
+The index maps each trigram to the names containing it, so a lookup only
+counts overlaps for names sharing at least one trigram with the text. It is
+built from the published catalog snapshot (``utils/catalog.py``) and rebuilt
+whenever a new snapshot is taken.
+"""
+import re
+from collections import Counter
+from typing import Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Tuple
+
+from flask import current_app
+
+# Minimum similarity for a name to count as a match (pg_trgm's default)
+SIMILARITY_THRESHOLD = 0.3
+
+_EXTENSION_KEY = 'trigram_index'
+
+_WORD = re.compile(r'\w+', re.UNICODE)
+
+
+def trigrams(text: Optional[str]) -> FrozenSet[str]:
+    """
+    Trigrams of a text, per lower-cased word padded with two leading and one trailing space.
+    
+    Args:
+        text: Any text
+    
+    Returns:
+        Set of trigrams ("lab" gives "  l", " la", "lab", "ab ")
+    """
+    grams = set()
+    for word in _WORD.findall((text or '').lower()):
+        padded = f'  {word} '
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return frozenset(grams)
+
+
+def similarity(a: Optional[str], b: Optional[str]) -> float:
+    """Trigram similarity of two texts, from 0 (nothing shared) to 1 (same trigrams)."""
+    grams_a, grams_b = trigrams(a), trigrams(b)
+    if not grams_a or not grams_b:
+        return 0.0
+    return len(grams_a & grams_b) / len(grams_a | grams_b)
+
+
+class FuzzyMatch(NamedTuple):
+    """A name close to the searched text, and the resources that have it."""
+    kind: str
+    value: str
+    score: float
+    resource_ids: Tuple[int, ...]
+
+
+class TrigramIndex:
+    """Inverted index from trigrams to names (resource titles, locations...)."""
+    
+    def __init__(self, documents: Iterable[Tuple[int, str, Optional[str]]]):
+        """
+        Build the index.
+        
+        Args:
+            documents: (resource_id, kind, name) triples; a name shared by
+                several resources (e.g. a building) is indexed once
+        """
+        resources: Dict[Tuple[str, str], List[int]] = {}
+        for resource_id, kind, name in documents:
+            name = (name or '').strip()
+            if name:
+                resources.setdefault((kind, name), []).append(resource_id)
+        
+        self._names: List[Tuple[str, str, Tuple[int, ...]]] = []
+        self._sizes: List[int] = []
+        self._postings: Dict[str, List[int]] = {}
+        for (kind, name), ids in resources.items():
+            grams = trigrams(name)
+            if not grams:
+                continue
+            position = len(self._names)
+            self._names.append((kind, name, tuple(ids)))
+            self._sizes.append(len(grams))
+            for gram in grams:
+                self._postings.setdefault(gram, []).append(position)
+    
+    def __len__(self):
+        return len(self._names)
+    
+    def search(self, text: str, limit: int = 5, threshold: float = SIMILARITY_THRESHOLD,
+               kinds: Optional[Iterable[str]] = None) -> List[FuzzyMatch]:
+        """
+        Find the names most similar to a text.
+        
+        Args:
+            text: Typed (possibly misspelled) text
+            limit: Maximum number of matches
+            threshold: Minimum similarity
+            kinds: Only return these kinds (optional)
+        
+        Returns:
+            Matches, most similar first (ties alphabetically)
+        """
+        grams = trigrams(text)
+        if not grams:
+            return []
+        kinds = set(kinds) if kinds else None
+        
+        shared = Counter()
+        for gram in grams:
+            postings = self._postings.get(gram)
+            if postings:
+                shared.update(postings)
+        
+        matches = []
+        for position, count in shared.items():
+            score = count / (len(grams) + self._sizes[position] - count)
+            kind, name, ids = self._names[position]
+            if score >= threshold and (kinds is None or kind in kinds):
+                matches.append(FuzzyMatch(kind, name, score, ids))
+        matches.sort(key=lambda match: (-match.score, match.value.lower(), match.kind))
+        return matches[:limit]
+
+
+def get_trigram_index() -> TrigramIndex:
+    """
+    Get the trigram index of published resource titles and locations.
+    
+    Returns:
+        Index for the current catalog snapshot (built on first use after each rebuild)
+    """
+    from .catalog import get_catalog
+    snapshot = get_catalog()
+    cached = current_app.extensions.get(_EXTENSION_KEY)
+    if cached is None or cached[0] is not snapshot:
+        index = TrigramIndex(
+            document
+            for entry in snapshot.entries
+            for document in ((entry.id, 'title', entry.title), (entry.id, 'location', entry.location))
+        )
+        cached = (snapshot, index)
+        current_app.extensions[_EXTENSION_KEY] = cached
+    return cached[1]
+
+
+def did_you_mean(text: str, limit: int = 3) -> List[str]:
+    """
+    Published titles and locations close to a search text that found nothing.
+    
+    Args:
+        text: Search text
+        limit: Maximum number of suggestions
+    
+    Returns:
+        Suggested search texts, best first (never the text itself)
+    """
+    typed = ' '.join(_WORD.findall((text or '').lower()))
+    suggestions = []
+    for match in get_trigram_index().search(text, limit=limit + 1):
+        if match.value.lower() != typed and match.value not in suggestions:
+            suggestions.append(match.value)
+    return suggestions[:limit]
@@ -0,0 +1,169 @@
+"""
+Revalidation and caching of iCal subscription feeds.
+
+Calendar clients poll ``/bookings/subscription/<token>.ics`` around the
+clock, and almost every poll returns the same calendar. Each user row
+carries ``bookings_updated_at``, bumped in the same transaction as any write
+to that user's bookings or their series exceptions. A feed's version (its
+strong ETag) is derived from that timestamp, the subscription and its
+filters, and the catalog version (resource titles and locations appear in
+the events), so it can be checked without reading the booking tables:
+
+- a client that sends the current ETag (or a later If-Modified-Since) gets
+  304 Not Modified;
+- otherwise the serialized calendar is served from a per-process LRU cache
+  of rendered feeds while the version is unchanged, and streamed again
+  (and cached, unless larger than ``ICAL_FEED_CACHE_MAX_BYTES``) when not.
+
+The version lives in the database, so writes made by other worker
+processes change it too.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Iterable, Iterator, Optional, Tuple
+
+from flask import current_app
+from sqlalchemy import event, inspect, or_, select, update
+from sqlalchemy.orm import Session
+
+_EXTENSION_KEY = 'ical_feed_cache'
+
+# Bump when the calendar layout changes, so cached copies are not revalidated
+FEED_FORMAT = 1
+
+
+def feed_version(subscription, user) -> Tuple[str, datetime]:
+    """
+    Version of a subscription feed.
+    
+    Args:
+        subscription: CalendarSubscription
+        user: Its user
+    
+    Returns:
+        Tuple of (strong ETag value, last modified time)
+    """
+    from .catalog import get_catalog
+    last_modified = max(user.bookings_updated_at or subscription.created_at, subscription.created_at)
+    key = '|'.join(str(part) for part in (
+        FEED_FORMAT, subscription.id, subscription.status_filter, subscription.start_date,
+        subscription.end_date, user.username, user.email, last_modified.isoformat(),
+        get_catalog().version
+    ))
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()[:32], last_modified
+
+
+class FeedCache:
+    """Least recently used rendered feeds of one application, by subscription."""
+    
+    def __init__(self, max_entries: int = 256, max_bytes: int = 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._feeds: 'OrderedDict[int, Tuple[str, bytes]]' = OrderedDict()
+    
+    def get(self, subscription_id: int, etag: str) -> Optional[bytes]:
+        """Get a feed rendered at this version, or None."""
+        with self._lock:
+            cached = self._feeds.get(subscription_id)
+            if cached is None or cached[0] != etag:
+                return None
+            self._feeds.move_to_end(subscription_id)
+            return cached[1]
+    
+    def tee(self, subscription_id: int, etag: str, chunks: Iterable[bytes]) -> Iterator[bytes]:
+        """
+        Pass a streamed feed through, storing it once it has been fully sent.
+        
+        Feeds larger than ``max_bytes`` are not kept, so caching never holds
+        more than that per feed in memory.
+        
+        Args:
+            subscription_id: Subscription ID
+            etag: Version being rendered
+            chunks: Serialized feed chunks
+        
+        Yields:
+            The same chunks
+        """
+        kept, size = [], 0
+        for chunk in chunks:
+            if kept is not None:
+                size += len(chunk)
+                if size <= self.max_bytes:
+                    kept.append(chunk)
+                else:
+                    kept = None
+            yield chunk
+        if kept is not None:
+            self.put(subscription_id, etag, b''.join(kept))
+    
+    def put(self, subscription_id: int, etag: str, body: bytes):
+        """Store a rendered feed, evicting the least recently used ones."""
+        if not self.max_entries:
+            return
+        with self._lock:
+            self._feeds[subscription_id] = (etag, body)
+            self._feeds.move_to_end(subscription_id)
+            while len(self._feeds) > self.max_entries:
+                self._feeds.popitem(last=False)
+
+
+def get_feed_cache() -> FeedCache:
+    """Get the rendered feed cache for the current Flask application."""
+    cache = current_app.extensions.get(_EXTENSION_KEY)
+    if cache is None:
+        cache = FeedCache(max_entries=current_app.config.get('ICAL_FEED_CACHE_SIZE', 256),
+                          max_bytes=current_app.config.get('ICAL_FEED_CACHE_MAX_BYTES', 1024 * 1024))
+        current_app.extensions[_EXTENSION_KEY] = cache
+    return cache
+
+
+def touch_booking_feeds(session, user_ids: Iterable[int] = (), booking_ids: Iterable[int] = ()):
+    """
+    Bump ``bookings_updated_at`` of the users owning changed bookings.
+    
+    Called by the flush hook below; statements that update bookings without
+    the ORM (e.g. cancelling a series) call it themselves.
+    
+    Args:
+        session: Session whose transaction the bump joins
+        user_ids: Users whose bookings changed
+        booking_ids: Bookings whose series exceptions changed
+    """
+    from ..models.user import User
+    from ..models.booking import Booking
+    users = User.__table__
+    owners = set(user_ids)
+    booking_ids = set(booking_ids)
+    conditions = []
+    if owners:
+        conditions.append(users.c.id.in_(owners))
+    if booking_ids:
+        conditions.append(users.c.id.in_(
+            select(Booking.__table__.c.user_id).where(Booking.__table__.c.id.in_(booking_ids))))
+    if conditions:
+        session.connection().execute(
+            update(users).where(or_(*conditions)).values(bookings_updated_at=datetime.utcnow()))
+
+
+@event.listens_for(Session, 'after_flush')
+def _after_flush(session, flush_context):
+    from ..models.booking import Booking
+    from ..models.booking_exception import BookingException
+    user_ids, booking_ids = set(), set()
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, Booking):
+            if obj in session.dirty and not session.is_modified(obj):
+                continue
+            user_ids.add(obj.user_id)
+            # A booking moved to another user leaves the old user's feed too
+            user_ids.update(inspect(obj).attrs.user_id.history.deleted)
+        elif isinstance(obj, BookingException):
+            booking_ids.add(obj.booking_id)
+    user_ids.discard(None)
+    booking_ids.discard(None)
+    if user_ids or booking_ids:
+        touch_booking_feeds(session, user_ids, booking_ids)
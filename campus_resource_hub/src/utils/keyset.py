@@ -0,0 +1,107 @@
+"""
+Keyset (seek) pagination for ORM queries.
+
+Instead of ``OFFSET``, each page starts after the last row of the previous
+one: the client gets an opaque cursor holding that row's sort key and ID,
+and the next query filters on ``(key, id) > (last_key, last_id)``. Pages stay
+fast however deep the client goes, and rows inserted meanwhile never shift
+later pages.
+"""
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from sqlalchemy import DateTime, or_
+
+
+def encode_cursor(key_value, last_id: int) -> str:
+    """
+    Encode the position after a row as an opaque, URL-safe cursor.
+    
+    Args:
+        key_value: Sort key of the last row on the page
+        last_id: ID of the last row on the page
+    
+    Returns:
+        Cursor string
+    """
+    if isinstance(key_value, datetime):
+        key_value = key_value.isoformat()
+    payload = json.dumps([key_value, last_id], separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(payload).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: Optional[str], key) -> Optional[Tuple[object, int]]:
+    """
+    Decode a cursor produced by ``encode_cursor``.
+    
+    Args:
+        cursor: Cursor string from the client (may be missing or tampered with)
+        key: Sort key expression, used to restore the value's type
+    
+    Returns:
+        (key_value, last_id), or None if the cursor is missing or invalid
+        (including a well-formed payload whose values are not a scalar key
+        and an integer ID, which would otherwise reach the SQL filter)
+    """
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        if not isinstance(payload, list):
+            return None
+        key_value, last_id = payload
+        if isinstance(key_value, bool) or not isinstance(key_value, (str, int, float, type(None))):
+            return None
+        if isinstance(last_id, bool) or not isinstance(last_id, int):
+            return None
+        if isinstance(key.type, DateTime) and key_value is not None:
+            key_value = datetime.fromisoformat(key_value)
+        return key_value, last_id
+    except (ValueError, TypeError, binascii.Error):
+        return None
+
+
+def keyset_page(query, key, id_column, descending: bool = False,
+                cursor: Optional[str] = None, page_size: int = 20) -> Tuple[List, Optional[str]]:
+    """
+    Fetch one page of a query ordered by (key, id).
+    
+    Ties on the key are broken by ascending ID, so the order is total and a
+    row can never appear on two pages. The key must not be NULL.
+    
+    Args:
+        query: ORM query selecting a single entity
+        key: Sort key expression (column, aggregate or computed value)
+        id_column: Unique ID column of the entity
+        descending: Sort the key from highest to lowest
+        cursor: Cursor returned with the previous page, or None for the first page
+        page_size: Number of rows per page
+    
+    Returns:
+        Tuple of (entities on this page, cursor for the next page or None)
+    """
+    position = decode_cursor(cursor, key)
+    if position is not None:
+        key_value, last_id = position
+        # The redundant inclusive bound lets the database seek an index on the key
+        if descending:
+            query = query.filter(key <= key_value, or_(key < key_value, id_column > last_id))
+        else:
+            query = query.filter(key >= key_value, or_(key > key_value, id_column > last_id))
+    
+    rows = query.add_columns(key.label('keyset_key')).order_by(
+        None
+    ).order_by(
+        key.desc() if descending else key.asc(), id_column.asc()
+    ).limit(page_size + 1).all()
+    
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        entity, key_value = rows[-1]
+        next_cursor = encode_cursor(key_value, getattr(entity, id_column.key))
+    return [row[0] for row in rows], next_cursor
@@ -5,6 +5,7 @@ from datetime import datetime
 from ..models.notification import Notification
 from ..models.booking import Booking
 from ..models.resource import Resource
+from ..models.user import User
 from ..extensions import db
 
 def create_notification(user_id, notification_type, title, message, booking_id=None, resource_id=None):
@@ -35,6 +36,27 @@ def create_notification(user_id, notification_type, title, message, booking_id=N
     db.session.commit()
     return notification
 
+def create_notifications(notifications):
+    """
+    Create many notifications with a single bulk INSERT and one commit.
+    
+    Args:
+        notifications: Dictionaries with user_id, type, title, message and
+            optional related_booking_id / related_resource_id
+    
+    Returns:
+        Number of notifications created
+    """
+    if not notifications:
+        return 0
+    rows = [
+        {'related_booking_id': None, 'related_resource_id': None, **notification, 'is_read': False}
+        for notification in notifications
+    ]
+    db.session.execute(Notification.__table__.insert(), rows)
+    db.session.commit()
+    return len(rows)
+
 def notify_booking_created(booking):
     """Notify user when a booking is created."""
     resource = booking.resource
@@ -160,6 +182,107 @@ def notify_booking_cancelled(booking, cancelled_by_user=True):
             resource_id=resource.id
         )
 
+def notify_series_cancelled(booking, affected, cancelled_by_user=True):
+    """Notify each affected booker and resource owner once when a series is cancelled.
+    
+    All notifications are written with one bulk insert, which also commits the
+    pending cancellation.
+    
+    Args:
+        booking: Parent booking of the series
+        affected: (user_id, resource_id, cancelled_count, first_start, last_end)
+            rows as returned by BookingDAO.cancel_series
+        cancelled_by_user: False when an administrator cancelled the series
+    """
+    resource_ids = {row[1] for row in affected}
+    resources = {r.id: r for r in Resource.query.filter(Resource.id.in_(resource_ids)).all()}
+    usernames = dict(db.session.query(User.id, User.username).filter(
+        User.id.in_({row[0] for row in affected})
+    ).all())
+    
+    notifications = []
+    owner_rows = {}
+    for user_id, resource_id, count, first_start, last_end in affected:
+        resource = resources[resource_id]
+        if cancelled_by_user:
+            message = f"Your recurring booking series for {resource.title} has been cancelled.\n\n"
+        else:
+            message = f"Your recurring booking series for {resource.title} has been cancelled by an administrator.\n\n"
+        message += f"Bookings Cancelled: {count}\n"
+        message += f"First Occurrence: {first_start.strftime('%Y-%m-%d %I:%M %p')}\n"
+        message += f"Last Occurrence Ends: {last_end.strftime('%Y-%m-%d %I:%M %p')}"
+        
+        notifications.append({
+            'user_id': user_id,
+            'type': 'booking_cancelled',
+            'title': f"Recurring Booking Series Cancelled: {resource.title}",
+            'message': message,
+            'related_booking_id': booking.id,
+            'related_resource_id': resource_id
+        })
+        
+        # Notify resource owner if different from requester
+        if resource.owner_id and resource.owner_id != user_id:
+            owner_rows.setdefault((resource.owner_id, resource_id), []).append(
+                (user_id, count, first_start, last_end)
+            )
+    
+    for (owner_id, resource_id), rows in owner_rows.items():
+        resource = resources[resource_id]
+        owner_message = f"A recurring booking series for your resource {resource.title} has been cancelled.\n\n"
+        for user_id, count, first_start, last_end in rows:
+            owner_message += f"Requester: {usernames.get(user_id, user_id)}\n"
+            owner_message += f"Bookings Cancelled: {count}\n"
+            owner_message += f"From: {first_start.strftime('%Y-%m-%d %I:%M %p')}\n"
+            owner_message += f"Until: {last_end.strftime('%Y-%m-%d %I:%M %p')}\n"
+        
+        notifications.append({
+            'user_id': owner_id,
+            'type': 'booking_cancelled',
+            'title': f"Recurring Booking Series Cancelled: {resource.title}",
+            'message': owner_message.rstrip(),
+            'related_booking_id': booking.id,
+            'related_resource_id': resource_id
+        })
+    
+    create_notifications(notifications)
+
+def notify_occurrence_cancelled(booking, occurrence_start):
+    """Notify users when one occurrence of a recurring series is cancelled."""
+    resource = booking.resource
+    occurrence_end = occurrence_start + (booking.end_date - booking.start_date)
+    title = f"Booking Occurrence Cancelled: {resource.title}"
+    message = f"One occurrence of your recurring booking for {resource.title} has been cancelled.\n\n"
+    message += f"Original Start: {occurrence_start.strftime('%Y-%m-%d %I:%M %p')}\n"
+    message += f"Original End: {occurrence_end.strftime('%Y-%m-%d %I:%M %p')}\n"
+    message += "The rest of the series is unchanged."
+    
+    notifications = [{
+        'user_id': booking.user_id,
+        'type': 'booking_cancelled',
+        'title': title,
+        'message': message,
+        'related_booking_id': booking.id,
+        'related_resource_id': resource.id
+    }]
+    
+    # Notify resource owner if different from requester
+    if resource.owner_id and resource.owner_id != booking.user_id:
+        owner_message = f"One occurrence of a recurring booking for your resource {resource.title} has been cancelled.\n\n"
+        owner_message += f"Requester: {booking.user.username}\n"
+        owner_message += f"Original Start: {occurrence_start.strftime('%Y-%m-%d %I:%M %p')}\n"
+        owner_message += f"Original End: {occurrence_end.strftime('%Y-%m-%d %I:%M %p')}"
+        notifications.append({
+            'user_id': resource.owner_id,
+            'type': 'booking_cancelled',
+            'title': title,
+            'message': owner_message,
+            'related_booking_id': booking.id,
+            'related_resource_id': resource.id
+        })
+    
+    create_notifications(notifications)
+
 def notify_booking_modified(booking, changes=None):
     """Notify users when a booking is modified."""
     resource = booking.resource
@@ -203,12 +326,14 @@ def notify_booking_modified(booking, changes=None):
             resource_id=resource.id
         )
 
-def notify_recurring_series_created(bookings, skipped_count=0):
-    """Notify user when a recurring booking series is created."""
-    if not bookings:
-        return
+def notify_recurring_series_created(booking, created_count, skipped_count=0):
+    """Notify user when a recurring booking series is created.
     
-    booking = bookings[0]
+    Args:
+        booking: Parent booking of the series
+        created_count: Number of occurrences created (including the parent)
+        skipped_count: Number of occurrences skipped due to conflicts or capacity
+    """
     resource = booking.resource
     title = f"Recurring Booking Series Created: {resource.title}"
     message = f"Your recurring booking series for {resource.title} has been created.\n\n"
@@ -218,7 +343,7 @@ def notify_recurring_series_created(bookings, skipped_count=0):
     if booking.recurrence_end_date:
         message += f"Series End: {booking.recurrence_end_date.strftime('%Y-%m-%d %I:%M %p')}\n"
     
-    message += f"Total Bookings Created: {len(bookings)}\n"
+    message += f"Total Bookings Created: {created_count}\n"
     
     if skipped_count > 0:
         message += f"\nNote: {skipped_count} occurrence(s) were skipped due to conflicts or capacity."
@@ -0,0 +1,424 @@
+"""
+Occupancy matrices for heatmaps and utilization reports.
+
+Every resource gets a NumPy vector of 15-minute slots covering a rolling
+horizon around today, where each slot holds the number of pending/active
+bookings overlapping it. Vectors for any number of resources are built from
+a single query in one vectorized pass (a difference array over slot indices
+followed by a cumulative sum), and afterwards kept current by applying
+committed booking changes as +1/-1 slice updates instead of reloading.
+
+Entries are also reloaded when the horizon rolls over to a new day and after
+``OCCUPANCY_TTL`` seconds, so writes made by other worker processes appear.
+"""
+import itertools
+import threading
+import time
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from flask import current_app, has_app_context
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from ..extensions import db
+from .booking_index import BLOCKING_STATUSES
+from .recurrence import load_series_intervals
+from .session_tracking import is_bulk_write, track
+
+SLOT_MINUTES = 15
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES
+SLOTS_PER_HOUR = 60 // SLOT_MINUTES
+
+_SLOT = np.timedelta64(SLOT_MINUTES * 60, 's')
+_EXTENSION_KEY = 'occupancy_service'
+
+# Orders matrix loads against booking flushes (see OccupancyService.apply)
+_sequence = itertools.count(1)
+
+
+def _slot_bounds(origin: datetime, n_slots: int, starts, ends) -> Tuple[np.ndarray, np.ndarray]:
+    """Map booking start/end datetimes to [first, last) slot indices, clipped to the horizon."""
+    origin = np.datetime64(origin, 's')
+    starts = np.asarray(starts, dtype='datetime64[s]')
+    ends = np.asarray(ends, dtype='datetime64[s]')
+    # A slot is occupied if a booking covers any part of it: floor the start, ceil the end
+    first = (starts - origin) // _SLOT
+    last = -((origin - ends) // _SLOT)
+    return np.clip(first, 0, n_slots), np.clip(last, 0, n_slots)
+
+
+def build_occupancy(rows: List[Tuple[int, datetime, datetime]], resource_ids: List[int],
+                    origin: datetime, n_slots: int) -> np.ndarray:
+    """
+    Build the occupancy matrix for several resources in one vectorized pass.
+    
+    Args:
+        rows: (resource_id, start_date, end_date) booking intervals
+        resource_ids: Resources to build, in output row order
+        origin: Datetime of slot 0
+        n_slots: Number of slots per resource
+    
+    Returns:
+        int32 array of shape (len(resource_ids), n_slots)
+    """
+    width = n_slots + 1
+    size = len(resource_ids) * width
+    if not rows:
+        return np.zeros((len(resource_ids), n_slots), dtype=np.int32)
+    
+    position = {resource_id: idx for idx, resource_id in enumerate(resource_ids)}
+    row_resource_ids, starts, ends = zip(*rows)
+    positions = np.fromiter((position[resource_id] for resource_id in row_resource_ids),
+                            dtype=np.int64, count=len(rows))
+    first, last = _slot_bounds(origin, n_slots, starts, ends)
+    keep = first < last
+    offsets = positions[keep] * width
+    diff = (np.bincount(offsets + first[keep], minlength=size)
+            - np.bincount(offsets + last[keep], minlength=size))
+    return np.cumsum(diff.reshape(len(resource_ids), width), axis=1)[:, :n_slots].astype(np.int32)
+
+
+class ResourceOccupancy:
+    """Slot counts for one resource over the current horizon."""
+    
+    __slots__ = ('counts', 'origin', 'version', 'loaded_at')
+    
+    def __init__(self, counts: np.ndarray, origin: datetime, version: int, loaded_at: float):
+        self.counts = counts
+        self.origin = origin
+        # Sequence number taken just before the load query ran
+        self.version = version
+        self.loaded_at = loaded_at
+    
+    def apply(self, start: datetime, end: datetime, delta: int):
+        """Add delta to every slot overlapped by [start, end)."""
+        first, last = _slot_bounds(self.origin, len(self.counts), [start], [end])
+        if first[0] < last[0]:
+            self.counts[first[0]:last[0]] += delta
+
+
+class OccupancyService:
+    """Per-application cache of ResourceOccupancy keyed by resource ID."""
+    
+    def __init__(self, past_days: int = 35, future_days: int = 63, ttl: float = 300.0):
+        """
+        Initialize an empty service.
+        
+        Args:
+            past_days: Days before today covered by the horizon
+            future_days: Days from today covered by the horizon
+            ttl: Seconds before a loaded resource entry is reloaded from the database
+        """
+        self.past_days = past_days
+        self.future_days = future_days
+        self.ttl = ttl
+        self._entries: Dict[int, ResourceOccupancy] = {}
+        self._lock = threading.Lock()
+        self._generation = 0
+    
+    @property
+    def days(self) -> int:
+        return self.past_days + self.future_days
+    
+    @property
+    def origin(self) -> datetime:
+        """Start of the current horizon (midnight, ``past_days`` before today)."""
+        today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+        return today - timedelta(days=self.past_days)
+    
+    def matrix(self, resource_ids: List[int]) -> np.ndarray:
+        """
+        Get the full-horizon slot counts for several resources.
+        
+        Missing or stale resources are loaded together with one query.
+        
+        Args:
+            resource_ids: Resource IDs, in output row order
+        
+        Returns:
+            int32 array of shape (len(resource_ids), days * SLOTS_PER_DAY)
+        """
+        origin = self.origin
+        now = time.monotonic()
+        entries = {}
+        stale = []
+        for resource_id in dict.fromkeys(resource_ids):
+            entry = self._entries.get(resource_id)
+            if entry is None or entry.origin != origin or now - entry.loaded_at > self.ttl:
+                stale.append(resource_id)
+            else:
+                entries[resource_id] = entry
+        if stale:
+            entries.update(self._load(stale, origin, now))
+        
+        n_slots = self.days * SLOTS_PER_DAY
+        if not resource_ids:
+            return np.zeros((0, n_slots), dtype=np.int32)
+        with self._lock:
+            return np.stack([entries[resource_id].counts.copy() for resource_id in resource_ids])
+    
+    def window(self, resource_ids: List[int], start_day: date, days: int) -> np.ndarray:
+        """
+        Get slot counts for a range of whole days.
+        
+        Args:
+            resource_ids: Resource IDs, in output row order
+            start_day: First day of the window
+            days: Number of days
+        
+        Returns:
+            int32 array of shape (len(resource_ids), days, SLOTS_PER_DAY)
+        
+        Raises:
+            ValueError: If the window is not inside the occupancy horizon
+        """
+        first_day = (start_day - self.origin.date()).days
+        if days < 1 or first_day < 0 or first_day + days > self.days:
+            raise ValueError('Requested days are outside the occupancy horizon.')
+        matrix = self.matrix(resource_ids)
+        window = matrix[:, first_day * SLOTS_PER_DAY:(first_day + days) * SLOTS_PER_DAY]
+        return window.reshape(len(resource_ids), days, SLOTS_PER_DAY)
+    
+    def utilization(self, resource_ids: List[int], start_day: date, days: int) -> Dict[int, float]:
+        """
+        Get the share of time each resource was booked within a range of days.
+        
+        Returns:
+            Mapping of resource ID to utilization percentage
+        """
+        occupied = self.window(resource_ids, start_day, days) > 0
+        percents = occupied.mean(axis=(1, 2)) * 100 if resource_ids else []
+        return {resource_id: round(float(percent), 1)
+                for resource_id, percent in zip(resource_ids, percents)}
+    
+    def hourly_profile(self, resource_ids: List[int], start_day: date, days: int) -> List[float]:
+        """
+        Get utilization by hour of day, averaged over resources and days.
+        
+        Returns:
+            24 utilization percentages, index 0 being 00:00-01:00
+        """
+        if not resource_ids:
+            return [0.0] * 24
+        occupied = self.window(resource_ids, start_day, days) > 0
+        by_hour = occupied.reshape(len(resource_ids), days, 24, SLOTS_PER_HOUR).mean(axis=(0, 1, 3))
+        return [round(float(percent) * 100, 1) for percent in by_hour]
+    
+    def apply(self, changes: List[Tuple[int, datetime, datetime, int, int]]):
+        """
+        Apply committed booking changes to loaded entries.
+        
+        Args:
+            changes: (resource_id, start, end, delta, version) tuples, where
+                version was taken when the change was flushed
+        """
+        with self._lock:
+            self._generation += 1
+            for resource_id, start, end, delta, version in changes:
+                entry = self._entries.get(resource_id)
+                if entry is None:
+                    continue
+                if entry.version < version:
+                    entry.apply(start, end, delta)
+                else:
+                    # Loaded after the flush: it may or may not include the change
+                    self._entries.pop(resource_id, None)
+    
+    def discard(self, changes: List[Tuple[int, datetime, datetime, int, int]]):
+        """Drop entries that may have been loaded from rolled-back changes."""
+        with self._lock:
+            self._generation += 1
+            for resource_id, _, _, _, version in changes:
+                entry = self._entries.get(resource_id)
+                if entry is not None and entry.version > version:
+                    self._entries.pop(resource_id, None)
+    
+    def invalidate(self, resource_ids=None):
+        """
+        Drop cached entries so they are rebuilt on next access.
+        
+        Args:
+            resource_ids: Iterable of resource IDs, or None to drop everything
+        """
+        with self._lock:
+            self._generation += 1
+            if resource_ids is None:
+                self._entries.clear()
+            else:
+                for resource_id in resource_ids:
+                    self._entries.pop(resource_id, None)
+    
+    def _load(self, resource_ids: List[int], origin: datetime, now: float) -> Dict[int, ResourceOccupancy]:
+        """Build entries for several resources from one query and cache them."""
+        from ..models.booking import Booking
+        horizon_end = origin + timedelta(days=self.days)
+        generation = self._generation
+        version = next(_sequence)
+        rows = db.session.query(
+            Booking.resource_id, Booking.start_date, Booking.end_date
+        ).filter(
+            Booking.resource_id.in_(resource_ids),
+            Booking.status.in_(BLOCKING_STATUSES),
+            Booking.recurrence_rule.is_(None),
+            Booking.start_date < horizon_end,
+            Booking.end_date > origin
+        ).all()
+        rows.extend((resource_id, start, end) for resource_id, _, start, end
+                    in load_series_intervals(resource_ids, origin, horizon_end))
+        matrix = build_occupancy(rows, resource_ids, origin, self.days * SLOTS_PER_DAY)
+        entries = {
+            resource_id: ResourceOccupancy(matrix[idx].copy(), origin, version, now)
+            for idx, resource_id in enumerate(resource_ids)
+        }
+        with self._lock:
+            if generation == self._generation:
+                self._entries.update(entries)
+        return entries
+
+
+def get_occupancy_service() -> OccupancyService:
+    """Get the occupancy service for the current Flask application."""
+    service = current_app.extensions.get(_EXTENSION_KEY)
+    if service is None:
+        service = OccupancyService(
+            past_days=current_app.config.get('OCCUPANCY_PAST_DAYS', 35),
+            future_days=current_app.config.get('OCCUPANCY_FUTURE_DAYS', 63),
+            ttl=current_app.config.get('OCCUPANCY_TTL', 300)
+        )
+        current_app.extensions[_EXTENSION_KEY] = service
+    return service
+
+
+def _current_service() -> Optional[OccupancyService]:
+    if has_app_context():
+        return current_app.extensions.get(_EXTENSION_KEY)
+    return None
+
+
+def invalidate_occupancy(resource_ids=None):
+    """
+    Reload occupancy for resources after a bulk (non-unit-of-work) booking write.
+    
+    Entries are dropped when the current transaction ends, whether it commits
+    or rolls back.
+    
+    Args:
+        resource_ids: Iterable of resource IDs, or None for every resource
+    """
+    _track_reload(db.session(), None if resource_ids is None else set(resource_ids))
+
+
+# ---------------------------------------------------------------------------
+# Session hooks: turn booking writes into +1/-1 slot updates at commit.
+# ---------------------------------------------------------------------------
+
+_CHANGES_KEY = 'occupancy_changes'
+_RELOAD_KEY = 'occupancy_reload'
+_TRACKED = ('resource_id', 'start_date', 'end_date', 'status')
+
+
+def _track_reload(session, resource_ids):
+    """Remember resources (None = all) to reload when the transaction ends."""
+    track(session, _RELOAD_KEY, resource_ids)
+
+
+def _booking_changes(booking, state: str, version: int) -> Iterable[Tuple[int, datetime, datetime, int, int]]:
+    """Yield the slot deltas a flushed booking insert/update/delete causes."""
+    if inspect(booking).unloaded.intersection(_TRACKED):
+        # Reading expired attributes here would emit SQL mid-flush
+        raise LookupError('unloaded booking attributes')
+    new = tuple(getattr(booking, attr) for attr in _TRACKED)
+    if state == 'new':
+        old = None
+    elif state == 'deleted':
+        old, new = new, None
+    else:
+        attrs = inspect(booking).attrs
+        old_values = []
+        for attr in _TRACKED:
+            history = attrs[attr].history
+            if history.added and not history.deleted:
+                # Previous value was never loaded; let the caller reload instead
+                raise LookupError(attr)
+            old_values.append(history.deleted[0] if history.deleted else getattr(booking, attr))
+        old = tuple(old_values)
+        if old == new:
+            return
+    
+    if old is not None and old[3] in BLOCKING_STATUSES:
+        yield (old[0], old[1], old[2], -1, version)
+    if new is not None and new[3] in BLOCKING_STATUSES:
+        yield (new[0], new[1], new[2], 1, version)
+
+
+def _is_series(booking, state: str) -> bool:
+    """True if a flushed booking is (or was) a rule-based recurring series."""
+    booking_state = inspect(booking)
+    if state != 'new' and 'recurrence_rule' in booking_state.unloaded:
+        return True  # Cannot tell without SQL; treat it as a series
+    return bool(booking_state.dict.get('recurrence_rule')
+                or booking_state.attrs.recurrence_rule.history.deleted)
+
+
+@event.listens_for(Session, 'after_flush')
+def _after_flush(session, flush_context):
+    from ..models.booking import Booking
+    version = next(_sequence)
+    changes = []
+    for state, objects in (('new', session.new), ('dirty', session.dirty), ('deleted', session.deleted)):
+        for obj in objects:
+            if not isinstance(obj, Booking):
+                continue
+            if _is_series(obj, state):
+                # A series covers many slots; rebuild its resource instead of a delta
+                history = inspect(obj).attrs.resource_id.history
+                resource_ids = set(history.added) | set(history.deleted) | set(history.unchanged)
+                _track_reload(session, (resource_ids - {None}) or None)
+                continue
+            try:
+                changes.extend(_booking_changes(obj, state, version))
+            except LookupError:
+                resource_id = inspect(obj).dict.get('resource_id')
+                history = inspect(obj).attrs.resource_id.history
+                if resource_id is None or history.added:
+                    # The affected resource(s) cannot be told without SQL
+                    _track_reload(session, None)
+                else:
+                    _track_reload(session, {resource_id})
+    if changes:
+        session.info.setdefault(_CHANGES_KEY, []).extend(changes)
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _on_orm_execute(orm_execute_state):
+    from ..models.booking import Booking
+    if is_bulk_write(orm_execute_state, (Booking,)):
+        _track_reload(orm_execute_state.session, None)
+
+
+@event.listens_for(Session, 'after_commit')
+def _after_commit(session):
+    changes = session.info.pop(_CHANGES_KEY, [])
+    reload = session.info.pop(_RELOAD_KEY, set())
+    service = _current_service()
+    if service is None:
+        return
+    if changes:
+        service.apply(changes)
+    if reload is None or reload:
+        service.invalidate(reload)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _after_rollback(session):
+    changes = session.info.pop(_CHANGES_KEY, [])
+    reload = session.info.pop(_RELOAD_KEY, set())
+    service = _current_service()
+    if service is None:
+        return
+    if changes:
+        service.discard(changes)
+    if reload is None or reload:
+        service.invalidate(reload)
@@ -0,0 +1,84 @@
+"""
+Denormalized rating aggregates on resources.
+
+``Resource.rating_sum``, ``rating_count`` and ``avg_rating`` describe the
+visible (non-hidden) reviews of a resource, so rating badges, the resource
+page and the top-rated sort read stored columns instead of running an
+aggregate per resource.
+
+The columns are maintained inside the same flush as the review change that
+affects them: every created, edited, hidden, unhidden or deleted review turns
+into an ``UPDATE resources SET rating_sum = rating_sum + :delta ...`` on its
+resource, so concurrent reviews cannot overwrite each other's counts. Rows
+written outside the ORM can be repaired with ``flask repair-ratings``.
+"""
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+from sqlalchemy import case, event, inspect, select
+from sqlalchemy.orm import Session
+
+
+def _contribution(resource_id, rating, is_hidden) -> List[Tuple[int, int, int]]:
+    """(resource_id, rating delta, count delta) for one visible review."""
+    if resource_id is None or rating is None or is_hidden:
+        return []
+    return [(resource_id, rating, 1)]
+
+
+def _review_deltas(session) -> Dict[int, List[int]]:
+    """Sum the rating changes pending in this flush, per resource."""
+    from ..models.review import Review
+    
+    changes = []
+    for obj in session.new:
+        if isinstance(obj, Review):
+            changes.extend(_contribution(obj.resource_id, obj.rating, obj.is_hidden))
+    
+    dirty = [obj for obj in session.dirty if isinstance(obj, Review) and session.is_modified(obj)]
+    deleted = [obj for obj in session.deleted if isinstance(obj, Review)]
+    if dirty or deleted:
+        # Stored values, read from the row: an attribute expired by a commit
+        # and then reassigned carries no old value in its history
+        stored = session.execute(
+            select(Review.resource_id, Review.rating, Review.is_hidden).where(
+                Review.id.in_([obj.id for obj in dirty + deleted]))
+        ).all()
+        for resource_id, rating, is_hidden in stored:
+            changes.extend((resource_id, -rating_delta, -count)
+                           for resource_id, rating_delta, count in _contribution(resource_id, rating, is_hidden))
+        for obj in dirty:
+            changes.extend(_contribution(obj.resource_id, obj.rating, obj.is_hidden))
+    
+    deltas = defaultdict(lambda: [0, 0])
+    for resource_id, rating, count in changes:
+        deltas[resource_id][0] += rating
+        deltas[resource_id][1] += count
+    return {resource_id: delta for resource_id, delta in deltas.items() if delta != [0, 0]}
+
+
+@event.listens_for(Session, 'before_flush')
+def _before_flush(session, flush_context, instances):
+    """Fold pending review changes into their resources' rating columns."""
+    deltas = _review_deltas(session)
+    if not deltas:
+        return
+    from ..models.resource import Resource
+    
+    for resource_id, (rating_delta, count_delta) in deltas.items():
+        resource = session.get(Resource, resource_id)
+        if resource is None or resource in session.deleted:
+            continue
+        if inspect(resource).pending:
+            rating_sum = (resource.rating_sum or 0) + rating_delta
+            rating_count = (resource.rating_count or 0) + count_delta
+            resource.rating_sum = rating_sum
+            resource.rating_count = rating_count
+            resource.avg_rating = rating_sum / rating_count if rating_count else 0.0
+            continue
+        # SQL expressions so the increment is applied to the row as stored, not as loaded
+        new_sum = Resource.rating_sum + rating_delta
+        new_count = Resource.rating_count + count_delta
+        resource.rating_sum = new_sum
+        resource.rating_count = new_count
+        resource.avg_rating = case((new_count > 0, new_sum * 1.0 / new_count), else_=0.0)
@@ -0,0 +1,25 @@
+"""
+Top-rated / lowest-rated resource badges.
+
+Every public resource page shows the badges. They are read from the rating
+ranking precomputed in the published catalog snapshot (``utils/catalog.py``),
+which is rebuilt when reviews or resources change, so rendering a page never
+queries for them.
+"""
+from typing import List, Optional, Tuple
+
+from .catalog import TOP_RATED_COUNT, get_catalog  # noqa: F401 - TOP_RATED_COUNT re-exported
+
+Badges = Tuple[List[int], Optional[int]]
+
+
+def get_rating_badges() -> Badges:
+    """
+    Get the top 3 and lowest rated resource IDs for badges.
+    
+    Only published resources with visible reviews are ranked.
+    
+    Returns:
+        Tuple of (top_rated_ids list, lowest_rated_id or None)
+    """
+    return get_catalog().rating_badges
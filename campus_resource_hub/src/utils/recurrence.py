@@ -0,0 +1,202 @@
+"""
+Recurring booking series expansion.
+
+A recurring series is stored once, as an RFC 5545 RRULE on its parent
+booking plus a list of exception dates (skipped or cancelled occurrences).
+Occurrences are expanded on demand and only for the window a caller asks
+about, instead of being materialized as one booking row per occurrence.
+
+Series created before rules existed are still stored as child rows linked by
+``parent_booking_id``; those rows have no ``recurrence_rule`` and are read
+like any other booking.
+"""
+from datetime import datetime
+from itertools import islice
+from typing import Iterable, List, Optional, Tuple
+
+from dateutil.rrule import rrulestr, rrule, DAILY, WEEKLY, MONTHLY
+
+from ..extensions import db
+from .booking_index import BLOCKING_STATUSES
+
+# Safety limit: prevent creating more than 365 bookings (1 year of daily bookings)
+MAX_RECURRING_BOOKINGS = 365
+
+RECURRENCE_FREQUENCIES = {
+    'daily': DAILY,
+    'weekly': WEEKLY,
+    'monthly': MONTHLY,  # Same day of month; months without that day are skipped
+}
+
+RRULE_DATETIME_FORMAT = '%Y%m%dT%H%M%S'
+
+
+def expand_occurrences(start_date: datetime, end_date: datetime,
+                       recurrence_type: Optional[str] = None,
+                       recurrence_end_date: Optional[datetime] = None,
+                       limit: int = MAX_RECURRING_BOOKINGS) -> List[Tuple[datetime, datetime]]:
+    """
+    Generate every occurrence of a (possibly recurring) booking.
+    
+    Args:
+        start_date: Start of the first occurrence
+        end_date: End of the first occurrence
+        recurrence_type: 'daily', 'weekly', 'monthly', or None for a single booking
+        recurrence_end_date: Last allowed occurrence start (inclusive), if any
+        limit: Maximum number of occurrences to generate
+    
+    Returns:
+        List of (start, end) tuples in chronological order
+    """
+    freq = RECURRENCE_FREQUENCIES.get(recurrence_type) if recurrence_type else None
+    if freq is None:
+        return [(start_date, end_date)]
+    
+    duration = end_date - start_date
+    # RFC 5545 forbids COUNT together with UNTIL, so the limit is applied while iterating
+    rule = rrule(freq, dtstart=start_date, until=recurrence_end_date,
+                 count=None if recurrence_end_date else limit)
+    return [(occurrence, occurrence + duration) for occurrence in islice(rule, limit)]
+
+
+def build_rrule(recurrence_type: str, until: datetime) -> str:
+    """
+    Build the RRULE stored on a series parent.
+    
+    Args:
+        recurrence_type: 'daily', 'weekly' or 'monthly'
+        until: Start of the last occurrence (inclusive)
+    
+    Returns:
+        RRULE body such as 'FREQ=WEEKLY;UNTIL=20260601T090000'
+    """
+    return f"FREQ={recurrence_type.upper()};UNTIL={until.strftime(RRULE_DATETIME_FORMAT)}"
+
+
+def series_fields(start_date: datetime, end_date: datetime,
+                  recurrence_type: Optional[str] = None,
+                  recurrence_end_date: Optional[datetime] = None) -> dict:
+    """
+    Derive the stored rule columns for a booking's recurrence settings.
+    
+    Args:
+        start_date: Start of the first occurrence
+        end_date: End of the first occurrence
+        recurrence_type: 'daily', 'weekly', 'monthly', or None for a single booking
+        recurrence_end_date: Last allowed occurrence start (inclusive), if any
+    
+    Returns:
+        Dictionary with recurrence_rule and series_end_date (both None for a single booking)
+    """
+    if recurrence_type not in RECURRENCE_FREQUENCIES:
+        return {'recurrence_rule': None, 'series_end_date': None}
+    occurrences = expand_occurrences(start_date, end_date, recurrence_type, recurrence_end_date)
+    return {
+        'recurrence_rule': build_rrule(recurrence_type, occurrences[-1][0]),
+        'series_end_date': occurrences[-1][1],
+    }
+
+
+def limit_rule(rule: str, until: datetime) -> str:
+    """
+    End a stored RRULE earlier.
+    
+    Args:
+        rule: RRULE body
+        until: Start of the new last occurrence (inclusive)
+    
+    Returns:
+        RRULE body with its UNTIL (or COUNT) replaced
+    """
+    parts = [part for part in rule.split(';') if not part.startswith(('UNTIL=', 'COUNT='))]
+    parts.append(f"UNTIL={until.strftime(RRULE_DATETIME_FORMAT)}")
+    return ';'.join(parts)
+
+
+def expand_rule(rule: str, start_date: datetime, end_date: datetime,
+                window_start: Optional[datetime] = None,
+                window_end: Optional[datetime] = None,
+                exdates: Iterable[datetime] = (),
+                limit: int = MAX_RECURRING_BOOKINGS) -> List[Tuple[datetime, datetime]]:
+    """
+    Expand a stored RRULE into the occurrences overlapping a window.
+    
+    Args:
+        rule: RRULE body
+        start_date: Start of the first occurrence (DTSTART)
+        end_date: End of the first occurrence
+        window_start: Only occurrences ending after this (optional)
+        window_end: Only occurrences starting before this (optional)
+        exdates: Occurrence starts to leave out
+        limit: Maximum number of occurrences to walk
+    
+    Returns:
+        List of (start, end) tuples in chronological order
+    """
+    duration = end_date - start_date
+    exdates = set(exdates)
+    occurrences = []
+    for idx, occurrence in enumerate(rrulestr(rule, dtstart=start_date)):
+        if idx >= limit or (window_end is not None and occurrence >= window_end):
+            break
+        if window_start is not None and occurrence + duration <= window_start:
+            continue
+        if occurrence not in exdates:
+            occurrences.append((occurrence, occurrence + duration))
+    return occurrences
+
+
+def load_series_intervals(resource_ids: Optional[Iterable[int]] = None,
+                          window_start: Optional[datetime] = None,
+                          window_end: Optional[datetime] = None,
+                          statuses: Iterable[str] = BLOCKING_STATUSES,
+                          user_id: Optional[int] = None) -> List[Tuple[int, int, datetime, datetime]]:
+    """
+    Expand the rule-based series that overlap a window.
+    
+    Two queries (series parents, then their exceptions) regardless of how
+    many occurrences the window contains.
+    
+    Args:
+        resource_ids: Restrict to these resources (None for all)
+        window_start: Only occurrences ending after this (optional)
+        window_end: Only occurrences starting before this (optional)
+        statuses: Series statuses to include
+        user_id: Restrict to one user's series (optional)
+    
+    Returns:
+        (resource_id, booking_id, start, end) tuples
+    """
+    from ..models.booking import Booking
+    from ..models.booking_exception import BookingException
+    
+    query = db.session.query(
+        Booking.id, Booking.resource_id, Booking.start_date, Booking.end_date, Booking.recurrence_rule
+    ).filter(
+        Booking.recurrence_rule.isnot(None),
+        Booking.status.in_(list(statuses))
+    )
+    if resource_ids is not None:
+        query = query.filter(Booking.resource_id.in_(list(resource_ids)))
+    if user_id is not None:
+        query = query.filter(Booking.user_id == user_id)
+    if window_end is not None:
+        query = query.filter(Booking.start_date < window_end)
+    if window_start is not None:
+        query = query.filter(Booking.series_end_date > window_start)
+    series = query.all()
+    if not series:
+        return []
+    
+    exdates = {}
+    for booking_id, occurrence_start in db.session.query(
+        BookingException.booking_id, BookingException.occurrence_start
+    ).filter(BookingException.booking_id.in_([row[0] for row in series])):
+        exdates.setdefault(booking_id, set()).add(occurrence_start)
+    
+    intervals = []
+    for booking_id, resource_id, start_date, end_date, rule in series:
+        for occurrence_start, occurrence_end in expand_rule(
+                rule, start_date, end_date, window_start, window_end, exdates.get(booking_id, ())):
+            intervals.append((resource_id, booking_id, occurrence_start, occurrence_end))
+    return intervals
@@ -0,0 +1,181 @@
+"""
+Full-text resource search backed by an SQLite FTS5 index.
+
+``resources_fts`` is an external-content FTS5 table over the resources'
+title, description, category, location and equipment. Triggers on
+``resources`` keep it in step with every write, including raw SQL such as
+the seed script. Keyword search from the search page, ``ResourceDAO.search``,
+the MCP server and the concierge retriever all go through
+``apply_text_search``, which matches word prefixes and exposes a BM25
+relevance score for ordering.
+
+Databases without FTS5 (or non-SQLite databases) fall back to ``ILIKE``
+matching over the same columns, without relevance ranking.
+"""
+import logging
+import re
+import weakref
+from typing import List, Optional, Tuple
+
+from sqlalchemy import Float, Integer, and_, event, or_, text
+
+from ..models.resource import Resource
+
+logger = logging.getLogger(__name__)
+
+SEARCH_COLUMNS = ('title', 'description', 'category', 'location', 'equipment')
+
+# BM25 weight per column, in SEARCH_COLUMNS order: a title hit outranks a description hit
+BM25_WEIGHTS = (10.0, 1.0, 4.0, 2.0, 2.0)
+
+# Engine -> whether resources_fts exists on it
+_availability = weakref.WeakKeyDictionary()
+
+_TOKEN = re.compile(r'\w+', re.UNICODE)
+
+_NEW_ROW = ', '.join(f'new.{column}' for column in SEARCH_COLUMNS)
+_OLD_ROW = ', '.join(f'old.{column}' for column in SEARCH_COLUMNS)
+_COLUMN_LIST = ', '.join(SEARCH_COLUMNS)
+
+SEARCH_INDEX_DDL = (
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS resources_fts USING fts5(
+        {_COLUMN_LIST},
+        content='resources', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS resources_fts_ai AFTER INSERT ON resources BEGIN
+        INSERT INTO resources_fts(rowid, {_COLUMN_LIST}) VALUES (new.id, {_NEW_ROW});
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS resources_fts_ad AFTER DELETE ON resources BEGIN
+        INSERT INTO resources_fts(resources_fts, rowid, {_COLUMN_LIST}) VALUES ('delete', old.id, {_OLD_ROW});
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS resources_fts_au AFTER UPDATE OF {_COLUMN_LIST} ON resources BEGIN
+        INSERT INTO resources_fts(resources_fts, rowid, {_COLUMN_LIST}) VALUES ('delete', old.id, {_OLD_ROW});
+        INSERT INTO resources_fts(rowid, {_COLUMN_LIST}) VALUES (new.id, {_NEW_ROW});
+    END""",
+)
+
+_MATCH_SQL = text(
+    "SELECT rowid AS resource_id, bm25(resources_fts, {weights}) AS relevance "
+    "FROM resources_fts WHERE resources_fts MATCH :match".format(
+        weights=', '.join(str(weight) for weight in BM25_WEIGHTS))
+).columns(resource_id=Integer, relevance=Float)
+
+
+def search_terms(search_text: Optional[str]) -> List[str]:
+    """
+    Split free text into lower-case search terms.
+    
+    Args:
+        search_text: Text typed by the user (may contain any punctuation)
+    
+    Returns:
+        List of word tokens; punctuation and FTS operators are dropped
+    """
+    return _TOKEN.findall((search_text or '').lower())
+
+
+def match_expression(terms: List[str], any_term: bool = False) -> Optional[str]:
+    """
+    Build an FTS5 MATCH expression that prefix-matches every term.
+    
+    Args:
+        terms: Tokens from ``search_terms``
+        any_term: Match resources containing any term instead of all of them
+    
+    Returns:
+        MATCH expression, or None when there are no terms
+    """
+    if not terms:
+        return None
+    # Quoted so terms are never parsed as FTS operators (AND, NEAR, column filters...)
+    phrases = [f'"{term}"*' for term in terms]
+    return (' OR ' if any_term else ' ').join(phrases)
+
+
+def _create_index(connection) -> bool:
+    """Create the index on an SQLite connection; False if SQLite lacks FTS5."""
+    if not connection.execute(text("SELECT sqlite_compileoption_used('ENABLE_FTS5')")).scalar():
+        return False
+    existed = connection.execute(text(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'resources_fts'"
+    )).first() is not None
+    for statement in SEARCH_INDEX_DDL:
+        connection.execute(text(statement))
+    if not existed:
+        connection.execute(text("INSERT INTO resources_fts(resources_fts) VALUES ('rebuild')"))
+    return True
+
+
+def ensure_search_index(engine) -> bool:
+    """
+    Create the FTS5 table and its triggers if missing, indexing existing rows.
+    
+    Args:
+        engine: SQLAlchemy engine of the application database
+    
+    Returns:
+        True if full-text search is available on this database
+    """
+    available = False
+    if engine.dialect.name == 'sqlite':
+        with engine.begin() as connection:
+            available = _create_index(connection)
+        if not available:
+            logger.warning("SQLite was built without FTS5; resource search falls back to ILIKE")
+    _availability[engine] = available
+    return available
+
+
+def search_index_available(session) -> bool:
+    """Check (once per engine) whether the FTS5 index exists."""
+    engine = session.get_bind()
+    available = _availability.get(engine)
+    if available is None:
+        available = engine.dialect.name == 'sqlite' and session.execute(text(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'resources_fts'"
+        )).first() is not None
+        _availability[engine] = available
+    return available
+
+
+def apply_text_search(query, search_text: Optional[str], any_term: bool = False) -> Tuple[object, Optional[object]]:
+    """
+    Restrict a ``Resource`` query to resources matching free text.
+    
+    Args:
+        query: ORM query selecting Resource
+        search_text: Text to search for; empty text leaves the query unchanged
+        any_term: Match any term instead of all of them
+    
+    Returns:
+        Tuple of (filtered query, relevance column or None). Lower relevance
+        values are better matches; None means no ranking is available.
+    """
+    terms = search_terms(search_text)
+    if not terms:
+        return query, None
+    
+    session = query.session
+    if search_index_available(session):
+        matches = _MATCH_SQL.bindparams(match=match_expression(terms, any_term)).subquery('fts_match')
+        return query.join(matches, Resource.id == matches.c.resource_id), matches.c.relevance
+    
+    columns = [getattr(Resource, column) for column in SEARCH_COLUMNS]
+    conditions = [or_(*[column.ilike(f'%{term}%') for column in columns]) for term in terms]
+    return query.filter(or_(*conditions) if any_term else and_(*conditions)), None
+
+
+# Keep the index alongside the resources table when tables are created/dropped
+# through metadata (db.create_all()/db.drop_all()), e.g. in tests.
+
+@event.listens_for(Resource.__table__, 'after_create')
+def _after_resources_create(target, connection, **kw):
+    if connection.dialect.name == 'sqlite':
+        _create_index(connection)
+
+
+@event.listens_for(Resource.__table__, 'before_drop')
+def _before_resources_drop(target, connection, **kw):
+    if connection.dialect.name == 'sqlite':
+        connection.execute(text("DROP TABLE IF EXISTS resources_fts"))
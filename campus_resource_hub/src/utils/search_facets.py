@@ -0,0 +1,178 @@
+"""
+Facet counts for the resource search filters.
+
+For the current search, the search page shows how many resources each
+category, location and minimum-capacity choice would return. The counts
+are disjunctive: each facet ignores its own filter but honours the others,
+so picking a value with a non-zero count never leads to an empty page.
+
+All three facets come from one grouped query over the search's base query
+(status, keywords, availability). Each row holds a category, a location and a
+capacity bucket, plus a 0/1 flag for every active facet filter. Python then
+sums the rows that pass the other facets' flags. The unfiltered facets (the
+landing search page) are cached per application for one catalog version
+(see utils/catalog.py), so any resource write, in this process or another,
+makes the next search recompute them.
+"""
+import threading
+from typing import Dict, List, Optional
+
+from flask import current_app
+from sqlalchemy import case, func
+
+from ..models.resource import Resource
+from .catalog import get_catalog
+
+FACETS = ('category', 'location', 'capacity')
+
+# Minimum-capacity choices offered as facets ("10+", "25+", ...)
+CAPACITY_THRESHOLDS = (10, 25, 50, 100, 200)
+
+_EXTENSION_KEY = 'search_facets'
+
+
+def facet_conditions(category: Optional[str] = None, location: Optional[str] = None,
+                     min_capacity: Optional[int] = None) -> Dict[str, object]:
+    """
+    Build the SQL conditions of the active facet filters.
+    
+    The search page filters with these same conditions, so the counts
+    always agree with the results.
+    
+    Args:
+        category: Exact category, or empty for any
+        location: Location substring (case-insensitive), or empty for any
+        min_capacity: Minimum capacity, or empty for any
+    
+    Returns:
+        Dictionary of facet name to condition, for active filters only
+    """
+    conditions = {}
+    if category:
+        conditions['category'] = Resource.category == category
+    if location:
+        conditions['location'] = Resource.location.ilike(f'%{location}%')
+    if min_capacity:
+        conditions['capacity'] = Resource.capacity >= min_capacity
+    return conditions
+
+
+def compute_facets(base_query, conditions: Optional[Dict[str, object]] = None) -> Dict[str, object]:
+    """
+    Count resources per facet value with a single grouped query.
+    
+    Args:
+        base_query: Resource query with every non-facet filter applied
+        conditions: Active facet filters from ``facet_conditions``
+    
+    Returns:
+        Dictionary with ``total`` (resources matching every filter) and, per
+        facet, a list of ``{'value', 'count'}`` entries (``{'min', 'count'}``
+        for capacity). Values with no matching resource are left out.
+    """
+    conditions = conditions or {}
+    active = [name for name in FACETS if name in conditions]
+    
+    # Highest threshold the capacity reaches (None below the lowest one)
+    bucket = case(
+        *[(Resource.capacity >= threshold, index)
+          for index, threshold in reversed(list(enumerate(CAPACITY_THRESHOLDS)))],
+        else_=None
+    )
+    flags = [case((conditions[name], 1), else_=0) for name in active]
+    group_columns = [Resource.category, Resource.location, bucket] + flags
+    rows = base_query.order_by(None).with_entities(
+        *group_columns, func.count(Resource.id)
+    ).group_by(*group_columns).all()
+    
+    categories, locations = {}, {}
+    buckets = [0] * len(CAPACITY_THRESHOLDS)
+    total = 0
+    for row in rows:
+        category, location, bucket_index = row[0], row[1], row[2]
+        count = row[-1]
+        # A row counts towards a facet if it fails no filter other than that facet's own
+        failed = [name for name, flag in zip(active, row[3:-1]) if not flag]
+        if not failed:
+            total += count
+        if category and failed in ([], ['category']):
+            categories[category] = categories.get(category, 0) + count
+        if location and failed in ([], ['location']):
+            locations[location] = locations.get(location, 0) + count
+        if bucket_index is not None and failed in ([], ['capacity']):
+            buckets[bucket_index] += count
+    
+    # A resource in bucket i also counts towards every lower threshold
+    capacity = []
+    running = 0
+    for index in reversed(range(len(CAPACITY_THRESHOLDS))):
+        running += buckets[index]
+        if running:
+            capacity.append({'min': CAPACITY_THRESHOLDS[index], 'count': running})
+    capacity.reverse()
+    
+    return {
+        'total': total,
+        'category': _sorted_counts(categories),
+        'location': _sorted_counts(locations),
+        'capacity': capacity,
+    }
+
+
+def _sorted_counts(counts: Dict[str, int]) -> List[Dict[str, object]]:
+    return [{'value': value, 'count': count}
+            for value, count in sorted(counts.items(), key=lambda item: item[0].lower())]
+
+
+class FacetCache:
+    """Facet counts of the unfiltered search for one application, at one catalog version."""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._facets: Optional[Dict[str, object]] = None
+        self._version: Optional[int] = None
+    
+    def facets(self, base_query) -> Dict[str, object]:
+        """
+        Get the unfiltered facets, computing them if missing or the catalog moved on.
+        
+        Args:
+            base_query: Query over all published resources
+        
+        Returns:
+            Facet dictionary as returned by ``compute_facets``
+        """
+        # Read before computing: a write committed meanwhile only costs one more recompute
+        version = get_catalog().version
+        with self._lock:
+            if self._facets is not None and self._version == version:
+                return self._facets
+        
+        facets = compute_facets(base_query)
+        with self._lock:
+            self._facets, self._version = facets, version
+        return facets
+
+
+def get_facet_cache() -> FacetCache:
+    """Get the facet cache for the current Flask application."""
+    return current_app.extensions.setdefault(_EXTENSION_KEY, FacetCache())
+
+
+def search_facets(base_query, conditions: Optional[Dict[str, object]] = None,
+                  unfiltered: bool = False) -> Dict[str, object]:
+    """
+    Get the facet counts of a search.
+    
+    Args:
+        base_query: Resource query with every non-facet filter applied
+        conditions: Active facet filters from ``facet_conditions``
+        unfiltered: True when the search has no keyword, availability or facet
+                    filter, so the shared cached counts can be used
+    
+    Returns:
+        Facet dictionary as returned by ``compute_facets``
+    """
+    if unfiltered and not conditions:
+        return get_facet_cache().facets(base_query)
+    return compute_facets(base_query, conditions)
@@ -0,0 +1,74 @@
+"""
+Per-transaction change tracking for the in-process caches.
+
+Caches answered from memory (the booking interval index, occupancy grids,
+calendar windows, recipient suggestions) learn about writes from Session
+hooks. While a transaction runs, its writes record the scopes they touched
+(resource IDs, calendars...) in ``session.info`` under the cache's key;
+when it ends, the recorded scopes are dropped from the cache. A rollback
+drops them too, since entries rebuilt from the rolled-back rows during the
+transaction must not outlive it.
+
+Caches derived from the published catalog are not tracked this way: they
+are keyed on the catalog version instead (see utils/catalog.py).
+"""
+from typing import Callable, Hashable, Iterable, Optional, Set
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+
+def track(session, key: str, scopes: Optional[Iterable[Hashable]]):
+    """
+    Record scopes touched by the session's current transaction.
+    
+    Args:
+        session: Session the write happened in
+        key: ``session.info`` key of the cache
+        scopes: Touched scopes, or None for everything
+    """
+    tracked = session.info.get(key, set())
+    if scopes is None or tracked is None:
+        session.info[key] = None
+    else:
+        tracked.update(scopes)
+        session.info[key] = tracked
+
+
+def is_bulk_write(orm_execute_state, classes: tuple, inserts: bool = False) -> bool:
+    """
+    Check whether a statement writes models in bulk, bypassing the flush hooks.
+    
+    Args:
+        orm_execute_state: State passed to a ``do_orm_execute`` hook
+        classes: Model classes of interest
+        inserts: Count INSERTs too, not only UPDATE and DELETE
+    
+    Returns:
+        True for an ORM-enabled statement on one of the models, or a Core
+        statement on one of their tables
+    """
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete
+            or (inserts and orm_execute_state.is_insert)):
+        return False
+    mapper = orm_execute_state.bind_mapper
+    table = getattr(orm_execute_state.statement, 'table', None)
+    return (mapper is not None and mapper.class_ in classes) or \
+        any(table is cls.__table__ for cls in classes)
+
+
+def drop_on_transaction_end(key: str, drop: Callable[[Optional[Set[Hashable]]], None]):
+    """
+    Hand the tracked scopes to ``drop`` when a transaction commits or rolls back.
+    
+    Args:
+        key: ``session.info`` key of the cache
+        drop: Called with the tracked scopes (None for everything), only if
+            the transaction recorded any
+    """
+    def _end(session):
+        if key in session.info:
+            drop(session.info.pop(key))
+    
+    event.listen(Session, 'after_commit', _end)
+    event.listen(Session, 'after_rollback', _end)
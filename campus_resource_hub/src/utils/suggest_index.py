@@ -0,0 +1,317 @@
+"""
+In-memory prefix indexes for typeahead suggestions.
+
+The resource search box suggests resource titles, locations and categories,
+and the message recipient field suggests usernames. Both are answered from a
+sorted array of normalized keys kept in process memory: a keystroke is one
+binary search plus a short scan, with no database query.
+
+The resource index is built from the published catalog snapshot (see
+utils/catalog.py) and rebuilt whenever the catalog version moves, which also
+covers writes made by other worker processes. Users are not part of the
+catalog: that index is dropped when a recipient's username or status change
+commits in this process, and reloaded after ``SUGGEST_INDEX_TTL`` seconds to
+pick up other workers' writes (0 disables the time-based reload).
+"""
+import bisect
+import logging
+import re
+import threading
+import time
+from collections import Counter
+from typing import Callable, Dict, Hashable, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from flask import current_app, has_app_context
+from sqlalchemy import event, inspect
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from .catalog import get_catalog
+from .session_tracking import drop_on_transaction_end, is_bulk_write, track
+
+logger = logging.getLogger(__name__)
+
+# Longest stretch of the key array scanned for one query
+SCAN_LIMIT = 500
+
+_EXTENSION_KEY = 'suggest_indexes'
+
+_WORD = re.compile(r'\w+', re.UNICODE)
+
+
+class Suggestion(NamedTuple):
+    """One suggestion: what kind it is, the value to fill in, and what to show."""
+    kind: str
+    value: str
+    label: str
+
+
+def normalize(text: Optional[str]) -> str:
+    """Lower-case text and reduce it to single-space separated words."""
+    return ' '.join(_WORD.findall((text or '').lower()))
+
+
+def _keys(suggestion: Suggestion) -> List[str]:
+    """Keys for a suggestion: its label from every word onwards ("lab" finds "Chemistry Lab")."""
+    words = normalize(suggestion.label).split(' ')
+    return [' '.join(words[start:]) for start in range(len(words)) if words[start]]
+
+
+class PrefixIndex:
+    """
+    Sorted array of (key, suggestion) pairs searchable by key prefix.
+    
+    Suggestions belong to documents (e.g. a resource has a title, a location
+    and a category suggestion). A suggestion shared by several documents,
+    such as a category, is indexed once and ranked by how many documents
+    have it.
+    """
+    
+    def __init__(self, documents: Optional[Dict[Hashable, Iterable[Suggestion]]] = None):
+        self._lock = threading.Lock()
+        self._docs: Dict[Hashable, Set[Suggestion]] = {}
+        self._refs: Counter = Counter()
+        for doc_id, suggestions in (documents or {}).items():
+            suggestions = set(suggestions)
+            if suggestions:
+                self._docs[doc_id] = suggestions
+                self._refs.update(suggestions)
+        self._entries: List[Tuple[str, Suggestion]] = sorted(
+            (key, suggestion) for suggestion in self._refs for key in _keys(suggestion))
+    
+    def __len__(self):
+        return len(self._refs)
+    
+    def set(self, doc_id: Hashable, suggestions: Iterable[Suggestion]):
+        """
+        Replace the suggestions of one document.
+        
+        Args:
+            doc_id: Document key (e.g. resource ID)
+            suggestions: Its current suggestions; empty removes the document
+        """
+        new = set(suggestions)
+        with self._lock:
+            old = self._docs.pop(doc_id, set())
+            if new:
+                self._docs[doc_id] = new
+            for suggestion in old - new:
+                self._refs[suggestion] -= 1
+                if not self._refs[suggestion]:
+                    del self._refs[suggestion]
+                    for key in _keys(suggestion):
+                        index = bisect.bisect_left(self._entries, (key, suggestion))
+                        if index < len(self._entries) and self._entries[index] == (key, suggestion):
+                            del self._entries[index]
+            for suggestion in new - old:
+                self._refs[suggestion] += 1
+                if self._refs[suggestion] == 1:
+                    for key in _keys(suggestion):
+                        bisect.insort(self._entries, (key, suggestion))
+    
+    def search(self, text: str, limit: int = 10, kinds: Optional[Iterable[str]] = None) -> List[Suggestion]:
+        """
+        Find suggestions with a word starting with the typed text.
+        
+        Args:
+            text: Typed text; every word of it must match in order
+            limit: Maximum number of suggestions
+            kinds: Only return these kinds (optional)
+        
+        Returns:
+            Suggestions whose label starts with the text first, then by how
+            many documents share them, then alphabetically
+        """
+        prefix = normalize(text)
+        if not prefix:
+            return []
+        kinds = set(kinds) if kinds else None
+        
+        found = {}
+        with self._lock:
+            index = bisect.bisect_left(self._entries, (prefix,))
+            end = min(index + SCAN_LIMIT, len(self._entries))
+            while index < end and self._entries[index][0].startswith(prefix):
+                key, suggestion = self._entries[index]
+                if kinds is None or suggestion.kind in kinds:
+                    at_start = key == normalize(suggestion.label)
+                    found[suggestion] = found.get(suggestion, False) or at_start
+                index += 1
+            ranked = sorted(found, key=lambda s: (not found[s], -self._refs[s], s.label.lower(), s.kind))
+        return ranked[:limit]
+
+
+class LiveIndex:
+    """
+    A PrefixIndex for one application, loaded lazily and rebuilt when stale.
+    
+    The index is stale once ``version()`` returns something else than when it
+    was loaded, or ``ttl`` seconds after loading (0: never by age).
+    """
+    
+    def __init__(self, loader: Callable[[], Dict[Hashable, Iterable[Suggestion]]],
+                 version: Optional[Callable[[], Hashable]] = None, ttl: float = 0.0):
+        self.loader = loader
+        self.version = version
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._index: Optional[PrefixIndex] = None
+        self._loaded_at = 0.0
+        self._loaded_version: Hashable = None
+        self._generation = 0
+    
+    def index(self) -> PrefixIndex:
+        """Get the index, loading it if missing or stale."""
+        now = time.monotonic()
+        version = self.version() if self.version else None
+        with self._lock:
+            index, generation = self._index, self._generation
+            if index is not None and version == self._loaded_version and \
+                    (not self.ttl or now - self._loaded_at < self.ttl):
+                return index
+        
+        index = PrefixIndex(self.loader())
+        with self._lock:
+            # Dropped while loading: this snapshot may miss the write
+            if generation == self._generation:
+                self._index, self._loaded_at, self._loaded_version = index, now, version
+        return index
+    
+    def invalidate(self):
+        """Drop the index so the next lookup reloads it."""
+        with self._lock:
+            self._index = None
+            self._generation += 1
+
+
+# ---------------------------------------------------------------------------
+# Resource and user indexes
+# ---------------------------------------------------------------------------
+
+def resource_suggestions(title, location, category, status) -> List[Suggestion]:
+    """Suggestions contributed by one resource (none unless published)."""
+    if status != 'published':
+        return []
+    return [Suggestion(kind, value, value)
+            for kind, value in (('title', title), ('location', location), ('category', category))
+            if value and value.strip()]
+
+
+def user_suggestions(username, is_active, is_suspended) -> List[Suggestion]:
+    """
+    Suggestion for one user as a message recipient (none if they cannot receive messages).
+    
+    Only the username is indexed and shown; real names are not exposed to
+    whoever types in the recipient field.
+    """
+    if not username or is_active is False or is_suspended:
+        return []
+    return [Suggestion('user', username, username)]
+
+
+def _load_resources() -> Dict[Hashable, List[Suggestion]]:
+    return {entry.id: resource_suggestions(entry.title, entry.location, entry.category, entry.status)
+            for entry in get_catalog().entries}
+
+
+def _catalog_version() -> Hashable:
+    return get_catalog().version
+
+
+def _load_users() -> Dict[Hashable, List[Suggestion]]:
+    from ..extensions import db
+    from ..models.user import User
+    rows = db.session.query(
+        User.id, User.username, User.is_active, User.is_suspended
+    ).all()
+    return {row[0]: user_suggestions(*row[1:]) for row in rows}
+
+
+_LOADERS = {'resources': _load_resources, 'users': _load_users}
+
+
+def get_suggest_index(name: str) -> LiveIndex:
+    """
+    Get a suggestion index ('resources' or 'users') for the current application.
+    
+    Args:
+        name: Index name
+    
+    Returns:
+        The application's LiveIndex
+    """
+    indexes = current_app.extensions.setdefault(_EXTENSION_KEY, {})
+    live = indexes.get(name)
+    if live is None:
+        if name == 'resources':
+            live = LiveIndex(_load_resources, version=_catalog_version)
+        else:
+            live = LiveIndex(_LOADERS[name], ttl=current_app.config.get('SUGGEST_INDEX_TTL', 300))
+        indexes[name] = live
+    return live
+
+
+def warm_suggest_indexes():
+    """Load every suggestion index now (called at startup) instead of on the first keystroke."""
+    try:
+        for name in _LOADERS:
+            get_suggest_index(name).index()
+    except SQLAlchemyError as exc:
+        # e.g. before the first migration; the indexes load on first use instead
+        logger.warning("Suggestion indexes not loaded at startup: %s", exc)
+        for name in _LOADERS:
+            get_suggest_index(name).invalidate()
+
+
+def suggest(name: str, text: str, limit: int = 10, kinds: Optional[Iterable[str]] = None) -> List[Suggestion]:
+    """
+    Look up suggestions for typed text.
+    
+    Args:
+        name: Index name ('resources' or 'users')
+        text: Typed text
+        limit: Maximum number of suggestions
+        kinds: Only return these kinds (optional)
+    
+    Returns:
+        Ranked suggestions
+    """
+    return get_suggest_index(name).index().search(text, limit=limit, kinds=kinds)
+
+
+# ---------------------------------------------------------------------------
+# Session hooks: drop the user index once recipient changes commit.
+# ---------------------------------------------------------------------------
+
+_INFO_KEY = 'suggest_users_dirty'
+
+# User columns a recipient suggestion is made of
+_USER_FIELDS = ('username', 'is_active', 'is_suspended')
+
+
+@event.listens_for(Session, 'after_flush')
+def _after_flush(session, flush_context):
+    from ..models.user import User
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if not isinstance(obj, User):
+            continue
+        if obj in session.dirty and not any(
+                inspect(obj).attrs[field].history.has_changes() for field in _USER_FIELDS):
+            continue  # e.g. a login timestamp
+        track(session, _INFO_KEY, [obj.id])
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _on_orm_execute(orm_execute_state):
+    from ..models.user import User
+    if is_bulk_write(orm_execute_state, (User,)):
+        track(orm_execute_state.session, _INFO_KEY, None)
+
+
+def _drop_users(user_ids):
+    indexes = current_app.extensions.get(_EXTENSION_KEY, {}) if has_app_context() else {}
+    if 'users' in indexes:
+        indexes['users'].invalidate()
+
+
+drop_on_transaction_end(_INFO_KEY, _drop_users)
@@ -0,0 +1,157 @@
+"""
+Concurrency tests and benchmark for booking admission.
+
+Many threads post bookings through the real booking endpoint at once. The
+tests assert that no resource ever ends up double-booked, and report booking
+throughput (run with ``-s`` to see the numbers).
+"""
+import sqlite3
+import threading
+import time
+import pytest
+from datetime import datetime, timedelta
+from sqlalchemy import and_
+from sqlalchemy.orm import aliased
+from src.data_access import BookingDAO, ResourceDAO
+from src.models.booking import Booking
+from src.extensions import db
+from src.utils.booking_admission import LockStripes, admit_bookings
+
+THREADS = 8
+BOOKINGS_PER_THREAD = 5
+
+
+def count_double_bookings():
+    """Count pairs of overlapping pending/active bookings on the same resource."""
+    first = aliased(Booking)
+    second = aliased(Booking)
+    return db.session.query(first.id).join(second, and_(
+        second.resource_id == first.resource_id,
+        second.id > first.id,
+        second.start_date < first.end_date,
+        second.end_date > first.start_date
+    )).filter(
+        first.status.in_(['pending', 'active']),
+        second.status.in_(['pending', 'active'])
+    ).count()
+
+
+def run_parallel(app, user, jobs):
+    """
+    Run booking jobs on THREADS threads, each with its own logged-in client.
+    
+    Args:
+        jobs: One list of (resource_id, start_date) per thread
+    
+    Returns:
+        Elapsed wall-clock seconds
+    """
+    barrier = threading.Barrier(len(jobs))
+    errors = []
+    
+    def worker(thread_jobs):
+        try:
+            client = app.test_client()
+            client.post('/auth/login', data={'email': user.email, 'password': 'password123'})
+            barrier.wait()
+            for resource_id, start_date in thread_jobs:
+                client.post(f'/resources/{resource_id}/book', data={
+                    'start_date': start_date.strftime('%Y-%m-%dT%H:%M'),
+                    'end_date': (start_date + timedelta(hours=1)).strftime('%Y-%m-%dT%H:%M'),
+                    'notes': '',
+                    'recurrence_type': ''
+                })
+        except Exception as e:  # pragma: no cover - surfaced by the assertion below
+            errors.append(e)
+    
+    threads = [threading.Thread(target=worker, args=(thread_jobs,)) for thread_jobs in jobs]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    assert errors == []
+    return elapsed
+
+
+@pytest.fixture
+def rooms(app, test_user):
+    """Create one single-capacity published room per thread."""
+    with app.app_context():
+        dao = ResourceDAO()
+        return [
+            dao.create(title=f'Benchmark Room {idx}', description='Benchmark', category='Room',
+                       capacity=1, status='published', owner_id=test_user.id).id
+            for idx in range(THREADS)
+        ]
+
+
+class TestBookingAdmission:
+    """Concurrent booking admission must never double-book a resource."""
+    
+    def test_lock_stripes_map_keys_consistently(self):
+        """Test that a key always maps to the same lock."""
+        stripes = LockStripes(4)
+        assert len(stripes) == 4
+        assert stripes.lock_for(7) is stripes.lock_for(7)
+        assert stripes.lock_for(1) is not stripes.lock_for(2)
+    
+    def test_conditional_insert_rejects_overlap(self, app, test_user, test_resource, test_booking):
+        """Test that the insert itself refuses a slot taken since the check."""
+        with app.app_context():
+            dao = BookingDAO()
+            values = {
+                'user_id': test_user.id,
+                'resource_id': test_resource.id,
+                'start_date': test_booking.start_date + timedelta(minutes=30),
+                'end_date': test_booking.end_date + timedelta(minutes=30),
+                'status': 'active'
+            }
+            assert dao.insert_if_free(values) is None
+            values['start_date'] = test_booking.end_date
+            assert dao.insert_if_free(values) is not None
+            db.session.commit()
+            assert count_double_bookings() == 0
+    
+    def test_admission_holds_database_write_lock(self, app, test_resource):
+        """Test that another process cannot write while a resource is being admitted."""
+        with app.app_context():
+            path = db.engine.url.database
+            with admit_bookings(test_resource.id):
+                other = sqlite3.connect(path, timeout=0)
+                try:
+                    with pytest.raises(sqlite3.OperationalError, match='locked'):
+                        other.execute('UPDATE resources SET id = id')
+                finally:
+                    other.close()
+            assert not db.session().in_transaction()
+            # Released on exit without a commit
+            other = sqlite3.connect(path, timeout=0)
+            other.execute('UPDATE resources SET id = id')
+            other.commit()
+            other.close()
+    
+    def test_contended_slot_is_booked_once(self, app, test_user, rooms):
+        """Test that threads racing for one slot produce exactly one booking."""
+        slot = (datetime.utcnow() + timedelta(days=3)).replace(hour=10, minute=0, second=0, microsecond=0)
+        run_parallel(app, test_user, [[(rooms[0], slot)] for _ in range(THREADS)])
+        with app.app_context():
+            assert len(BookingDAO().get_by_resource(rooms[0])) == 1
+            assert count_double_bookings() == 0
+    
+    def test_parallel_throughput_across_resources(self, app, test_user, rooms):
+        """Benchmark: threads booking different resources all succeed."""
+        base = (datetime.utcnow() + timedelta(days=5)).replace(hour=8, minute=0, second=0, microsecond=0)
+        jobs = [
+            [(room_id, base + timedelta(hours=2 * n)) for n in range(BOOKINGS_PER_THREAD)]
+            for room_id in rooms
+        ]
+        elapsed = run_parallel(app, test_user, jobs)
+        total = THREADS * BOOKINGS_PER_THREAD
+        print(f'\n{total} bookings on {THREADS} threads in {elapsed:.2f}s '
+              f'({total / elapsed:.1f} bookings/s)')
+        with app.app_context():
+            booked = sum(len(BookingDAO().get_by_resource(room_id)) for room_id in rooms)
+            assert booked == total
+            assert count_double_bookings() == 0
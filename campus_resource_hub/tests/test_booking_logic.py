@@ -185,3 +185,354 @@ class TestBookingQueries:
             assert in_range.id in booking_ids
             assert out_of_range.id not in booking_ids
 
+
+
+class TestBookingIntervalIndex:
+    """Test the per-resource interval index behind check_conflict."""
+    
+    def test_overlap_uses_half_open_intervals(self):
+        """Test that back-to-back bookings do not conflict."""
+        from src.utils.booking_index import ResourceIntervals
+        base = datetime(2030, 1, 1, 9, 0)
+        intervals = ResourceIntervals([
+            (1, base, base + timedelta(hours=1)),
+            (2, base + timedelta(hours=3), base + timedelta(hours=4)),
+        ])
+        assert intervals.overlaps(base + timedelta(hours=1), base + timedelta(hours=3)) is False
+        assert intervals.overlaps(base - timedelta(hours=1), base) is False
+        assert intervals.overlaps(base + timedelta(minutes=30), base + timedelta(hours=2)) is True
+        assert intervals.overlaps(base - timedelta(hours=1), base + timedelta(hours=5)) is True
+    
+    def test_exclude_id_skips_only_that_booking(self):
+        """Test excluding the longest booking still detects a shorter overlap."""
+        from src.utils.booking_index import ResourceIntervals
+        base = datetime(2030, 1, 1, 9, 0)
+        intervals = ResourceIntervals([
+            (1, base, base + timedelta(hours=8)),
+            (2, base + timedelta(hours=1), base + timedelta(hours=2)),
+        ])
+        probe = (base + timedelta(hours=1, minutes=30), base + timedelta(hours=3))
+        assert intervals.overlaps(*probe, exclude_id=1) is True
+        assert intervals.overlaps(*probe, exclude_id=2) is True
+        later = (base + timedelta(hours=4), base + timedelta(hours=5))
+        assert intervals.overlaps(*later, exclude_id=1) is False
+    
+    def test_index_refreshes_after_booking_commit(self, app, test_resource, test_user):
+        """Test that a committed booking is visible to the next conflict check."""
+        with app.app_context():
+            dao = BookingDAO()
+            start = datetime.utcnow() + timedelta(days=30)
+            end = start + timedelta(hours=1)
+            assert dao.check_conflict(test_resource.id, start, end) is False
+            
+            booking = dao.create(
+                user_id=test_user.id,
+                resource_id=test_resource.id,
+                start_date=start,
+                end_date=end,
+                status='pending'
+            )
+            assert dao.check_conflict(test_resource.id, start, end) is True
+            
+            dao.update_status(booking.id, 'cancelled')
+            assert dao.check_conflict(test_resource.id, start, end) is False
+    
+    def test_other_workers_writes_reload_index(self, app, test_resource, test_user):
+        """Test that a series committed by another worker conflicts before the index expires."""
+        from src.utils.booking_index import _bump_versions
+        from src.utils.recurrence import series_fields
+        with app.app_context():
+            dao = BookingDAO()
+            start = datetime(2030, 1, 7, 9, 0)
+            later = (start + timedelta(weeks=2), start + timedelta(weeks=2, hours=1))
+            assert dao.check_conflict(test_resource.id, *later) is False
+            
+            # Written in another session, as another worker would: this
+            # process's index only learns of it from the shared version
+            other = db.session.session_factory()
+            other.connection().execute(Booking.__table__.insert().values(
+                user_id=test_user.id, resource_id=test_resource.id,
+                start_date=start, end_date=start + timedelta(hours=1), status='active',
+                recurrence_type='weekly',
+                **series_fields(start, start + timedelta(hours=1), 'weekly', start + timedelta(weeks=4))
+            ))
+            _bump_versions(other, [test_resource.id])
+            other.commit()
+            other.close()
+            assert dao.check_conflict(test_resource.id, *later) is True
+            assert dao.check_conflict(test_resource.id, later[1], later[1] + timedelta(hours=1)) is False
+
+
+class TestRecurringSeries:
+    """Test series expansion and set-based series conflict checks."""
+    
+    def test_expand_occurrences_stops_at_recurrence_end(self):
+        """Test that a weekly series stops at its end date."""
+        from src.utils.recurrence import expand_occurrences
+        start = datetime(2030, 1, 7, 9, 0)
+        occurrences = expand_occurrences(start, start + timedelta(hours=1), 'weekly',
+                                         start + timedelta(weeks=3))
+        assert len(occurrences) == 4
+        assert occurrences[-1] == (start + timedelta(weeks=3), start + timedelta(weeks=3, hours=1))
+    
+    def test_expand_occurrences_respects_limit(self):
+        """Test that an open-ended series is capped."""
+        from src.utils.recurrence import expand_occurrences
+        start = datetime(2030, 1, 7, 9, 0)
+        occurrences = expand_occurrences(start, start + timedelta(hours=1), 'daily', None, limit=10)
+        assert len(occurrences) == 10
+    
+    def test_count_series_overlaps(self, app, test_resource, test_booking):
+        """Test that every occurrence gets its own overlap count from one query."""
+        with app.app_context():
+            dao = BookingDAO()
+            occurrences = [
+                (test_booking.start_date - timedelta(days=1), test_booking.end_date - timedelta(days=1)),
+                (test_booking.start_date + timedelta(minutes=30), test_booking.end_date + timedelta(minutes=30)),
+                (test_booking.end_date, test_booking.end_date + timedelta(hours=1)),
+            ]
+            assert dao.count_series_overlaps(test_resource.id, occurrences) == [0, 1, 0]
+
+    def test_monthly_keeps_day_of_month(self):
+        """Test that monthly means the same day each month, not +30 days."""
+        from src.utils.recurrence import expand_occurrences
+        start = datetime(2030, 1, 15, 9, 0)
+        occurrences = expand_occurrences(start, start + timedelta(hours=1), 'monthly', datetime(2030, 4, 30))
+        assert [s.date().isoformat() for s, _ in occurrences] == [
+            '2030-01-15', '2030-02-15', '2030-03-15', '2030-04-15']
+    
+    def test_expand_rule_is_window_bounded(self):
+        """Test that only occurrences overlapping the window are expanded, minus exceptions."""
+        from src.utils.recurrence import build_rrule, expand_rule
+        start = datetime(2030, 1, 7, 9, 0)
+        rule = build_rrule('daily', start + timedelta(days=30))
+        assert rule == 'FREQ=DAILY;UNTIL=20300206T090000'
+        occurrences = expand_rule(rule, start, start + timedelta(hours=2),
+                                  start + timedelta(days=10, hours=1), start + timedelta(days=13),
+                                  exdates={start + timedelta(days=11)})
+        assert [s for s, _ in occurrences] == [start + timedelta(days=10), start + timedelta(days=12)]
+    
+    def test_rule_series_blocks_its_occurrences(self, app, test_resource, test_user):
+        """Test that conflict checks see expanded occurrences and honour exceptions."""
+        from src.utils.recurrence import series_fields
+        with app.app_context():
+            start = datetime(2030, 1, 7, 9, 0)
+            dao = BookingDAO()
+            series = dao.create(user_id=test_user.id, resource_id=test_resource.id,
+                                start_date=start, end_date=start + timedelta(hours=1),
+                                status='active', recurrence_type='weekly',
+                                **series_fields(start, start + timedelta(hours=1), 'weekly',
+                                                start + timedelta(weeks=4)))
+            third = start + timedelta(weeks=2)
+            assert dao.check_conflict(test_resource.id, third, third + timedelta(minutes=30))
+            assert not dao.check_conflict(test_resource.id, third + timedelta(days=1),
+                                          third + timedelta(days=1, hours=1))
+            assert dao.count_series_overlaps(test_resource.id, [(third, third + timedelta(hours=1))]) == [1]
+            assert dao.max_concurrency(test_resource.id, start, start + timedelta(weeks=5)) == 1
+            
+            dao.add_exceptions(series.id, [third])
+            db.session.commit()
+            assert not dao.check_conflict(test_resource.id, third, third + timedelta(minutes=30))
+            assert len(Booking.query.get(series.id).occurrences()) == 4
+
+
+class TestCapacityEngine:
+    """Test sweep-line peak concurrency used for capacity checks."""
+    
+    def test_back_to_back_bookings_do_not_stack(self):
+        """Test that touching intervals never count as concurrent."""
+        from src.utils.capacity import peak_concurrency
+        start = datetime(2030, 1, 7, 9, 0)
+        intervals = [
+            (start, start + timedelta(hours=1)),
+            (start + timedelta(hours=1), start + timedelta(hours=2)),
+            (start + timedelta(hours=2), start + timedelta(hours=3)),
+        ]
+        assert peak_concurrency(intervals, start, start + timedelta(hours=3)) == 1
+    
+    def test_peak_is_clipped_to_window(self):
+        """Test that overlaps outside the window are ignored."""
+        from src.utils.capacity import peak_concurrency
+        start = datetime(2030, 1, 7, 9, 0)
+        intervals = [
+            (start, start + timedelta(hours=2)),
+            (start + timedelta(hours=1), start + timedelta(hours=3)),
+            (start + timedelta(minutes=30), start + timedelta(hours=4)),
+        ]
+        assert peak_concurrency(intervals, start, start + timedelta(hours=4)) == 3
+        assert peak_concurrency(intervals, start + timedelta(hours=2), start + timedelta(hours=4)) == 2
+    
+    def test_max_concurrency_filters_resource_and_status(self, app, test_resource, test_user):
+        """Test that only pending/active bookings on the resource are counted."""
+        with app.app_context():
+            dao = BookingDAO()
+            start = datetime.utcnow() + timedelta(days=20)
+            for offset, status in [(0, 'active'), (30, 'pending'), (60, 'cancelled'), (240, 'active')]:
+                dao.create(
+                    resource_id=test_resource.id,
+                    user_id=test_user.id,
+                    start_date=start + timedelta(minutes=offset),
+                    end_date=start + timedelta(minutes=offset + 90),
+                    status=status
+                )
+            
+            window_end = start + timedelta(hours=6)
+            assert dao.max_concurrency(test_resource.id, start, window_end) == 2
+            assert dao.max_concurrency(test_resource.id + 1000, start, window_end) == 0
+            
+            peaks = dao.peak_concurrency_subquery(start, window_end)
+            assert dict(db.session.query(peaks.c.resource_id, peaks.c.peak).all()) == {test_resource.id: 2}
+
+
+class TestFreeSlots:
+    """Test merging booked intervals into free slots."""
+    
+    def test_overlapping_bookings_are_merged(self):
+        """Test that gaps are found between merged, overlapping intervals."""
+        from src.utils.free_slots import find_free_slots
+        start = datetime(2030, 1, 7, 8, 0)
+        intervals = [
+            (start - timedelta(hours=1), start + timedelta(hours=1)),
+            (start + timedelta(hours=2), start + timedelta(hours=4)),
+            (start + timedelta(hours=3), start + timedelta(hours=5)),
+        ]
+        slots = find_free_slots(intervals, start, start + timedelta(hours=8))
+        assert slots == [
+            (start + timedelta(hours=1), start + timedelta(hours=2)),
+            (start + timedelta(hours=5), start + timedelta(hours=8)),
+        ]
+    
+    def test_opening_hours_and_min_duration(self):
+        """Test that slots are cut to opening hours and short gaps dropped."""
+        from datetime import time
+        from src.utils.free_slots import find_free_slots
+        day = datetime(2030, 1, 7)
+        intervals = [(day.replace(hour=9), day.replace(hour=9, minute=45))]
+        slots = find_free_slots(intervals, day, day + timedelta(days=2), timedelta(hours=1),
+                                open_time=time(9, 0), close_time=time(17, 0))
+        assert slots == [
+            (day.replace(hour=9, minute=45), day.replace(hour=17)),
+            (day.replace(hour=9) + timedelta(days=1), day.replace(hour=17) + timedelta(days=1)),
+        ]
+    
+    def test_overnight_gap_is_not_split_without_closing_time(self):
+        """Test that a gap across midnight stays whole when the hours never close."""
+        from datetime import time
+        from src.utils.free_slots import find_free_slots
+        day = datetime(2030, 1, 7)
+        intervals = [
+            (day.replace(hour=18), day.replace(hour=22)),
+            (day.replace(hour=2) + timedelta(days=1), day.replace(hour=8) + timedelta(days=1)),
+        ]
+        # Two hours before and after midnight: only the merged gap is long enough
+        for open_time in (None, time(0, 0)):
+            slots = find_free_slots(intervals, day.replace(hour=18), day.replace(hour=8) + timedelta(days=1),
+                                    timedelta(hours=3), open_time=open_time)
+            assert slots == [(day.replace(hour=22), day.replace(hour=2) + timedelta(days=1))]
+        
+        # A late opening time still closes the resource overnight
+        slots = find_free_slots(intervals, day.replace(hour=18), day.replace(hour=8) + timedelta(days=1),
+                                timedelta(hours=1), open_time=time(1, 0))
+        assert slots == [
+            (day.replace(hour=22), day + timedelta(days=1)),
+            (day.replace(hour=1) + timedelta(days=1), day.replace(hour=2) + timedelta(days=1)),
+        ]
+    
+    def test_dao_ignores_cancelled_bookings(self, app, test_resource, test_user):
+        """Test that only pending/active bookings block a slot."""
+        with app.app_context():
+            dao = BookingDAO()
+            day = datetime(2030, 1, 7)
+            dao.create(resource_id=test_resource.id, user_id=test_user.id,
+                       start_date=day.replace(hour=10), end_date=day.replace(hour=11), status='active')
+            dao.create(resource_id=test_resource.id, user_id=test_user.id,
+                       start_date=day.replace(hour=13), end_date=day.replace(hour=14), status='cancelled')
+            slots = dao.free_slots(test_resource.id, day.replace(hour=9), day.replace(hour=15))
+            assert slots == [
+                (day.replace(hour=9), day.replace(hour=10)),
+                (day.replace(hour=11), day.replace(hour=15)),
+            ]
+    
+    def test_proposer_resolves_requested_start(self, app):
+        """Test that intent phrases become a concrete start time."""
+        with app.app_context():
+            from src.ai_features.concierge.booking_proposer import BookingProposer
+            proposer = BookingProposer.__new__(BookingProposer)
+            now = datetime(2030, 1, 7, 12, 0)  # A Monday
+            assert proposer.resolve_requested_start({'date': 'tomorrow', 'time': 'at 3:30 pm'}, now) == datetime(2030, 1, 8, 15, 30)
+            assert proposer.resolve_requested_start({'date': 'friday', 'time': 'morning'}, now) == datetime(2030, 1, 11, 9, 0)
+            assert proposer.resolve_requested_start({'date': 'today', 'time': '9am'}, now) == datetime(2030, 1, 7, 13, 0)
+
+    
+    def test_proposer_matches_misspelled_resource_names(self, app, test_user):
+        """Test that booking requests resolve resource names with typos."""
+        with app.app_context():
+            from src.ai_features.concierge.booking_proposer import BookingProposer
+            from src.data_access import ResourceDAO
+            lab = ResourceDAO().create(title='Collaboration Lab', category='Lab', status='published',
+                                       owner_id=test_user.id)
+            proposer = BookingProposer()
+            intent = proposer.extract_booking_intent('can I book the colaboration lab tomorrow at 3pm?')
+            assert intent['resource_name'] == 'colaboration lab'
+            
+            retrieved = [{'id': 1, 'title': 'Study Room'}, {'id': 2, 'title': 'Colab Lab'}]
+            assert proposer.match_resource('Colab', retrieved)['id'] == 2
+            assert proposer.match_resource('Study Rooom', retrieved)['id'] == 1
+            # Not among the retrieved resources: the whole published catalog is searched
+            assert proposer.match_resource('colaboration lab', [])['id'] == lab.id
+            assert proposer.match_resource('gymnasium', []) is None
+
+
+class TestOccupancyMatrix:
+    """Test vectorized occupancy matrices and their incremental updates."""
+    
+    def test_build_counts_overlapping_slots(self):
+        """Test that partial slots count as occupied and overlaps stack."""
+        from src.utils.occupancy import build_occupancy
+        origin = datetime(2030, 1, 7)
+        rows = [
+            (1, origin + timedelta(minutes=10), origin + timedelta(minutes=50)),
+            (1, origin + timedelta(minutes=30), origin + timedelta(minutes=60)),
+            (2, origin - timedelta(hours=1), origin + timedelta(minutes=15)),
+        ]
+        matrix = build_occupancy(rows, [1, 2, 3], origin, 8)
+        assert matrix[0].tolist() == [1, 1, 2, 2, 0, 0, 0, 0]
+        assert matrix[1].tolist() == [1, 0, 0, 0, 0, 0, 0, 0]
+        assert matrix[2].sum() == 0
+    
+    def test_commit_updates_loaded_matrix_incrementally(self, app, test_resource, test_user):
+        """Test that committed booking changes are applied without a reload."""
+        with app.app_context():
+            from src.utils.occupancy import get_occupancy_service
+            dao = BookingDAO()
+            service = get_occupancy_service()
+            day = (datetime.utcnow() + timedelta(days=2)).replace(hour=0, minute=0, second=0, microsecond=0)
+            assert dao.get_occupancy([test_resource.id], day.date(), 1).sum() == 0
+            entry = service._entries[test_resource.id]
+            
+            booking = dao.create(resource_id=test_resource.id, user_id=test_user.id,
+                                 start_date=day.replace(hour=9), end_date=day.replace(hour=10),
+                                 status='active')
+            slots = dao.get_occupancy([test_resource.id], day.date(), 1)[0][0]
+            assert service._entries[test_resource.id] is entry
+            assert slots[36:40].tolist() == [1, 1, 1, 1]
+            assert slots.sum() == 4
+            
+            booking = dao.get_by_id(booking.id)
+            booking.status = 'cancelled'
+            db.session.commit()
+            assert dao.get_occupancy([test_resource.id], day.date(), 1).sum() == 0
+    
+    def test_rolled_back_booking_is_not_counted(self, app, test_resource, test_user):
+        """Test that a flushed then rolled-back booking leaves no trace."""
+        with app.app_context():
+            dao = BookingDAO()
+            day = (datetime.utcnow() + timedelta(days=3)).replace(hour=0, minute=0, second=0, microsecond=0)
+            db.session.add(Booking(resource_id=test_resource.id, user_id=test_user.id,
+                                   start_date=day.replace(hour=9), end_date=day.replace(hour=10),
+                                   status='active'))
+            db.session.flush()
+            assert dao.get_occupancy([test_resource.id], day.date(), 1).sum() == 4
+            db.session.rollback()
+            assert dao.get_occupancy([test_resource.id], day.date(), 1).sum() == 0
+            assert dao.get_utilization([test_resource.id], day.date(), 1) == {test_resource.id: 0.0}
@@ -101,6 +101,9 @@ class TestResourceDAO:
             resources = dao.get_published()
             assert len(resources) >= 1
             assert all(r.status == 'published' for r in resources)
+            # Models, not catalog snapshot entries: relationships load lazily
+            assert all(isinstance(r, Resource) for r in resources)
+            assert resources[0].owner is not None
     
     def test_get_by_category(self, app, test_resource):
         """Test getting resources by category."""
@@ -126,6 +129,124 @@ class TestResourceDAO:
             # Search by capacity
             results = dao.search(min_capacity=5)
             assert len(results) >= 1
+    
+    def test_full_text_search_ranks_and_matches_prefixes(self, app, test_resource, test_admin):
+        """Test that keyword search uses the FTS index: prefixes, extra columns, BM25 order."""
+        with app.app_context():
+            dao = ResourceDAO()
+            titled = dao.create(title='Microscope Lab', description='Teaching lab', category='Lab',
+                                status='published', owner_id=test_admin.id)
+            equipped = dao.create(title='Biology Room', description='Wet lab', category='Lab',
+                                  equipment='Microscope, Centrifuge', status='published',
+                                  owner_id=test_admin.id)
+            
+            assert [r.id for r in dao.search(query='micro')] == [titled.id, equipped.id]
+            assert [r.id for r in dao.search(query='centrifuge')] == [equipped.id]
+            assert dao.search(query='micro teaching') == [titled]
+            assert {r.id for r in dao.search(query='teaching centrifuge', any_term=True)} == {titled.id, equipped.id}
+            
+            # Writes reach the index through the triggers
+            equipped.title = 'Genetics Room'
+            from src.extensions import db
+            db.session.commit()
+            assert dao.search(query='genet') == [equipped]
+            assert dao.search(query='biology') == []
+    
+    def test_rating_badges_are_cached_until_reviews_change(self, app, test_resource, test_user, test_admin):
+        """Test that badges come from the cache until a review commits."""
+        from src.extensions import db
+        from src.utils.rating_badges import get_rating_badges
+        with app.app_context():
+            other = ResourceDAO().create(title='Other Room', category='Room', capacity=4,
+                                         status='published', owner_id=test_admin.id)
+            db.session.add_all([
+                Review(user_id=test_user.id, resource_id=test_resource.id, rating=5),
+                Review(user_id=test_user.id, resource_id=other.id, rating=2)
+            ])
+            db.session.commit()
+            badges = get_rating_badges()
+            assert badges == ([test_resource.id, other.id], other.id)
+            assert get_rating_badges() is badges
+            
+            db.session.add(Review(user_id=test_admin.id, resource_id=other.id, rating=5))
+            review = Review.query.filter_by(resource_id=test_resource.id).first()
+            review.is_hidden = True
+            db.session.commit()
+            assert get_rating_badges() == ([other.id], None)
+    
+    def test_catalog_snapshot_follows_commits_and_other_workers(self, app, test_resource, test_admin):
+        """Test that the catalog snapshot is reused until a write commits here or in another worker."""
+        from sqlalchemy import text
+        from src.extensions import db
+        from src.utils.catalog import get_catalog, get_catalog_store
+        with app.app_context():
+            catalog = get_catalog()
+            assert catalog.get(test_resource.id).title == 'Test Resource'
+            assert get_catalog() is catalog
+            with pytest.raises(AttributeError):
+                catalog.get(test_resource.id).title = 'Changed'
+            
+            # A commit in this process rebuilds the snapshot
+            other = ResourceDAO().create(title='Other Room', category='Lab', status='published',
+                                         owner_id=test_admin.id)
+            rebuilt = get_catalog()
+            assert rebuilt is not catalog and rebuilt.version > catalog.version
+            assert rebuilt.categories == ('Lab', 'Room')
+            
+            # Another worker's write is only seen through the shared version
+            db.session.execute(text("UPDATE resources SET title = 'Renamed' WHERE id = :id"), {'id': other.id})
+            db.session.execute(text("UPDATE catalog_versions SET version = version + 1"))
+            db.session.commit()
+            get_catalog_store().check_seconds = 0
+            assert get_catalog().get(other.id).title == 'Renamed'
+    
+    def test_search_caches_follow_catalog_version(self, app, test_resource, test_admin):
+        """Test that cached facets and resource suggestions see another worker's write."""
+        from sqlalchemy import text
+        from src.extensions import db
+        from src.models.resource import Resource
+        from src.utils import suggest_index
+        from src.utils.catalog import get_catalog_store
+        from src.utils.search_facets import search_facets
+        with app.app_context():
+            get_catalog_store().check_seconds = 0
+            published = Resource.query.filter(Resource.status == 'published')
+            assert search_facets(published, unfiltered=True)['category'] == [{'value': 'Room', 'count': 1}]
+            assert [s.value for s in suggest_index.suggest('resources', 'test')] == ['Test Resource']
+            
+            db.session.execute(text("UPDATE resources SET title = 'Renamed', category = 'Lab' WHERE id = :id"),
+                               {'id': test_resource.id})
+            db.session.execute(text("UPDATE catalog_versions SET version = version + 1"))
+            db.session.commit()
+            assert search_facets(published, unfiltered=True)['category'] == [{'value': 'Lab', 'count': 1}]
+            assert suggest_index.suggest('resources', 'test') == []
+            assert [s.value for s in suggest_index.suggest('resources', 'renamed')] == ['Renamed']
+    
+    def test_equipment_tags_filter_with_and_or(self, app, test_resource, test_admin):
+        """Test that equipment is split into tags that follow edits and back AND/OR filters."""
+        from src.extensions import db
+        from src.models.equipment_tag import EquipmentTag
+        with app.app_context():
+            dao = ResourceDAO()
+            both = dao.create(title='Seminar Room', category='Room', equipment='Projector, White Board',
+                              status='published', owner_id=test_admin.id)
+            projector = dao.create(title='Lecture Hall', category='Room', equipment='projector;  Microphone',
+                                   status='published', owner_id=test_admin.id)
+            
+            assert [tag.name for tag in both.tags] == ['projector', 'white board']
+            assert EquipmentTag.query.count() == 3
+            assert {r.id for r in dao.search(tags=['Projector'])} == {both.id, projector.id}
+            assert dao.search(tags=['projector', 'white  board']) == [both]
+            assert {r.id for r in dao.search(tags=['white board', 'microphone'], match_all_tags=False)} == \
+                {both.id, projector.id}
+            assert dao.search(tags=['projector', 'microphone', 'white board']) == []
+            
+            # Editing the equipment text re-links the tags
+            projector.equipment = 'Projector, Whiteboard'
+            db.session.commit()
+            assert [tag.name for tag in projector.tags] == ['projector', 'whiteboard']
+            assert dao.search(tags=['microphone']) == []
+            assert dict(dao.get_equipment_tags()) == {'projector': 2, 'white board': 1, 'whiteboard': 1}
 
 
 class TestBookingDAO:
@@ -282,6 +403,48 @@ class TestReviewDAO:
             pagination = dao.get_paginated(test_resource.id, page=1, per_page=10)
             assert pagination.total >= 1
             assert len(pagination.items) >= 1
+    
+    def test_rating_aggregates_follow_review_changes(self, app, test_resource, test_user, test_admin):
+        """Test that create/edit/hide/unhide/delete keep the stored aggregates current."""
+        with app.app_context():
+            from src.extensions import db
+            resource = Resource.query.get(test_resource.id)
+            first = Review(user_id=test_user.id, resource_id=resource.id, rating=5)
+            second = Review(user_id=test_admin.id, resource_id=resource.id, rating=2)
+            db.session.add_all([first, second])
+            db.session.commit()
+            assert (resource.rating_sum, resource.review_count(), resource.average_rating()) == (7, 2, 3.5)
+            
+            second.rating = 4
+            db.session.commit()
+            assert resource.average_rating() == 4.5
+            
+            dao = ReviewDAO()
+            dao.hide_review(second.id)
+            assert (resource.rating_sum, resource.review_count()) == (5, 1)
+            dao.unhide_review(second.id)
+            assert resource.review_count() == 2
+            
+            db.session.delete(first)
+            db.session.commit()
+            assert (resource.rating_sum, resource.review_count(), resource.average_rating()) == (4, 1, 4.0)
+    
+    def test_recompute_ratings_repairs_drift(self, app, test_resource, test_user):
+        """Test that the repair pass fixes aggregates written around the ORM."""
+        with app.app_context():
+            from src.extensions import db
+            db.session.add(Review(user_id=test_user.id, resource_id=test_resource.id, rating=3))
+            db.session.commit()
+            db.session.execute(Resource.__table__.update().values(rating_sum=0, rating_count=0, avg_rating=0))
+            db.session.commit()
+            
+            assert ResourceDAO().recompute_ratings() == 1
+            resource = Resource.query.get(test_resource.id)
+            assert (resource.rating_sum, resource.review_count(), resource.average_rating()) == (3, 1, 3.0)
+            assert ResourceDAO().recompute_ratings() == 0
+            
+            result = app.test_cli_runner().invoke(args=['repair-ratings'])
+            assert 'Repaired rating aggregates on 0 resource(s).' in result.output
 
 
 class TestNotificationDAO:
@@ -381,4 +544,66 @@ class TestCalendarSubscriptionDAO:
             db.session.refresh(subscription)
             assert subscription.access_count == initial_count + 1
             assert subscription.last_accessed_at is not None
+    
+    def test_buffered_access_is_written_in_batches(self, app, test_user, test_admin):
+        """Test that feed accesses are counted in memory and written in one batched UPDATE."""
+        from sqlalchemy import event
+        from src.extensions import db
+        from src.utils.access_stats import get_access_stats
+        with app.app_context():
+            dao = CalendarSubscriptionDAO()
+            first = CalendarSubscription.create_for_user(test_user.id)
+            second = CalendarSubscription.create_for_user(test_admin.id)
+            buffer = get_access_stats()
+            buffer.flush_seconds = 3600
+            
+            for subscription in (first, first, second):
+                dao.buffer_access(subscription.id)
+            db.session.refresh(first)
+            assert first.access_count == 0 and first.last_accessed_at is None
+            count, last_accessed_at = dao.get_access_stats(first)
+            assert count == 2 and last_accessed_at is not None
+            
+            statements = []
+            listener = lambda *args: statements.append(args[2])
+            event.listen(db.engine, 'before_cursor_execute', listener)
+            try:
+                assert buffer.flush() == 2
+            finally:
+                event.remove(db.engine, 'before_cursor_execute', listener)
+            assert len(statements) == 1 and statements[0].startswith('UPDATE calendar_subscriptions')
+            
+            db.session.refresh(first)
+            db.session.refresh(second)
+            assert (first.access_count, second.access_count) == (2, 1)
+            assert dao.get_access_stats(first) == (2, first.last_accessed_at)
+            
+            # Past the interval, the access that finds the buffer due writes it
+            buffer.flush_seconds = 0
+            dao.buffer_access(second.id)
+            db.session.refresh(second)
+            assert second.access_count == 2
 
+    
+    def test_exit_flush_skips_test_apps_and_drops_on_missing_database(self, app, test_user):
+        """Test that the exit flush never writes into a torn-down database."""
+        import weakref
+        from src.extensions import db
+        from src.utils.access_stats import _flush_at_exit, get_access_stats
+        with app.app_context():
+            subscription = CalendarSubscription.create_for_user(test_user.id)
+            buffer = get_access_stats()
+            buffer.flush_seconds = 3600
+            CalendarSubscriptionDAO().buffer_access(subscription.id)
+            
+            _flush_at_exit(weakref.ref(app))
+            assert buffer.pending(subscription.id)[0] == 1
+            
+            app.config['TESTING'] = False
+            db.drop_all()
+            try:
+                _flush_at_exit(weakref.ref(app))
+            finally:
+                app.config['TESTING'] = True
+                db.create_all()
+            assert buffer.pending(subscription.id) == (0, None)
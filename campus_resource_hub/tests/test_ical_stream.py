@@ -0,0 +1,149 @@
+"""
+Tests and benchmark for the streaming iCal serializer.
+
+The streamed calendar is parsed back with the icalendar package to check
+escaping and line folding. The benchmark compares it with building an
+``icalendar.Calendar`` for the whole history (the previous export path) and
+reports time and peak traced memory (run with ``-s`` to see the numbers).
+"""
+import time
+import tracemalloc
+from collections import namedtuple
+from datetime import datetime, timedelta, timezone
+
+from icalendar import Calendar, Event
+
+from src.data_access import BookingDAO
+from src.extensions import db
+from src.models.booking import Booking
+from src.models.user import User
+from src.utils.ical_stream import escape_text, fold, stream_calendar
+
+# Bookings in the benchmark history
+HISTORY = 2000
+
+Row = namedtuple('Row', 'id status notes start_date end_date recurrence_rule updated_at created_at '
+                        'title category location')
+
+
+def icalendar_export(user, bookings):
+    """The previous export: one icalendar object graph for every booking, serialized at the end."""
+    cal = Calendar()
+    cal.add('prodid', '-//Campus Resource Hub//Booking Calendar//EN')
+    cal.add('version', '2.0')
+    for booking in bookings:
+        event = Event()
+        event.add('uid', f'booking-{booking.id}@campus-resource-hub')
+        event.add('summary', f'{booking.resource.title} - {booking.status.title()}')
+        event.add('description', f'Resource: {booking.resource.title}\nStatus: {booking.status.title()}\n'
+                                 f'Notes: {booking.notes}\nBooking ID: {booking.id}')
+        event.add('dtstart', booking.start_date.replace(tzinfo=timezone.utc))
+        event.add('dtend', booking.end_date.replace(tzinfo=timezone.utc))
+        event.add('location', booking.resource.location)
+        event.add('last-modified', booking.updated_at.replace(tzinfo=timezone.utc))
+        event.add('organizer', f'MAILTO:{user.email}')
+        cal.add_component(event)
+    return cal.to_ical()
+
+
+def insert_bookings(user_id, resource_id, count):
+    """Insert a long booking history with one statement."""
+    origin = datetime(2020, 1, 6, 9, 0)
+    db.session.execute(Booking.__table__.insert(), [
+        {'user_id': user_id, 'resource_id': resource_id, 'status': 'completed',
+         'start_date': origin + timedelta(hours=n), 'end_date': origin + timedelta(hours=n, minutes=45),
+         'notes': f'Weekly lab session {n}, bring goggles; no food', 'created_at': origin,
+         'updated_at': origin}
+        for n in range(count)
+    ])
+    db.session.commit()
+
+
+class TestIcalSerializer:
+    """Escaping, folding and round-tripping of the streamed calendar."""
+    
+    def test_escaping_and_folding(self):
+        """Test TEXT escaping and 75-octet folding that never splits a UTF-8 character."""
+        assert escape_text('a,b;c\\d\ne') == 'a\\,b\\;c\\\\d\\ne'
+        folded = fold('DESCRIPTION:' + 'é' * 100)
+        lines = folded.split(b'\r\n')
+        assert lines[-1] == b''
+        assert all(len(line) <= 75 for line in lines)
+        assert all(line.startswith(b' ') for line in lines[1:-1])
+        assert b''.join(line[1:] if n else line for n, line in enumerate(lines)).decode('utf-8') == \
+            'DESCRIPTION:' + 'é' * 100
+    
+    def test_stream_parses_back(self):
+        """Test that icalendar reads back exactly what was streamed."""
+        start = datetime(2030, 1, 7, 9, 0)
+        rows = [
+            (Row(1, 'active', 'Projector, please; thanks\nSecond line ' + 'x' * 80, start, start + timedelta(hours=1),
+                 None, start, start, 'Lab, North', 'Lab', 'Building A; Room 2'), []),
+            (Row(2, 'pending', None, start, start + timedelta(hours=1), 'FREQ=DAILY;UNTIL=20300110T090000',
+                 None, start, 'Studio', 'Room', None), [start + timedelta(days=1)]),
+        ]
+        data = b''.join(stream_calendar('ana', 'ana@example.com', [rows[:1], rows[1:]], refresh_interval='PT12H'))
+        assert all(len(line) <= 75 for line in data.split(b'\r\n'))
+        
+        cal = Calendar.from_ical(data)
+        assert str(cal['X-WR-CALNAME']) == "ana's Bookings"
+        first, second = cal.walk('VEVENT')
+        assert str(first['summary']) == 'Lab, North - Active'
+        assert str(first['location']) == 'Building A; Room 2'
+        assert 'Notes: Projector, please; thanks\nSecond line' in str(first['description'])
+        assert first.decoded('dtstart') == start.replace(tzinfo=timezone.utc)
+        assert second['status'] == 'TENTATIVE'
+        assert second['rrule']['UNTIL'][0] == datetime(2030, 1, 10, 9, 0, tzinfo=timezone.utc)
+        assert second['exdate'].dts[0].dt == (start + timedelta(days=1)).replace(tzinfo=timezone.utc)
+    
+    def test_export_is_streamed(self, app, client, test_user, test_resource):
+        """Test that the export endpoint streams every booking in the requested window."""
+        with app.app_context():
+            insert_bookings(test_user.id, test_resource.id, 30)
+            client.post('/auth/login', data={'email': test_user.email, 'password': 'password123'})
+            response = client.get('/bookings/export/ical')
+            assert response.is_streamed
+            assert len(Calendar.from_ical(response.data).walk('VEVENT')) == 30
+            
+            response = client.get('/bookings/export/ical', query_string={
+                'start_date': '2020-01-06', 'end_date': '2020-01-06'})
+            assert len(Calendar.from_ical(response.data).walk('VEVENT')) == 15
+
+
+class TestIcalBenchmark:
+    """Benchmark: streamed export vs. one icalendar object graph."""
+    
+    def test_streaming_memory_does_not_grow_with_history(self, app, test_user, test_resource):
+        """Test that streaming beats the object graph and keeps a flat memory peak."""
+        with app.app_context():
+            insert_bookings(test_user.id, test_resource.id, HISTORY)
+            user = db.session.get(User, test_user.id)
+            dao = BookingDAO()
+            
+            def streamed():
+                size = 0
+                for chunk in stream_calendar(user.username, user.email, dao.iter_ical_chunks(user.id)):
+                    size += len(chunk)
+                return size
+            
+            def measure(export):
+                db.session.expunge_all()
+                tracemalloc.start()
+                started = time.perf_counter()
+                export()
+                elapsed = time.perf_counter() - started
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+                return elapsed, peak
+            
+            graph_time, graph_peak = measure(lambda: icalendar_export(user, dao.get_by_user(user.id)))
+            stream_time, stream_peak = measure(streamed)
+            print(f'\n{HISTORY} bookings: icalendar {graph_time:.2f}s / {graph_peak / 1e6:.1f}MB peak, '
+                  f'streamed {stream_time:.2f}s / {stream_peak / 1e6:.1f}MB peak')
+            assert stream_time < graph_time
+            assert stream_peak * 4 < graph_peak
+            
+            # Twice the history, about the same peak
+            insert_bookings(test_user.id, test_resource.id, HISTORY)
+            _, doubled_peak = measure(streamed)
+            assert doubled_peak < stream_peak * 1.5
@@ -77,6 +77,406 @@ class TestBookingWorkflow:
             bookings = dao.get_by_user(test_user.id)
             assert len(bookings) >= 1
     
+    def test_recurring_booking_skips_conflicting_occurrences(self, app, client, test_user, test_resource):
+        """Test that a daily series is stored as one rule and skips taken days."""
+        with app.app_context():
+            client.post('/auth/login', data={
+                'email': test_user.email,
+                'password': 'password123'
+            })
+            
+            start_date = (datetime.utcnow() + timedelta(days=3)).replace(hour=9, minute=0, second=0, microsecond=0)
+            end_date = start_date + timedelta(hours=1)
+            
+            # Occupy the third day of the series
+            dao = BookingDAO()
+            blocker = dao.create(
+                user_id=test_user.id,
+                resource_id=test_resource.id,
+                start_date=start_date + timedelta(days=2),
+                end_date=end_date + timedelta(days=2),
+                status='active'
+            )
+            
+            client.post(f'/resources/{test_resource.id}/book', data={
+                'start_date': start_date.strftime('%Y-%m-%dT%H:%M'),
+                'end_date': end_date.strftime('%Y-%m-%dT%H:%M'),
+                'notes': '',
+                'recurrence_type': 'daily',
+                'recurrence_end_date': (start_date + timedelta(days=4)).strftime('%Y-%m-%dT%H:%M')
+            }, follow_redirects=True)
+            
+            series = [b for b in dao.get_by_resource(test_resource.id) if b.id != blocker.id]
+            assert len(series) == 1
+            parent = series[0]
+            assert parent.recurrence_rule.startswith('FREQ=DAILY;UNTIL=')
+            occurrences = parent.occurrences()
+            assert len(occurrences) == 4
+            assert blocker.start_date not in [start for start, _ in occurrences]
+            assert [e.reason for e in parent.exceptions] == ['skipped']
+    
+    def test_rule_series_in_calendar_and_ical(self, app, client, test_user, test_resource):
+        """Test that a rule series expands per window in JSON and exports as a native RRULE."""
+        from src.utils.recurrence import series_fields
+        with app.app_context():
+            start_date = (datetime.utcnow() + timedelta(days=1)).replace(hour=9, minute=0, second=0, microsecond=0)
+            end_date = start_date + timedelta(hours=1)
+            dao = BookingDAO()
+            series = dao.create(user_id=test_user.id, resource_id=test_resource.id,
+                                start_date=start_date, end_date=end_date, status='active',
+                                recurrence_type='daily',
+                                **series_fields(start_date, end_date, 'daily', start_date + timedelta(days=20)))
+            
+            client.post('/auth/login', data={'email': test_user.email, 'password': 'password123'})
+            window_start = start_date + timedelta(days=5)
+            response = client.get('/bookings/calendar/json', query_string={
+                'start': window_start.isoformat() + 'Z',
+                'end': (window_start + timedelta(days=3)).isoformat() + 'Z'
+            })
+            events = response.get_json()
+            assert [e['start'] for e in events] == [
+                (window_start + timedelta(days=n)).isoformat() for n in range(3)]
+            
+            occurrence = start_date + timedelta(days=2)
+            client.post(f'/bookings/{series.id}/occurrences/cancel',
+                        data={'occurrence_start': occurrence.isoformat()})
+            assert not dao.check_conflict(test_resource.id, occurrence, occurrence + timedelta(hours=1))
+            
+            ical = client.get('/bookings/export/ical').data.decode()
+            assert ical.count('BEGIN:VEVENT') == 1
+            assert 'RRULE:FREQ=DAILY;UNTIL=' in ical
+            assert 'EXDATE:' + occurrence.strftime('%Y%m%dT%H%M%SZ') in ical
+    
+    def test_subscription_feed_revalidates_without_booking_queries(self, app, client, test_user, test_resource):
+        """Test that an unchanged iCal feed is answered with 304 or from memory, never from the booking tables."""
+        import re
+        from sqlalchemy import event
+        from src.models.calendar_subscription import CalendarSubscription
+        with app.app_context():
+            start_date = (datetime.utcnow() + timedelta(days=1)).replace(hour=9, minute=0, second=0, microsecond=0)
+            dao = BookingDAO()
+            booking = dao.create(user_id=test_user.id, resource_id=test_resource.id, start_date=start_date,
+                                 end_date=start_date + timedelta(hours=1), status='active')
+            url = f'/bookings/subscription/{CalendarSubscription.create_for_user(test_user.id).token}.ics'
+            
+            response = client.get(url)
+            assert response.status_code == 200
+            assert b'Active' in response.data
+            etag, last_modified = response.headers['ETag'], response.headers['Last-Modified']
+            assert not etag.startswith('W/')
+            
+            statements = []
+            listener = lambda *args: statements.append(args[2])
+            event.listen(db.engine, 'before_cursor_execute', listener)
+            try:
+                assert client.get(url, headers={'If-None-Match': etag}).status_code == 304
+                assert client.get(url, headers={'If-Modified-Since': last_modified}).status_code == 304
+                cached = client.get(url)
+                assert cached.status_code == 200 and cached.data == response.data
+            finally:
+                event.remove(db.engine, 'before_cursor_execute', listener)
+            assert not [s for s in statements if re.search(r'\bbookings\b', s)]
+            
+            # A change to the user's bookings changes the version
+            dao.update_status(booking.id, 'cancelled')
+            db.session.commit()
+            changed = client.get(url, headers={'If-None-Match': etag})
+            assert changed.status_code == 200
+            assert changed.headers['ETag'] != etag
+            assert b'Cancelled' in changed.data
+    
+    def test_calendar_json_is_windowed_and_cached(self, app, client, test_user, test_resource):
+        """Test that calendar feeds read only the visible window and serve repeat windows from memory."""
+        import re
+        from sqlalchemy import event
+        from src.utils.recurrence import series_fields
+        with app.app_context():
+            window_start = (datetime.utcnow() + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+            window_end = window_start + timedelta(days=7)
+            dao = BookingDAO()
+            for offset, status in [(-400, 'active'), (1, 'active'), (2, 'cancelled'), (30, 'pending')]:
+                start = window_start + timedelta(days=offset, hours=9)
+                dao.create(user_id=test_user.id, resource_id=test_resource.id, start_date=start,
+                           end_date=start + timedelta(hours=1), status=status, notes=f'day {offset}')
+            series_start = window_start - timedelta(days=10) + timedelta(hours=14)
+            series = dao.create(user_id=test_user.id, resource_id=test_resource.id, start_date=series_start,
+                                end_date=series_start + timedelta(hours=1), status='pending', recurrence_type='weekly',
+                                **series_fields(series_start, series_start + timedelta(hours=1), 'weekly',
+                                                series_start + timedelta(weeks=4)))
+            
+            client.post('/auth/login', data={'email': test_user.email, 'password': 'password123'})
+            url = f'/resources/{test_resource.id}/bookings/json'
+            window = {'start': window_start.isoformat() + 'Z', 'end': window_end.isoformat() + 'Z'}
+            
+            statements = []
+            listener = lambda *args: statements.append(args[2])
+            event.listen(db.engine, 'before_cursor_execute', listener)
+            try:
+                events = client.get(url, query_string=window).get_json()
+                booking_queries = [s for s in statements if re.search(r'\bbookings\b', s)]
+                statements.clear()
+                assert client.get(url, query_string=window).get_json() == events
+                assert not [s for s in statements if re.search(r'\bbookings\b', s)]
+            finally:
+                event.remove(db.engine, 'before_cursor_execute', listener)
+            # Pending/active occurrences in the window only, with the booker's name from one joined query
+            assert [(e['start'], e['extendedProps']['status']) for e in events] == [
+                ((window_start + timedelta(days=1, hours=9)).isoformat(), 'active'),
+                ((series_start + timedelta(weeks=2)).isoformat(), 'pending')]
+            assert events[0]['extendedProps'] == {'user': test_user.username, 'status': 'active', 'notes': 'day 1'}
+            assert 'notes' not in events[1]['extendedProps']
+            assert len(booking_queries) == 1 and re.search(r'JOIN users', booking_queries[0])
+            
+            # A committed booking drops the cached window
+            start = window_start + timedelta(days=3, hours=9)
+            dao.create(user_id=test_user.id, resource_id=test_resource.id, start_date=start,
+                       end_date=start + timedelta(hours=1), status='active')
+            assert len(client.get(url, query_string=window).get_json()) == 3
+            dao.add_exceptions(series.id, [series_start + timedelta(weeks=2)])
+            db.session.commit()
+            assert len(client.get(url, query_string=window).get_json()) == 2
+            
+            mine = client.get('/bookings/calendar/json', query_string=dict(window, status='cancelled')).get_json()
+            assert [(e['title'], e['extendedProps']['resource_title']) for e in mine] == [
+                ('Test Resource - Cancelled', 'Test Resource')]
+            assert client.get(url, query_string={'start': 'soon', 'end': 'later'}).status_code == 400
+            assert client.get(url, query_string={'start': window['end'], 'end': window['start']}).status_code == 400
+    
+    def test_calendar_changes_since_token(self, app, client, test_user, test_admin, test_resource):
+        """Test that calendar sync returns only the bookings changed since a token, with their window events."""
+        from src.utils.recurrence import series_fields
+        with app.app_context():
+            window_start = (datetime.utcnow() + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+            window = {'start': window_start.isoformat() + 'Z',
+                      'end': (window_start + timedelta(days=7)).isoformat() + 'Z'}
+            dao = BookingDAO()
+            start = window_start + timedelta(hours=9)
+            dao.create(user_id=test_user.id, resource_id=test_resource.id, start_date=start,
+                       end_date=start + timedelta(hours=1), status='active')
+            
+            client.post('/auth/login', data={'email': test_user.email, 'password': 'password123'})
+            url = '/bookings/calendar/changes'
+            first = client.get(url).get_json()
+            assert first['reset'] is True
+            token = first_token = first['token']
+            assert client.get(url, query_string=dict(window, since=token)).get_json() == {
+                'token': token, 'changes': []}
+            
+            # A conditional (Core) insert, a series with a cancelled occurrence, and another user's booking
+            single_id = dao.insert_if_free({'user_id': test_user.id, 'resource_id': test_resource.id,
+                                            'start_date': start + timedelta(days=1),
+                                            'end_date': start + timedelta(days=1, hours=1), 'status': 'pending'})
+            series_start = start + timedelta(hours=5)
+            series = dao.create(user_id=test_user.id, resource_id=test_resource.id, start_date=series_start,
+                                end_date=series_start + timedelta(hours=1), status='active', recurrence_type='daily',
+                                **series_fields(series_start, series_start + timedelta(hours=1), 'daily',
+                                                series_start + timedelta(days=2)))
+            dao.add_exceptions(series.id, [series_start + timedelta(days=1)])
+            dao.create(user_id=test_admin.id, resource_id=test_resource.id, start_date=start + timedelta(days=2),
+                       end_date=start + timedelta(days=2, hours=1), status='active')
+            db.session.commit()
+            
+            response = client.get(url, query_string=dict(window, since=token))
+            delta = response.get_json()
+            assert delta['token'] > token
+            changes = {change['id']: change['events'] for change in delta['changes']}
+            assert sorted(changes) == sorted([single_id, series.id])
+            assert [e['extendedProps']['status'] for e in changes[single_id]] == ['pending']
+            assert [e['start'] for e in changes[series.id]] == [
+                series_start.isoformat(), (series_start + timedelta(days=2)).isoformat()]
+            assert len(response.data) < 1024
+            
+            # A cancellation arrives as the booking's new state
+            token = delta['token']
+            dao.update_status(single_id, 'cancelled')
+            db.session.commit()
+            delta = client.get(url, query_string=dict(window, since=token)).get_json()
+            assert [(c['id'], [e['extendedProps']['status'] for e in c['events']]) for c in delta['changes']] == [
+                (single_id, ['cancelled'])]
+            
+            # Tokens older than the pruned log ask for a full refetch
+            dao.prune_changes(datetime.utcnow() + timedelta(days=1))
+            assert client.get(url, query_string=dict(window, since=first_token)).get_json()['reset'] is True
+            assert client.get(url, query_string=dict(window, since=delta['token'])).get_json()['changes'] == []
+    
+    def test_cancel_series_in_bulk(self, app, client, test_user, test_resource):
+        """Test that cancelling a series updates every open occurrence and notifies once."""
+        from src.models.notification import Notification
+        with app.app_context():
+            start_date = (datetime.utcnow() + timedelta(days=3)).replace(hour=9, minute=0, second=0, microsecond=0)
+            dao = BookingDAO()
+            parent = dao.create(user_id=test_user.id, resource_id=test_resource.id,
+                                start_date=start_date, end_date=start_date + timedelta(hours=1),
+                                status='active', recurrence_type='daily')
+            for day, status in enumerate(['active', 'active', 'completed', 'active'], start=1):
+                dao.create(user_id=test_user.id, resource_id=test_resource.id,
+                           start_date=start_date + timedelta(days=day),
+                           end_date=start_date + timedelta(days=day, hours=1),
+                           status=status, recurrence_type='daily', parent_booking_id=parent.id)
+            child_id = dao.get_recurring_children(parent.id)[0].id
+            
+            client.post('/auth/login', data={'email': test_user.email, 'password': 'password123'})
+            client.post(f'/bookings/{child_id}/cancel', follow_redirects=True)
+            
+            db.session.expire_all()
+            statuses = [b.status for b in dao.get_by_resource(test_resource.id)]
+            assert statuses == ['cancelled', 'cancelled', 'cancelled', 'completed', 'cancelled']
+            notifications = Notification.query.filter_by(user_id=test_user.id, type='booking_cancelled').all()
+            assert len(notifications) == 1
+            assert 'Bookings Cancelled: 4' in notifications[0].message
+            assert not dao.check_conflict(test_resource.id, start_date, start_date + timedelta(hours=1))
+    
+    def test_cancel_rule_series_keeps_past_occurrences(self, app, client, test_user, test_resource):
+        """Test that cancelling a rule-based series counts its occurrences and ends it at now."""
+        from src.models.notification import Notification
+        from src.utils.recurrence import expand_occurrences, series_fields
+        with app.app_context():
+            start = (datetime.utcnow() - timedelta(days=15)).replace(hour=9, minute=0, second=0, microsecond=0)
+            last = start + timedelta(weeks=9)
+            dao = BookingDAO()
+            series = dao.create(user_id=test_user.id, resource_id=test_resource.id,
+                                start_date=start, end_date=start + timedelta(hours=1),
+                                status='active', recurrence_type='weekly', recurrence_end_date=last,
+                                **series_fields(start, start + timedelta(hours=1), 'weekly', last))
+            occurrences = expand_occurrences(start, start + timedelta(hours=1), 'weekly', last)
+            assert len(occurrences) == 10
+            
+            client.post('/auth/login', data={'email': test_user.email, 'password': 'password123'})
+            response = client.post(f'/bookings/{series.id}/cancel', follow_redirects=True)
+            assert b'recurring booking series (7 instances)' in response.data
+            
+            notification = Notification.query.filter_by(user_id=test_user.id, type='booking_cancelled').one()
+            assert 'Bookings Cancelled: 7' in notification.message
+            assert f"Last Occurrence Ends: {occurrences[-1][1].strftime('%Y-%m-%d %I:%M %p')}" in notification.message
+            
+            # The three occurrences that already took place are kept
+            db.session.expire_all()
+            series = dao.get_by_id(series.id)
+            assert series.status == 'active'
+            assert series.series_end_date == occurrences[2][1]
+            assert dao.check_conflict(test_resource.id, *occurrences[2])
+            assert not dao.check_conflict(test_resource.id, *occurrences[3])
+    
+    def test_admin_cancel_series(self, app, client, test_user, test_admin, test_resource):
+        """Test that staff can cancel a whole series from the admin booking tools."""
+        with app.app_context():
+            start_date = (datetime.utcnow() + timedelta(days=3)).replace(hour=9, minute=0, second=0, microsecond=0)
+            dao = BookingDAO()
+            parent = dao.create(user_id=test_user.id, resource_id=test_resource.id,
+                                start_date=start_date, end_date=start_date + timedelta(hours=1),
+                                status='pending', recurrence_type='weekly')
+            dao.create(user_id=test_user.id, resource_id=test_resource.id,
+                       start_date=start_date + timedelta(days=7),
+                       end_date=start_date + timedelta(days=7, hours=1),
+                       status='pending', recurrence_type='weekly', parent_booking_id=parent.id)
+            
+            client.post('/auth/login', data={'email': test_admin.email, 'password': 'admin123'})
+            response = client.post(f'/admin/bookings/{parent.id}/cancel-series', follow_redirects=True)
+            assert b'Cancelled 2 booking(s)' in response.data
+            
+            db.session.expire_all()
+            assert {b.status for b in dao.get_by_resource(test_resource.id)} == {'cancelled'}
+    
+    def test_admin_reschedule_series_rekeys_exceptions(self, app, client, test_user, test_admin, test_resource):
+        """Test that moving a rule-based series keeps cancellations and re-checks every occurrence."""
+        from src.models.booking_exception import BookingException
+        from src.utils.recurrence import series_fields
+        with app.app_context():
+            start = (datetime.utcnow() + timedelta(days=3)).replace(hour=9, minute=0, second=0, microsecond=0)
+            last = start + timedelta(weeks=3)
+            dao = BookingDAO()
+            series = dao.create(user_id=test_user.id, resource_id=test_resource.id,
+                                start_date=start, end_date=start + timedelta(hours=1),
+                                status='active', recurrence_type='weekly', recurrence_end_date=last,
+                                **series_fields(start, start + timedelta(hours=1), 'weekly', last))
+            dao.add_exceptions(series.id, [start + timedelta(weeks=1)], reason='cancelled')
+            db.session.commit()
+            # Free at 09:00, but in the way once the series moves to 10:00
+            dao.create(user_id=test_admin.id, resource_id=test_resource.id,
+                       start_date=start + timedelta(weeks=2, hours=1),
+                       end_date=start + timedelta(weeks=2, hours=2), status='active')
+            
+            client.post('/auth/login', data={'email': test_admin.email, 'password': 'admin123'})
+            form = {
+                'user_id': test_user.id, 'resource_id': test_resource.id, 'status': 'active', 'notes': '',
+                'recurrence_type': 'weekly', 'recurrence_end_date': (last + timedelta(hours=1)).strftime('%Y-%m-%dT%H:%M')
+            }
+            
+            def move_to(new_start):
+                return client.post(f'/admin/bookings/{series.id}/edit', data=dict(
+                    form, start_date=new_start.strftime('%Y-%m-%dT%H:%M'),
+                    end_date=(new_start + timedelta(hours=1)).strftime('%Y-%m-%dT%H:%M')
+                ), follow_redirects=True)
+            
+            response = move_to(start + timedelta(hours=1))
+            assert b'Booking updated successfully' in response.data
+            db.session.expire_all()
+            exceptions = BookingException.query.filter_by(booking_id=series.id).all()
+            assert {(e.occurrence_start, e.reason) for e in exceptions} == {
+                (start + timedelta(weeks=1, hours=1), 'cancelled'),
+                (start + timedelta(weeks=2, hours=1), 'skipped'),
+            }
+            
+            # A first occurrence that is taken rejects the edit
+            response = move_to(start + timedelta(weeks=2, hours=1))
+            assert b'The first occurrence conflicts' in response.data
+            db.session.expire_all()
+            assert dao.get_by_id(series.id).start_date == start + timedelta(hours=1)
+            assert BookingException.query.filter_by(booking_id=series.id).count() == 2
+    
+    def test_free_slots_endpoint_returns_gaps(self, app, client, test_user, test_resource):
+        """Test that the free-slot finder returns the gaps around existing bookings."""
+        with app.app_context():
+            day = (datetime.utcnow() + timedelta(days=5)).replace(hour=0, minute=0, second=0, microsecond=0)
+            BookingDAO().create(
+                user_id=test_user.id,
+                resource_id=test_resource.id,
+                start_date=day.replace(hour=10),
+                end_date=day.replace(hour=12),
+                status='pending'
+            )
+            
+            response = client.get(f'/resources/{test_resource.id}/free-slots', query_string={
+                'from': day.isoformat(),
+                'to': (day + timedelta(days=1)).isoformat(),
+                'min_duration': 60,
+                'open': '08:00',
+                'close': '18:00'
+            })
+            assert response.status_code == 200
+            assert response.get_json()['slots'] == [
+                {'start': day.replace(hour=8).isoformat(), 'end': day.replace(hour=10).isoformat()},
+                {'start': day.replace(hour=12).isoformat(), 'end': day.replace(hour=18).isoformat()},
+            ]
+            
+            response = client.get(f'/resources/{test_resource.id}/free-slots', query_string={'from': 'not-a-date'})
+            assert response.status_code == 400
+    
+    def test_occupancy_endpoints(self, app, client, test_user, test_resource):
+        """Test the single-resource heatmap and multi-room grid JSON."""
+        with app.app_context():
+            day = (datetime.utcnow() + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+            BookingDAO().create(
+                user_id=test_user.id,
+                resource_id=test_resource.id,
+                start_date=day.replace(hour=6),
+                end_date=day.replace(hour=12),
+                status='active'
+            )
+            
+            response = client.get(f'/resources/{test_resource.id}/occupancy?start={day.date().isoformat()}&days=2')
+            assert response.status_code == 200
+            data = response.get_json()
+            assert len(data['slots']) == 2 and len(data['slots'][0]) == 96
+            assert sum(data['slots'][0]) == 24
+            assert data['utilization_percent'] == 12.5
+            
+            response = client.get(f'/resources/occupancy?ids={test_resource.id}&start={day.date().isoformat()}&days=1')
+            assert response.get_json()['resources'][0]['utilization_percent'] == 25.0
+            
+            response = client.get(f'/resources/{test_resource.id}/occupancy?start=1999-01-01')
+            assert response.status_code == 400
+    
     def test_booking_conflict_detection(self, app, test_user, test_resource, test_booking):
         """Test that booking conflicts are properly detected."""
         with app.app_context():
@@ -115,6 +515,245 @@ class TestResourceManagement:
             results = dao.search(location='Building')
             assert len(results) >= 1
     
+    def test_search_availability_filter(self, app, client, test_user, test_resource):
+        """Test that the availability filter compares peak occupancy with capacity."""
+        with app.app_context():
+            start = (datetime.utcnow() + timedelta(days=4)).replace(hour=9, minute=0, second=0, microsecond=0)
+            resource_dao = ResourceDAO()
+            booking_dao = BookingDAO()
+            full_room = resource_dao.create(title='Single Seat Booth', description='Booth', category='Room', capacity=1,
+                                            status='published', owner_id=test_user.id)
+            shared_room = resource_dao.create(title='Two Seat Studio', description='Studio', category='Room', capacity=2,
+                                              status='published', owner_id=test_user.id)
+            booking_dao.create(user_id=test_user.id, resource_id=full_room.id, status='active',
+                               start_date=start, end_date=start + timedelta(hours=2))
+            # Back-to-back bookings never occupy both seats at once
+            for hour in (0, 1):
+                booking_dao.create(user_id=test_user.id, resource_id=shared_room.id, status='active',
+                                   start_date=start + timedelta(hours=hour),
+                                   end_date=start + timedelta(hours=hour + 1))
+            
+            response = client.get('/resources/search', query_string={
+                'availability_start': start.strftime('%Y-%m-%dT%H:%M'),
+                'availability_end': (start + timedelta(hours=2)).strftime('%Y-%m-%dT%H:%M')
+            })
+            assert response.status_code == 200
+            assert b'Single Seat Booth' not in response.data
+            assert b'Two Seat Studio' in response.data
+            assert b'Test Resource' in response.data
+    
+    def test_search_sorts_in_sql_and_pages_by_cursor(self, app, client, test_user, test_resource):
+        """Test that every sort order pages through all results exactly once."""
+        from src.utils.keyset import decode_cursor, encode_cursor
+        with app.app_context():
+            resource_dao = ResourceDAO()
+            booking_dao = BookingDAO()
+            rooms = [resource_dao.create(title=f'Room {n}', description='Seminar room', category='Room',
+                                         capacity=10, status='published', owner_id=test_user.id)
+                     for n in range(5)]
+            start = datetime.utcnow() + timedelta(days=2)
+            for n in range(3):
+                booking_dao.create(user_id=test_user.id, resource_id=rooms[3].id, status='active',
+                                   start_date=start + timedelta(hours=n), end_date=start + timedelta(hours=n, minutes=30))
+            expected_total = len(rooms) + 1
+            
+            for sort in ('title', 'recent', 'most_booked', 'top_rated'):
+                seen, cursor = [], None
+                while True:
+                    params = {'sort': sort, 'per_page': 2}
+                    if cursor:
+                        params['cursor'] = cursor
+                    page = client.get('/resources/search/json', query_string=params).get_json()
+                    assert len(page['resources']) <= 2
+                    seen.extend(item['id'] for item in page['resources'])
+                    cursor = page['next_cursor']
+                    if not cursor:
+                        break
+                assert len(seen) == len(set(seen)) == expected_total, sort
+                if sort == 'most_booked':
+                    assert seen[0] == rooms[3].id
+                if sort == 'title':
+                    assert seen[:5] == [room.id for room in rooms]
+            
+            response = client.get('/resources/search', query_string={'sort': 'title', 'per_page': 4})
+            assert b'Room 3' in response.data and b'Test Resource' not in response.data
+            assert b'cursor=' in response.data
+            # A tampered cursor falls back to the first page
+            response = client.get('/resources/search', query_string={'sort': 'title', 'cursor': '!!bad'})
+            assert response.status_code == 200
+            assert b'Room 0' in response.data
+            # So does a well-formed cursor carrying a non-scalar key
+            forged = encode_cursor({'$gt': ''}, 1)
+            response = client.get('/resources/search', query_string={'sort': 'title', 'cursor': forged})
+            assert response.status_code == 200
+            assert b'Room 0' in response.data
+            assert decode_cursor(encode_cursor([1], 2), Resource.title) is None
+            assert decode_cursor(encode_cursor('Room 3', True), Resource.title) is None
+            assert decode_cursor(encode_cursor('Room 3', 7), Resource.title) == ('Room 3', 7)
+    
+    def test_listing_pages_run_constant_queries(self, app, client, test_user):
+        """Test that the home and search pages batch-load images whatever the page size."""
+        from sqlalchemy import event
+        from src.models.resource_image import ResourceImage
+        
+        def add_resources(count):
+            for n in range(count):
+                resource = ResourceDAO().create(title=f'Gallery Room {n}', description='Room', category='Room',
+                                                status='published', is_featured=True, owner_id=test_user.id)
+                db.session.add_all([
+                    ResourceImage(resource_id=resource.id, image_path=f'uploads/{resource.id}_{order}.jpg',
+                                  display_order=order)
+                    for order in (2, 1)
+                ])
+            db.session.commit()
+        
+        def count_queries(url):
+            client.get(url)  # warm per-app caches (rating badges)
+            statements = []
+            listener = lambda *args: statements.append(args[2])
+            event.listen(db.engine, 'before_cursor_execute', listener)
+            try:
+                response = client.get(url)
+            finally:
+                event.remove(db.engine, 'before_cursor_execute', listener)
+            assert response.status_code == 200
+            return len(statements), response.data
+        
+        with app.app_context():
+            add_resources(2)
+            small = {url: count_queries(url)[0] for url in ('/', '/resources/search')}
+            add_resources(4)
+            for url, queries in small.items():
+                large, body = count_queries(url)
+                assert large == queries, url
+            # Images render in display order
+            assert body.index(b'_1.jpg') < body.index(b'_2.jpg')
+    
+    def test_search_facet_counts(self, app, client, test_user):
+        """Test that each facet counts the other active filters but not its own."""
+        with app.app_context():
+            resource_dao = ResourceDAO()
+            for title, category, location, capacity, status in [
+                ('Small Room', 'Room', 'Library', 12, 'published'),
+                ('Big Room', 'Room', 'Library', 60, 'published'),
+                ('Lab One', 'Lab', 'Library', 30, 'published'),
+                ('Lab Two', 'Lab', 'Science Hall', 5, 'published'),
+                ('Draft Lab', 'Lab', 'Library', 30, 'draft'),
+            ]:
+                resource_dao.create(title=title, description='Space', category=category, location=location,
+                                    capacity=capacity, status=status, owner_id=test_user.id)
+            
+            facets = client.get('/resources/search/facets').get_json()
+            assert facets['total'] == 4
+            assert facets['category'] == [{'value': 'Lab', 'count': 2}, {'value': 'Room', 'count': 2}]
+            assert facets['location'] == [{'value': 'Library', 'count': 3}, {'value': 'Science Hall', 'count': 1}]
+            assert facets['capacity'] == [{'min': 10, 'count': 3}, {'min': 25, 'count': 2}, {'min': 50, 'count': 1}]
+            
+            facets = client.get('/resources/search/facets', query_string={
+                'category': 'Lab', 'location': 'library'
+            }).get_json()
+            assert facets['total'] == 1
+            assert facets['category'] == [{'value': 'Lab', 'count': 1}, {'value': 'Room', 'count': 2}]
+            assert facets['location'] == [{'value': 'Library', 'count': 1}, {'value': 'Science Hall', 'count': 1}]
+            assert facets['capacity'] == [{'min': 10, 'count': 1}, {'min': 25, 'count': 1}]
+            
+            # The cached unfiltered counts are dropped when a resource is published
+            resource_dao.create(title='Studio', description='Space', category='Studio', location='Arts',
+                                capacity=8, status='published', owner_id=test_user.id)
+            facets = client.get('/resources/search/facets').get_json()
+            assert facets['total'] == 5
+            assert {'value': 'Studio', 'count': 1} in facets['category']
+            
+            response = client.get('/resources/search', query_string={'category': 'Lab'})
+            assert b'Room (2)' in response.data
+            assert b'2 resources found' in response.data
+    
+    def test_misspelled_search_offers_did_you_mean(self, app, client, test_user):
+        """Test that a keyword search with a typo suggests close published titles and locations."""
+        from src.utils.fuzzy_match import get_trigram_index
+        with app.app_context():
+            resource_dao = ResourceDAO()
+            resource_dao.create(title='Collaboration Lab', description='Lab', category='Lab',
+                                location='Innovation Center', status='published', owner_id=test_user.id)
+            resource_dao.create(title='Collaboration Suite', description='Room', category='Room',
+                                status='draft', owner_id=test_user.id)
+            
+            matches = get_trigram_index().search('colaboration lab')
+            assert [(m.kind, m.value) for m in matches] == [('title', 'Collaboration Lab')]
+            assert matches[0].score > 0.5
+            assert [m.value for m in get_trigram_index().search('inovation centre')] == ['Innovation Center']
+            
+            response = client.get('/resources/search', query_string={'q': 'colaboration lab'})
+            assert b'Did you mean' in response.data
+            assert b'Collaboration Lab</a>' in response.data
+            assert b'Collaboration Suite' not in response.data
+            
+            response = client.get('/resources/search', query_string={'q': 'zzzz'})
+            assert b'Did you mean' not in response.data
+    
+    def test_suggest_is_served_from_memory(self, app, client, test_user, test_admin):
+        """Test that typeahead suggestions need no query and follow resource and user writes."""
+        from sqlalchemy import event
+        with app.app_context():
+            resource_dao = ResourceDAO()
+            chem = resource_dao.create(title='Chemistry Lab', description='Lab', category='Lab',
+                                       location='Science Hall', status='published', owner_id=test_user.id)
+            resource_dao.create(title='Chess Club Room', description='Room', category='Room',
+                                location='Student Center', status='draft', owner_id=test_user.id)
+            
+            # The resource index follows the catalog snapshot, rebuilt once after the writes above
+            client.get('/resources/suggest?q=x')
+            statements = []
+            listener = lambda *args: statements.append(args[2])
+            event.listen(db.engine, 'before_cursor_execute', listener)
+            try:
+                suggestions = client.get('/resources/suggest?q=ch').get_json()['suggestions']
+                by_word = client.get('/resources/suggest?q=LAB').get_json()['suggestions']
+            finally:
+                event.remove(db.engine, 'before_cursor_execute', listener)
+            assert statements == []
+            assert suggestions == [{'value': 'Chemistry Lab', 'label': 'Chemistry Lab', 'type': 'title'}]
+            # Category matches at the start rank before titles matching on a later word
+            assert [s['value'] for s in by_word] == ['Lab', 'Chemistry Lab']
+            
+            chem.title = 'Biochemistry Lab'
+            db.session.commit()
+            assert client.get('/resources/suggest?q=chem').get_json()['suggestions'] == []
+            assert client.get('/resources/suggest?q=bioch').get_json()['suggestions'][0]['value'] == 'Biochemistry Lab'
+            resource_dao.delete(chem)
+            assert client.get('/resources/suggest?q=science').get_json()['suggestions'] == []
+            
+            # Recipient field: other active users, by username only, never for a short prefix
+            client.post('/auth/login', data={'email': test_user.email, 'password': 'password123'})
+            recipients = client.get('/messages/recipients/suggest?q=adm').get_json()['suggestions']
+            assert recipients == [{'value': test_admin.username, 'label': test_admin.username, 'type': 'user'}]
+            assert client.get('/messages/recipients/suggest?q=test').get_json()['suggestions'] == []
+            assert client.get('/messages/recipients/suggest?q=ad').get_json()['suggestions'] == []
+            assert client.get('/messages/recipients/suggest?q=use').get_json()['suggestions'] == []
+    
+    def test_search_first_page_over_large_catalog(self, app, client, test_user):
+        """Benchmark: page one of a 5k-resource catalog (run with -s to see timings)."""
+        import time
+        with app.app_context():
+            now = datetime.utcnow()
+            db.session.execute(Resource.__table__.insert(), [
+                {'title': f'Catalog Room {n:05d}', 'description': 'Lecture room', 'category': 'Room',
+                 'status': 'published', 'owner_id': test_user.id, 'requires_approval': False,
+                 'created_at': now - timedelta(minutes=n), 'avg_rating': (n % 50) / 10}
+                for n in range(5000)
+            ])
+            db.session.commit()
+            
+            for sort in ('title', 'recent', 'top_rated'):
+                client.get('/resources/search/json', query_string={'sort': sort})
+                started = time.perf_counter()
+                page = client.get('/resources/search/json', query_string={'sort': sort}).get_json()
+                elapsed = time.perf_counter() - started
+                print(f'\n5000 resources, sort={sort}: page one in {elapsed * 1000:.1f}ms')
+                assert len(page['resources']) == 24
+                assert page['next_cursor']
+                assert elapsed < 0.5
+    
     def test_resource_creation_workflow(self, app, client, test_admin):
         """Test creating a resource as admin."""
         with app.app_context():
@@ -0,0 +1,178 @@
+"""
+Query-plan regression tests for hot DAO queries.
+
+Every statement a DAO method issues is re-run through SQLite's
+EXPLAIN QUERY PLAN against a seeded database; the test fails if any of them
+scans a hot table instead of searching one of its indexes.
+"""
+import re
+import pytest
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from sqlalchemy import event
+from src.data_access import (
+    BookingDAO, MessageDAO, WaitlistDAO, ReviewDAO, NotificationDAO
+)
+from src.models.booking import Booking
+from src.models.message import Message
+from src.models.waitlist import Waitlist
+from src.models.review import Review
+from src.models.notification import Notification
+from src.extensions import db
+from src.utils.booking_index import get_booking_index
+
+HOT_TABLES = ('bookings', 'booking_versions', 'reviews', 'notifications', 'messages', 'waitlist')
+
+# "SCAN bookings", "SCAN bookings AS b", "SCAN bookings USING INDEX ..." all
+# read the whole table (or a whole index); only SEARCH is acceptable.
+FULL_SCAN = re.compile(r'^SCAN ({})\b'.format('|'.join(HOT_TABLES)))
+
+START = datetime(2030, 3, 4, 9, 0)
+
+
+@contextmanager
+def captured_statements():
+    """Collect (sql, params) for every read/update statement sent to the database."""
+    statements = []
+    
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        verb = statement.lstrip().split(None, 1)[0].upper()
+        if not executemany and verb in ('SELECT', 'WITH', 'UPDATE', 'DELETE'):
+            statements.append((statement, parameters))
+    
+    event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+
+
+def full_scans(statements):
+    """Return the offending plan lines for statements that scan a hot table."""
+    offending = []
+    connection = db.session.connection()
+    for statement, parameters in statements:
+        plan = connection.exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters).fetchall()
+        for row in plan:
+            detail = row[-1]
+            if FULL_SCAN.match(detail):
+                offending.append(f'{detail}  <-  {statement}')
+    return offending
+
+
+@pytest.fixture
+def seeded(app, test_user, test_admin, test_resource):
+    """Seed every hot table with a handful of rows."""
+    with app.app_context():
+        parent = Booking(user_id=test_user.id, resource_id=test_resource.id,
+                         start_date=START, end_date=START + timedelta(hours=1),
+                         status='active', recurrence_type='daily')
+        db.session.add(parent)
+        db.session.flush()
+        for day in range(1, 6):
+            db.session.add(Booking(
+                user_id=test_user.id, resource_id=test_resource.id,
+                start_date=START + timedelta(days=day),
+                end_date=START + timedelta(days=day, hours=1),
+                status='pending' if day % 2 else 'cancelled',
+                parent_booking_id=parent.id
+            ))
+        db.session.add(Review(user_id=test_user.id, resource_id=test_resource.id,
+                              rating=4, review_text='Good'))
+        for idx in range(3):
+            db.session.add(Notification(user_id=test_user.id, type='booking_created',
+                                        title=f'Notification {idx}', message='Body',
+                                        is_read=bool(idx % 2)))
+            db.session.add(Message(sender_id=test_admin.id, recipient_id=test_user.id,
+                                   subject=f'Message {idx}', body='Body',
+                                   is_flagged=idx == 0))
+        db.session.add(Waitlist(user_id=test_user.id, resource_id=test_resource.id,
+                                requested_start_date=START,
+                                requested_end_date=START + timedelta(hours=1)))
+        db.session.commit()
+        yield {'user_id': test_user.id, 'resource_id': test_resource.id, 'parent_id': parent.id}
+
+
+def _booking_index_load(ids):
+    get_booking_index().invalidate()
+    return BookingDAO().check_conflict(ids['resource_id'], START, START + timedelta(hours=1))
+
+
+def _free_slot_check(ids):
+    # Warm index: only the shared version is read
+    return BookingDAO().check_conflict(ids['resource_id'], START - timedelta(hours=2),
+                                       START - timedelta(hours=1))
+
+
+HOT_QUERIES = {
+    'bookings.get_by_user': lambda ids: BookingDAO().get_by_user(ids['user_id']),
+    'bookings.get_by_user_status': lambda ids: BookingDAO().get_by_user(ids['user_id'], 'active'),
+    'bookings.get_by_resource': lambda ids: BookingDAO().get_by_resource(ids['resource_id']),
+    'bookings.get_by_resource_status': lambda ids: BookingDAO().get_by_resource(ids['resource_id'], 'pending'),
+    'bookings.get_active_by_resource': lambda ids: BookingDAO().get_active_by_resource(ids['resource_id']),
+    'bookings.check_conflict': _booking_index_load,
+    'bookings.check_conflict_free': _free_slot_check,
+    'bookings.count_series_overlaps': lambda ids: BookingDAO().count_series_overlaps(
+        ids['resource_id'], [(START, START + timedelta(hours=1))]),
+    'bookings.max_concurrency': lambda ids: BookingDAO().max_concurrency(
+        ids['resource_id'], START, START + timedelta(days=2)),
+    'bookings.peak_concurrency_subquery': lambda ids: db.session.query(
+        BookingDAO().peak_concurrency_subquery(START, START + timedelta(days=2))).all(),
+    'bookings.series_peaks': lambda ids: BookingDAO().series_peaks(START, START + timedelta(days=2)),
+    'bookings.get_by_date_range': lambda ids: BookingDAO().get_by_date_range(
+        START, START + timedelta(days=7)),
+    'bookings.get_by_date_range_user': lambda ids: BookingDAO().get_by_date_range(
+        START, START + timedelta(days=7), user_id=ids['user_id']),
+    'bookings.get_recurring_children': lambda ids: BookingDAO().get_recurring_children(ids['parent_id']),
+    'bookings.cancel_series': lambda ids: BookingDAO().cancel_series(ids['parent_id']),
+    'reviews.get_by_resource': lambda ids: ReviewDAO().get_by_resource(ids['resource_id']),
+    'reviews.get_by_user': lambda ids: ReviewDAO().get_by_user(ids['user_id']),
+    'reviews.get_by_user_and_resource': lambda ids: ReviewDAO().get_by_user_and_resource(
+        ids['user_id'], ids['resource_id']),
+    'reviews.get_paginated': lambda ids: ReviewDAO().get_paginated(ids['resource_id']).items,
+    'notifications.get_by_user': lambda ids: NotificationDAO().get_by_user(ids['user_id']),
+    'notifications.get_by_user_unread': lambda ids: NotificationDAO().get_by_user(ids['user_id'], unread_only=True),
+    'notifications.get_unread_count': lambda ids: NotificationDAO().get_unread_count(ids['user_id']),
+    'notifications.get_paginated': lambda ids: NotificationDAO().get_paginated(ids['user_id'], filter_type='read').items,
+    'messages.get_inbox': lambda ids: MessageDAO().get_inbox(ids['user_id']),
+    'messages.get_inbox_unread': lambda ids: MessageDAO().get_inbox(ids['user_id'], unread_only=True),
+    'messages.get_sent': lambda ids: MessageDAO().get_sent(ids['user_id']),
+    'messages.get_flagged': lambda ids: MessageDAO().get_flagged(),
+    'waitlist.get_by_user': lambda ids: WaitlistDAO().get_by_user(ids['user_id']),
+    'waitlist.get_by_resource': lambda ids: WaitlistDAO().get_by_resource(ids['resource_id'], status='pending'),
+    'waitlist.check_existing': lambda ids: WaitlistDAO().check_existing(
+        ids['user_id'], ids['resource_id'], START, START + timedelta(hours=1)),
+    'waitlist.cancel_expired_entries': lambda ids: WaitlistDAO().cancel_expired_entries(),
+}
+
+
+class TestHotQueryPlans:
+    """Hot DAO queries must be answered from an index."""
+    
+    @pytest.mark.parametrize('name', sorted(HOT_QUERIES))
+    def test_query_uses_index(self, app, seeded, name):
+        """Test that no statement issued by the DAO method scans a hot table."""
+        with app.app_context():
+            with captured_statements() as statements:
+                HOT_QUERIES[name](seeded)
+            assert statements, f'{name} issued no queries'
+            assert full_scans(statements) == []
+    
+    def test_free_slot_check_reads_only_booking_version(self, app, seeded):
+        """Test that a free answer from a warm index does not query the bookings table."""
+        with app.app_context():
+            dao = BookingDAO()
+            dao.check_conflict(seeded['resource_id'], START, START + timedelta(hours=1))
+            with captured_statements() as statements:
+                assert dao.check_conflict(seeded['resource_id'], START - timedelta(hours=2),
+                                          START - timedelta(hours=1)) is False
+            assert len(statements) == 1
+            assert 'booking_versions' in statements[0][0]
+            assert full_scans(statements) == []
+    
+    def test_detects_full_table_scan(self, app, seeded):
+        """Test that the checker itself flags an unindexed predicate."""
+        with app.app_context():
+            with captured_statements() as statements:
+                Booking.query.filter(Booking.notes == 'unindexed').all()
+            assert full_scans(statements)